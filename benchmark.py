@@ -0,0 +1,482 @@
+"""
+性能基准测试。
+
+用法:
+    python benchmark.py tokenize --size-mb 50
+    python benchmark.py build --tokens 2000000
+    python benchmark.py memory --tokens 1000000
+    python benchmark.py suite --scales 10k,100k,1m --out results.json
+    python benchmark.py compare old.json new.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from bridge_words import BridgeIndex, bridge_words_message, generate_text
+from compact_graph import CompactGraph
+from layout import LayoutCache
+from pagerank import calculate_pagerank
+from random_walk import random_walk_path, random_walks
+from shortest_path import shortest_path_message
+from text_graph import build_graph, clean_text, iter_bytes_words, iter_words, load_graph
+
+SAMPLE_WORDS = ("the scientist carefully analyzed data wrote detailed report "
+                "shared with team requested more again").split()
+
+
+def make_text(size_mb, seed=0):
+    """生成大约 size_mb MB 的英文文本，夹杂标点、数字、换行和非 ASCII 字符。"""
+    rng = random.Random(seed)
+    pieces = []
+    size = 0
+    target = int(size_mb * (1 << 20))
+    while size < target:
+        word = rng.choice(SAMPLE_WORDS)
+        if rng.random() < 0.1:
+            word = word.capitalize()
+        sep = rng.choice([" ", " ", " ", ", ", ".\n", " 2024 ", " café "])
+        pieces.append(word + sep)
+        size += len(word) + len(sep)
+    return "".join(pieces)
+
+
+def clean_text_regex(text):
+    """原来基于正则的 clean_text，作为对照。"""
+    text = re.sub(r'[^A-Za-z\s]', ' ', text)
+    text = text.lower()
+    return text.split()
+
+
+def build_graph_loop(words):
+    """原来逐个单词对累加边权的 build_graph，作为对照。"""
+    import networkx as nx
+    Graph = nx.DiGraph()
+    prev = None
+    for word in words:
+        if prev is not None:
+            if Graph.has_edge(prev, word):
+                Graph[prev][word]['weight'] += 1
+            else:
+                Graph.add_edge(prev, word, weight=1)
+        prev = word
+    return Graph
+
+
+def zipf_names(vocab_size):
+    """词表：只含字母的定长单词（26 进制），分词后保持不变。"""
+    width = 1
+    while 26 ** width < vocab_size:
+        width += 1
+    return ["".join(chr(97 + i // 26 ** k % 26) for k in range(width)) for i in range(vocab_size)]
+
+
+def iter_zipf_ids(num_tokens, vocab_size, seed=0, chunk_size=1 << 20):
+    """按 Zipf 分布（指数 1）分块抽取单词 ID，结果只由参数决定。"""
+    rng = np.random.default_rng(seed)
+    p = 1.0 / np.arange(1, vocab_size + 1, dtype=np.float64)
+    p /= p.sum()
+    for start in range(0, num_tokens, chunk_size):
+        yield rng.choice(vocab_size, size=min(chunk_size, num_tokens - start), p=p)
+
+
+def make_words(num_tokens, vocab_size=50000, seed=0):
+    """按 Zipf 分布抽取 num_tokens 个单词（词表大小 vocab_size）。"""
+    names = zipf_names(vocab_size)
+    return [names[i] for ids in iter_zipf_ids(num_tokens, vocab_size, seed) for i in ids.tolist()]
+
+
+def write_corpus(path, num_tokens, vocab_size, seed=0):
+    """把 Zipf 语料分块写入文本文件（每行 20 个单词），不把整个语料放进内存。"""
+    names = zipf_names(vocab_size)
+    with open(path, 'w', encoding='utf-8') as f:
+        for ids in iter_zipf_ids(num_tokens, vocab_size, seed):
+            words = [names[i] for i in ids.tolist()]
+            f.write("\n".join(" ".join(words[i:i + 20]) for i in range(0, len(words), 20)))
+            f.write("\n")
+
+
+def _timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def bench_tokenize(size_mb):
+    text = make_text(size_mb)
+    data = text.encode('utf-8')
+    mb = len(data) / (1 << 20)
+    cases = [
+        ("正则 clean_text", lambda: clean_text_regex(text)),
+        ("bytes clean_text", lambda: clean_text(text)),
+        ("流式 str（分块）", lambda: sum(1 for _ in iter_words(io.StringIO(text)))),
+        ("流式 bytes（分块）", lambda: sum(1 for _ in iter_bytes_words(io.BytesIO(data)))),
+    ]
+    expected = None
+    print(f"文本大小: {mb:.1f} MB")
+    for name, func in cases:
+        result, seconds = _timed(func)
+        count = result if isinstance(result, int) else len(result)
+        expected = count if expected is None else expected
+        assert count == expected, name
+        print(f"{name:<20} {seconds:8.3f} 秒  {mb / seconds:8.1f} MB/s")
+
+
+def bench_build(num_tokens):
+    words = make_words(num_tokens)
+    print(f"单词数: {len(words)}")
+    cases = [
+        ("逐词累加 build_graph", lambda: build_graph_loop(words)),
+        # 计数已向量化，但耗时主要在 networkx 插入边上
+        ("build_graph (networkx)", lambda: build_graph(words)),
+        ("CompactGraph.from_words", lambda: CompactGraph.from_words(words)),
+    ]
+    expected = None
+    for name, func in cases:
+        graph, seconds = _timed(func)
+        if isinstance(graph, CompactGraph):
+            graph = graph.to_networkx()
+        edges = {(a, b): d['weight'] for a, b, d in graph.edges(data=True)}
+        expected = edges if expected is None else expected
+        assert edges == expected, name
+        print(f"{name:<24} {seconds:8.3f} 秒  {len(words) / seconds / 1e6:8.2f} M 词/s")
+
+
+def _retained(func):
+    """调用 func，返回 (结果, 结果仍然占用的内存字节数)。"""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = func()
+        return result, tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+
+def bench_memory(num_tokens):
+    # 经过真正的分词：每次出现都是一个新的字符串对象
+    words = clean_text(" ".join(make_words(num_tokens)))
+    cases = [
+        ("networkx DiGraph", lambda: build_graph(words)),
+        ("CompactGraph", lambda: CompactGraph.from_words(words)),
+    ]
+    print(f"单词数: {len(words)}")
+    for name, func in cases:
+        graph, nbytes = _retained(func)
+        n = len(graph)
+        print(f"{name:<18} 节点 {n:>7}  边 {graph.number_of_edges():>8}  "
+              f"{nbytes / (1 << 20):8.1f} MB  {nbytes / n:8.0f} 字节/节点")
+        if isinstance(graph, CompactGraph):
+            print(f"{'  其中词表':<16} {graph.vocab.nbytes() / n:8.0f} 字节/节点"
+                  "（含词频和第一次出现的偏移）")
+        del graph
+
+
+# ---------- 完整的基准测试套件 ----------
+
+SUITE_SCALES = "10k,100k,1m"
+SUITE_OPS = ('clean_text', 'build_graph', 'load_graph', 'bridge_index', 'bridge',
+             'generate_text', 'shortest_path', 'single_source', 'pagerank', 'random_walk',
+             'random_walks', 'layout', 'draw_graph')
+IN_MEMORY_MAX_TOKENS = 10_000_000   # 超过这个规模不再把整个语料读成字符串和单词列表
+NETWORKX_MAX_TOKENS = 1_000_000     # networkx 版 build_graph 只测到这个规模
+LAYOUT_MAX_NODES = 50_000           # 布局只测到这个节点数
+NUM_QUERIES = {'bridge': 1000, 'generate_text': 100, 'shortest_path': 20,
+               'single_source': 5, 'random_walk': 1000, 'random_walks': 10000}
+
+
+def parse_scale(text):
+    """'10k'、'1m'、'100M' 等写法转成单词数。"""
+    text = text.strip().lower()
+    factor = {'k': 1_000, 'm': 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip('km')) * factor)
+
+
+def vocab_size_for(num_tokens):
+    """词表大小随语料规模增长（近似 Heaps 定律）。"""
+    return max(1000, int(30 * num_tokens ** 0.5))
+
+
+def peak_rss_mb():
+    """当前进程的峰值常驻内存（MB）；平台不支持时返回 None。"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+
+def _measure(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times), sum(times) / len(times)
+
+
+class _Workload:
+    """一个规模下各项操作共用的数据：语料文件、图、索引和随机查询。"""
+
+    def __init__(self, num_tokens, seed, workdir):
+        self.num_tokens = num_tokens
+        self.seed = seed
+        self.path = os.path.join(workdir, f"corpus_{num_tokens}.txt")
+        write_corpus(self.path, num_tokens, vocab_size_for(num_tokens), seed)
+        self._text = None
+        self._words = None
+        self._graph = None
+        self._index = None
+
+    @property
+    def text(self):
+        if self._text is None:
+            with open(self.path, encoding='utf-8') as f:
+                self._text = f.read()
+        return self._text
+
+    @property
+    def words(self):
+        if self._words is None:
+            self._words = clean_text(self.text)
+        return self._words
+
+    @property
+    def graph(self):
+        if self._graph is None:
+            self._graph = load_graph(self.path, use_snapshot=False)
+        return self._graph
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = BridgeIndex(self.graph)
+        return self._index
+
+    def sample_words(self, k, seed=0):
+        rng = random.Random(self.seed * 1000 + seed)
+        words = self.graph.vocab.words
+        return [words[rng.randrange(len(words))] for _ in range(k)]
+
+    def skip_reason(self, op):
+        if op in ('clean_text', 'build_graph') and self.num_tokens > IN_MEMORY_MAX_TOKENS:
+            return f"语料超过 {IN_MEMORY_MAX_TOKENS} 个单词，只测流式构建"
+        if op == 'build_graph' and self.num_tokens > NETWORKX_MAX_TOKENS:
+            return f"networkx 图只测到 {NETWORKX_MAX_TOKENS} 个单词"
+        if op in ('layout', 'draw_graph') and len(self.graph) > LAYOUT_MAX_NODES:
+            return f"节点数超过 {LAYOUT_MAX_NODES}"
+        if len(self.graph) == 0:
+            return "图为空"
+        return None
+
+    def task(self, op):
+        """返回 (无参计算函数, 每次计算包含的查询数)。准备工作不计入耗时。"""
+        graph = self.graph
+        k = NUM_QUERIES.get(op, 1)
+        if op == 'clean_text':
+            text = self.text
+            return lambda: clean_text(text), 1
+        if op == 'build_graph':
+            words = self.words
+            return lambda: build_graph(words), 1
+        if op == 'load_graph':
+            return lambda: load_graph(self.path, use_snapshot=False), 1
+        if op == 'bridge_index':
+            return lambda: BridgeIndex(graph), 1
+        if op == 'bridge':
+            index = self.index
+            pairs = list(zip(self.sample_words(k, 1), self.sample_words(k, 2)))
+            return lambda: [bridge_words_message(graph, a, b, index) for a, b in pairs], k
+        if op == 'generate_text':
+            index = self.index
+            sentences = [self.sample_words(20, i) for i in range(k)]
+            rng = random.Random(self.seed)
+            return lambda: [generate_text(graph, s, index, rng) for s in sentences], k
+        if op == 'shortest_path':
+            pairs = list(zip(self.sample_words(k, 3), self.sample_words(k, 4)))
+            return lambda: [shortest_path_message(graph, a, b) for a, b in pairs], k
+        if op == 'single_source':
+            sources = self.sample_words(k, 5)
+            return lambda: [shortest_path_message(graph, a) for a in sources], k
+        if op == 'pagerank':
+            return lambda: calculate_pagerank(graph, 0.85), 1
+        if op == 'random_walk':
+            rng = random.Random(self.seed)
+            return lambda: [random_walk_path(graph, rng) for _ in range(k)], k
+        if op == 'random_walks':
+            return lambda: random_walks(graph, k, seed=self.seed, processes=1), k
+        if op == 'layout':
+            return lambda: LayoutCache(seed=self.seed).positions(graph), 1
+        if op == 'draw_graph':
+            return self._draw_task(), 1
+        raise ValueError(f"未知的操作：{op}")
+
+    def _draw_task(self):
+        # 与 GUI 的 draw_graph 相同的绘制路径，只是画布换成 Agg，坐标用随机布局
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from render import GraphView
+        graph = self.graph
+        coords = np.random.default_rng(self.seed).uniform(-1, 1, size=(len(graph), 2))
+        a, b = self.sample_words(2, 6)
+        paths = shortest_path_message(graph, a, b)[1]
+
+        def draw():
+            view = GraphView(canvas_factory=lambda fig, master: FigureCanvasAgg(fig))
+            pos = dict(zip(graph.vocab.words, map(tuple, coords.tolist())))
+            view.show_graph(graph, pos)
+            view.highlight(paths)
+            view.close()
+        return draw
+
+
+def run_scale(num_tokens, ops=SUITE_OPS, repeat=3, seed=0, workdir=None):
+    """
+    在一个规模上依次测量各项操作。
+
+    返回:
+        结果字典的列表；peak_rss_mb 是测完该操作时进程的峰值内存，
+        包含语料和之前各项操作留下的数据
+    """
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        work = _Workload(num_tokens, seed, tmp)
+        results = []
+        for op in ops:
+            record = {'scale': num_tokens, 'op': op}
+            reason = work.skip_reason(op)
+            if reason is not None:
+                record['skipped'] = reason
+            else:
+                func, queries = work.task(op)
+                best, mean = _measure(func, repeat)
+                record.update(seconds=best, mean_seconds=mean, repeat=repeat, queries=queries,
+                              nodes=len(work.graph), edges=work.graph.number_of_edges())
+            record['peak_rss_mb'] = peak_rss_mb()
+            results.append(record)
+        return results
+
+
+def _metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ''
+    return {'commit': commit or None, 'python': platform.python_version(),
+            'numpy': np.__version__, 'platform': platform.platform(),
+            'cpus': os.cpu_count(), 'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def run_suite(scales, ops=SUITE_OPS, repeat=3, seed=0, isolate=True):
+    """
+    依次测量每个规模。isolate 为 True 时每个规模在单独的子进程中运行，
+    峰值内存互不影响。
+
+    返回:
+        {'meta': 运行环境, 'results': 结果列表}，可直接写成 JSON
+    """
+    results = []
+    for num_tokens in scales:
+        if isolate:
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                results.extend(pool.submit(run_scale, num_tokens, ops, repeat, seed).result())
+        else:
+            results.extend(run_scale(num_tokens, ops, repeat, seed))
+    return {'meta': _metadata(), 'results': results}
+
+
+def print_results(report):
+    print(f"{'规模':>10} {'操作':<14} {'耗时(秒)':>10} {'每次查询(毫秒)':>14} {'峰值内存(MB)':>12}")
+    for r in report['results']:
+        rss = '' if r['peak_rss_mb'] is None else f"{r['peak_rss_mb']:.0f}"
+        if 'skipped' in r:
+            print(f"{r['scale']:>10} {r['op']:<14} {'跳过':>10} {'':>14} {rss:>12}  {r['skipped']}")
+            continue
+        per_query = r['seconds'] / r['queries'] * 1000
+        print(f"{r['scale']:>10} {r['op']:<14} {r['seconds']:>10.4f} {per_query:>14.3f} {rss:>12}")
+
+
+def compare_reports(old, new, threshold=1.2):
+    """
+    对比两次运行中相同（规模, 操作）的耗时。
+
+    参数:
+        threshold: float，新旧耗时的比值超过它视为变慢
+
+    返回:
+        [(规模, 操作, 旧耗时, 新耗时, 比值, 是否变慢)]
+    """
+    before = {(r['scale'], r['op']): r['seconds'] for r in old['results'] if 'seconds' in r}
+    rows = []
+    for r in new['results']:
+        key = (r['scale'], r['op'])
+        if 'seconds' in r and key in before:
+            ratio = r['seconds'] / before[key]
+            rows.append((*key, before[key], r['seconds'], ratio, ratio > threshold))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="性能基准测试")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('tokenize', help="分词吞吐量对比")
+    p.add_argument('--size-mb', type=float, default=20)
+    p = sub.add_parser('build', help="建图吞吐量对比")
+    p.add_argument('--tokens', type=int, default=2000000)
+    p = sub.add_parser('memory', help="图的内存占用对比")
+    p.add_argument('--tokens', type=int, default=1000000)
+    p = sub.add_parser('suite', help="各项操作在多个语料规模上的耗时和峰值内存")
+    p.add_argument('--scales', default=SUITE_SCALES, help="逗号分隔，例如 10k,1m,100m")
+    p.add_argument('--ops', default=','.join(SUITE_OPS), help="逗号分隔的操作名")
+    p.add_argument('--repeat', type=int, default=3, help="每项重复次数，取最短耗时")
+    p.add_argument('--seed', type=int, default=0)
+    p.add_argument('--out', default='benchmark_results.json', help="结果 JSON 文件")
+    p = sub.add_parser('compare', help="对比两次 suite 的结果")
+    p.add_argument('old')
+    p.add_argument('new')
+    p.add_argument('--threshold', type=float, default=1.2, help="耗时比值超过它视为变慢")
+    args = parser.parse_args(argv)
+    if args.command == 'tokenize':
+        bench_tokenize(args.size_mb)
+    elif args.command == 'build':
+        bench_build(args.tokens)
+    elif args.command == 'memory':
+        bench_memory(args.tokens)
+    elif args.command == 'suite':
+        ops = [op for op in args.ops.split(',') if op]
+        unknown = sorted(set(ops) - set(SUITE_OPS))
+        if unknown:
+            parser.error(f"未知的操作：{', '.join(unknown)}")
+        scales = [parse_scale(s) for s in args.scales.split(',') if s]
+        report = run_suite(scales, ops, args.repeat, args.seed)
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print_results(report)
+        print(f"结果已写入 {args.out}")
+    elif args.command == 'compare':
+        with open(args.old, encoding='utf-8') as f:
+            old = json.load(f)
+        with open(args.new, encoding='utf-8') as f:
+            new = json.load(f)
+        slower = 0
+        for scale, op, t0, t1, ratio, regressed in compare_reports(old, new, args.threshold):
+            flag = "  变慢" if regressed else ""
+            slower += regressed
+            print(f"{scale:>10} {op:<14} {t0:>10.4f} -> {t1:>10.4f}  x{ratio:.2f}{flag}")
+        return 1 if slower else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,359 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+from itertools import islice
+
+import numpy as np
+
+from instrument import span
+from parallel import run_shared_pool
+from text_graph import NO_GRAPH_MESSAGE
+
+# 索引中每个单词对的额外开销（dict 项、键、区间元组及其中的整数、终点数组中的一项），
+# 用于估算内存；按实测取偏大的值，保证实际占用不超过 max_bytes
+PAIR_OVERHEAD = 240
+ROW_OVERHEAD = 256     # 每个起点的额外开销（_rows 的 dict 项和终点数组对象）
+INDEX_BUDGET_RATIO = 4  # 默认内存上限为图本身 CSR 数组大小的倍数
+MIN_INDEX_BYTES = 1 << 20
+
+
+def gather_rows(indptr, data, rows):
+    """把若干行 CSR 数据按顺序拼接成一个数组。"""
+    starts = indptr[rows]
+    lens = indptr[rows + 1] - starts
+    out_starts = np.cumsum(lens) - lens
+    offsets = np.repeat(starts - out_starts, lens) + np.arange(lens.sum())
+    return data[offsets]
+
+
+def bridge_ids(graph, u, v):
+    """
+    用后继与前驱数组求交集得到 u 到 v 的桥接词 ID。
+
+    结果按 u 的后继顺序排列，与原来逐个 has_edge 判断的结果顺序相同。
+    """
+    succ = graph.successor_ids(u)
+    pred = graph.predecessor_ids(v)
+    if len(succ) == 0 or len(pred) == 0:
+        return succ[:0]
+    _, idx, _ = np.intersect1d(succ, pred, assume_unique=True, return_indices=True)
+    idx.sort()
+    return succ[idx]
+
+
+def default_index_bytes(graph):
+    """桥接词索引的默认内存上限：图的 CSR 数组（正向与反向）大小的 INDEX_BUDGET_RATIO 倍。"""
+    edges = graph.number_of_edges()
+    # indices/weights/rindices/redges 每条边各一项，indptr/rindptr 每个节点各一项
+    graph_bytes = edges * (graph.indices.itemsize + graph.weights.itemsize
+                           + graph.rindices.itemsize + graph.redges.itemsize)
+    graph_bytes += 2 * (len(graph) + 1) * graph.indptr.itemsize
+    return max(MIN_INDEX_BYTES, INDEX_BUDGET_RATIO * graph_bytes)
+
+
+class BridgeIndex:
+    """
+    预先计算的两跳桥接词索引。
+
+    对每个 (word1, word2)，记录桥接词在 word1 后继行中的位置（升序的 int32 数组），
+    因此查询结果的顺序与 successors 一致。
+
+    参数:
+        graph: CompactGraph
+        min_bridges: int，只索引桥接词数不少于该值的单词对，其余查询现场求交集
+        max_bytes: int，索引占用内存的估算上限；按两跳路径数从多到少处理起点，
+            超出预算后停止，未被索引的单词对同样回退到求交集。
+            默认为 default_index_bytes(graph)，与图的大小成正比
+    """
+
+    def __init__(self, graph, min_bridges=2, max_bytes=None):
+        self.graph = graph
+        self.min_bridges = max(1, min_bridges)
+        self.max_bytes = default_index_bytes(graph) if max_bytes is None else max_bytes
+        with span('bridge.index'):
+            self._build()
+
+    def _build(self):
+        g = self.graph
+        self.version = g.version
+        self.nbytes = 0
+        self._pos = {}
+        self._rows = {}  # 起点 -> (已索引的终点数组, 估算占用)
+        self._slots = np.zeros(0, dtype=np.int32)
+        self._garbage = 0
+        n = len(g)
+        if n == 0:
+            return
+        outdeg = g.out_degrees
+        src = np.repeat(np.arange(n), outdeg)
+        # 每个起点出发的两跳路径数，决定了它的查询开销
+        two_hop = np.bincount(src, weights=outdeg[g.indices], minlength=n)
+        parts = []
+        for u in np.argsort(-two_hop, kind='stable').tolist():
+            if two_hop[u] < self.min_bridges:
+                break
+            entries = self._row_entries(u, outdeg)
+            if entries is not None and not self._add_row(u, entries, parts):
+                break
+        self._slots = np.concatenate([self._slots] + parts)
+
+    def _row_entries(self, u, outdeg):
+        """计算起点 u 的所有单词对及桥接词位置，只保留桥接词数达到阈值的。"""
+        g = self.graph
+        mids = g.successor_ids(u)
+        targets = gather_rows(g.indptr, g.indices, mids)
+        slots = np.repeat(np.arange(len(mids), dtype=np.int32), outdeg[mids])
+        # slots 本身已升序，稳定排序后同一终点内的桥接词仍按后继顺序排列
+        order = np.argsort(targets, kind='stable')
+        targets = targets[order]
+        slots = slots[order]
+        uniq, counts = np.unique(targets, return_counts=True)
+        keep = counts >= self.min_bridges
+        if not keep.any():
+            return None
+        return uniq[keep], counts[keep], slots[np.repeat(keep, counts)]
+
+    def _add_row(self, u, entries, parts):
+        uniq, counts, slots = entries
+        cost = len(slots) * 4 + len(uniq) * PAIR_OVERHEAD + ROW_OVERHEAD
+        if self.nbytes + cost > self.max_bytes:
+            return False
+        self.nbytes += cost
+        size = len(self._slots) + sum(len(p) for p in parts)
+        starts = np.cumsum(counts) - counts + size
+        key_base = u << 32
+        for v, start, count in zip(uniq.tolist(), starts.tolist(), counts.tolist()):
+            self._pos[key_base | v] = (start, start + count)
+        self._rows[u] = (uniq, cost)
+        parts.append(slots)
+        return True
+
+    def _drop_row(self, u):
+        uniq, cost = self._rows.pop(u)
+        key_base = u << 32
+        for v in uniq.tolist():
+            start, stop = self._pos.pop(key_base | v)
+            self._garbage += stop - start
+        self.nbytes -= cost
+
+    @property
+    def is_stale(self):
+        return self.version != self.graph.version
+
+    def refresh(self, delta):
+        """
+        图追加文本后增量更新索引，只重新计算受影响的起点。
+
+        新边 u->w 会改变 u 的桥接词，也会给 w 的每个前驱带来新的单词对；
+        其余起点的条目不变（追加不会改变已有边在行内的位置）。
+
+        参数:
+            delta: CompactGraph.append_words 返回的 GraphDelta
+        """
+        g = self.graph
+        affected = set(delta.new_src.tolist())
+        for w in np.unique(delta.new_src).tolist():
+            affected.update(g.predecessor_ids(w).tolist())
+        outdeg = g.out_degrees
+        parts = []
+        for u in sorted(affected):
+            if u in self._rows:
+                self._drop_row(u)
+            entries = self._row_entries(u, outdeg)
+            if entries is not None:
+                self._add_row(u, entries, parts)
+        self._slots = np.concatenate([self._slots] + parts)
+        self.version = g.version
+        if self._garbage > len(self._slots) // 2:
+            # 废弃的位置太多时整体重建一次，回收空间
+            self._build()
+
+    def __len__(self):
+        return len(self._pos)
+
+    def lookup(self, u, v):
+        """返回 u 到 v 的桥接词 ID 数组。"""
+        row_span = self._pos.get((u << 32) | v)
+        if row_span is None:
+            return bridge_ids(self.graph, u, v)
+        slots = self._slots[row_span[0]:row_span[1]]
+        return self.graph.indices[self.graph.indptr[u] + slots]
+
+
+def find_bridge_ids(graph, u, v, index=None):
+    if index is not None:
+        return index.lookup(u, v)
+    return bridge_ids(graph, u, v)
+
+
+def generate_text(graph, words, index=None, rng=random, tables=None):
+    """
+    在相邻两个单词之间插入一个随机选取的桥接词。
+
+    参数:
+        graph: CompactGraph
+        words: list，已清洗的单词列表
+        index: 可选，BridgeIndex
+        rng: 提供 choice 方法的随机数生成器
+        tables: 可选，AliasTables；给出时按 word1->桥接词 的出现次数加权抽取，
+            否则均匀抽取
+
+    返回:
+        list，插入桥接词后的单词列表
+    """
+    new_words = []
+    for i in range(len(words) - 1):
+        w1, w2 = words[i], words[i + 1]
+        new_words.append(w1)
+        u, v = graph.vocab.get(w1), graph.vocab.get(w2)
+        if u is not None and v is not None:
+            bridges = find_bridge_ids(graph, u, v, index)
+            if len(bridges):
+                if tables is not None:
+                    bridge = tables.choose_among(u, bridges, rng)
+                else:
+                    bridge = rng.choice(bridges.tolist())
+                new_words.append(graph.vocab[bridge])
+    if words:
+        new_words.append(words[-1])
+    return new_words
+
+
+def format_bridge_words(word1, word2, bridge_words):
+    if not bridge_words:
+        return f"No bridge words from {word1} to {word2}!"
+    if len(bridge_words) == 1:
+        return (
+            f"The bridge word from {word1} to {word2} "
+            f"is: {bridge_words[0]}."
+        )
+    formatted = (
+        ", ".join(bridge_words[:-1])
+        + f", and {bridge_words[-1]}"
+    )
+    return f"The bridge words from {word1} to {word2} are: {formatted}."
+
+
+def bridge_words_message(graph, word1, word2, index=None):
+    """
+    查询桥接词并返回与原 GUI 完全相同的提示文本。
+
+    参数:
+        graph: CompactGraph 或 None
+        word1, word2: str
+        index: 可选，BridgeIndex
+
+    返回:
+        str，结果文本
+    """
+    if graph is None:
+        return NO_GRAPH_MESSAGE
+    word1 = word1.lower().strip()
+    word2 = word2.lower().strip()
+    u = graph.vocab.get(word1)
+    v = graph.vocab.get(word2)
+    if u is None or v is None:
+        return f"No {word1} or {word2} in the graph!"
+    words = graph.vocab
+    bridges = [words[w] for w in find_bridge_ids(graph, u, v, index).tolist()]
+    return format_bridge_words(word1, word2, bridges)
+
+
+class BatchStats:
+    """批量查询的吞吐统计。"""
+
+    def __init__(self):
+        self.pairs = 0
+        self.seconds = 0.0
+
+    @property
+    def pairs_per_second(self):
+        return self.pairs / self.seconds if self.seconds > 0 else 0.0
+
+    def __str__(self):
+        return (f"共查询 {self.pairs} 对，用时 {self.seconds:.2f} 秒，"
+                f"吞吐 {self.pairs_per_second:,.0f} 对/秒")
+
+
+def read_pairs(path):
+    """从文本文件读取单词对，每行两个词，以空白或制表符分隔，空行跳过。"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2:
+                yield parts[0], parts[1]
+
+
+def _query_chunk(shared, chunk):
+    graph, index = shared
+    return [bridge_words_message(graph, w1, w2, index) for w1, w2 in chunk]
+
+
+def _chunks(pairs, chunksize):
+    it = iter(pairs)
+    while True:
+        chunk = list(islice(it, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_bridge_results(graph, pairs, index=None, processes=None,
+                        chunksize=2000, stats=None):
+    """
+    批量查询桥接词，按输入顺序流式产出结果。
+
+    参数:
+        graph: CompactGraph
+        pairs: 可迭代的 (word1, word2)
+        index: 可选，BridgeIndex
+        processes: int，进程数，默认 CPU 核数；为 1 时在当前进程内计算
+        chunksize: int，每个任务包含的单词对数
+        stats: 可选，BatchStats，边产出边更新
+
+    返回:
+        生成器，产出 (word1, word2, 结果文本)，文本与 bridge_words_message 相同
+    """
+    if stats is None:
+        stats = BatchStats()
+    if processes is None:
+        processes = os.cpu_count() or 1
+    start = time.perf_counter()
+    sent = deque()
+    # 限制尚未取回结果的任务数，输入再大内存也不会随之增长
+    in_flight = threading.BoundedSemaphore(max(1, processes) * 4)
+
+    def feed():
+        for chunk in _chunks(pairs, chunksize):
+            in_flight.acquire()
+            sent.append(chunk)
+            yield chunk
+
+    results = run_shared_pool(_query_chunk, feed(), (graph, index), processes)
+    try:
+        for messages in results:
+            chunk = sent.popleft()
+            in_flight.release()
+            stats.pairs += len(chunk)
+            stats.seconds = time.perf_counter() - start
+            for (w1, w2), message in zip(chunk, messages):
+                yield w1, w2, message
+    finally:
+        results.close()
+
+
+def bridge_batch_file(graph, pairs_path, out_path, index=None, processes=None):
+    """
+    从文件读取单词对批量查询，结果按 “word1\tword2\t结果” 逐行写入 out_path。
+
+    返回:
+        BatchStats
+    """
+    stats = BatchStats()
+    with open(out_path, 'w', encoding='utf-8') as out:
+        for w1, w2, message in iter_bridge_results(graph, read_pairs(pairs_path), index,
+                                                   processes, stats=stats):
+            out.write(f"{w1}\t{w2}\t{message}\n")
+    return stats
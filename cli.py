@@ -0,0 +1,217 @@
+"""
+文本图分析器的命令行入口，不依赖 tkinter 和 matplotlib，可在无显示器的服务器上运行。
+
+用法示例:
+    python cli.py bridge test.txt word1 word2
+    python cli.py path test.txt word1 [word2]
+    python cli.py pagerank test.txt --damping 0.85
+"""
+import argparse
+import random
+import sys
+import time
+
+START_TIME = time.perf_counter()
+COLD_START_BUDGET = 1.0  # 秒，单次桥接词查询从启动到输出的目标耗时
+
+
+def _load(args):
+    from text_graph import load_graph
+    return load_graph(args.file, use_snapshot=not args.no_snapshot)
+
+
+def cmd_build(args):
+    graph = _load(args)
+    print(f"节点数: {len(graph)}，边数: {graph.number_of_edges()}")
+
+
+def cmd_build_corpus(args):
+    from text_graph import build_from_paths, expand_paths
+    from snapshot import save_snapshot
+    paths = expand_paths(args.spec)
+    start = time.perf_counter()
+    graph = build_from_paths(paths, args.processes, args.boundary)
+    print(f"{len(paths)} 个文件，节点数: {len(graph)}，边数: {graph.number_of_edges()}，"
+          f"用时 {time.perf_counter() - start:.2f} 秒")
+    if args.output:
+        save_snapshot(graph, args.output)
+
+
+def cmd_bridge(args):
+    from bridge_words import bridge_words_message
+    print(bridge_words_message(_load(args), args.word1, args.word2))
+
+
+def cmd_bridge_batch(args):
+    from bridge_words import BridgeIndex, bridge_batch_file
+    graph = _load(args)
+    index = BridgeIndex(graph) if args.index else None
+    stats = bridge_batch_file(graph, args.pairs, args.output, index, args.processes)
+    print(stats, file=sys.stderr)
+
+
+def _tables(graph, args):
+    if not args.weighted:
+        return None
+    from sampling import AliasTables
+    return AliasTables(graph)
+
+
+def cmd_generate(args):
+    from text_graph import clean_text
+    from bridge_words import generate_text
+    words = clean_text(args.text)
+    if len(words) < 2:
+        print("请输入至少两个单词！")
+        return
+    rng = random.Random(args.seed)
+    graph = _load(args)
+    print(" ".join(generate_text(graph, words, rng=rng, tables=_tables(graph, args))))
+
+
+def cmd_path(args):
+    from shortest_path import shortest_path_message
+    message, _ = shortest_path_message(_load(args), args.word1, args.word2 or '')
+    print(message)
+
+
+def cmd_path_batch(args):
+    from shortest_path import shortest_path_batch_file
+    start = time.perf_counter()
+    count = shortest_path_batch_file(_load(args), args.pairs, args.output)
+    print(f"{count} 个单词对，用时 {time.perf_counter() - start:.2f} 秒", file=sys.stderr)
+
+
+def cmd_pagerank(args):
+    from pagerank import (PageRankRanking, calculate_pagerank, format_pagerank,
+                          format_top_pagerank, pagerank_vector)
+    graph = _load(args)
+    if args.top is None and args.output is None:
+        print(format_pagerank(calculate_pagerank(graph, args.damping)), end='')
+        return
+    ranking = PageRankRanking(graph.vocab, pagerank_vector(graph, args.damping)[0])
+    if args.top is not None:
+        print(format_top_pagerank(ranking, args.top), end='')
+    if args.output is not None:
+        rows = ranking.export(args.output)
+        print(f"已导出 {rows} 个单词的排名到：{args.output}", file=sys.stderr)
+
+
+def cmd_walk(args):
+    from random_walk import random_walk_path, save_walk_results
+    graph = _load(args)
+    nodes, edges = random_walk_path(graph, random.Random(args.seed),
+                                    tables=_tables(graph, args))
+    save_walk_results(nodes, edges, args.output)
+    print(" -> ".join(nodes))
+
+
+def cmd_walks(args):
+    from random_walk import random_walks
+    graph = _load(args)
+    start = time.perf_counter()
+    tables = _tables(graph, args)
+    batch = random_walks(graph, args.num_walks, seed=args.seed, max_steps=args.max_steps,
+                         processes=args.processes, tables=tables)
+    seconds = time.perf_counter() - start
+    lengths = batch.lengths
+    print(f"{len(batch)} 次游走，平均 {lengths.mean() if len(batch) else 0:.1f} 步，"
+          f"用时 {seconds:.2f} 秒（{lengths.sum() / max(seconds, 1e-9):,.0f} 步/秒）")
+    if args.output:
+        words = graph.vocab
+        with open(args.output, "w", encoding="utf-8") as f:
+            for i in range(len(batch)):
+                f.write(" ".join(words[v] for v in batch[i].tolist()) + "\n")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="文本图分析器（命令行版）")
+    parser.add_argument('--no-snapshot', action='store_true',
+                        help="不读写图快照，每次都重新构建")
+    parser.add_argument('--time', action='store_true',
+                        help="在标准错误输出从启动到结束的耗时")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('build', help="构建图并保存快照")
+    p.add_argument('file')
+    p.set_defaults(func=cmd_build)
+
+    p = sub.add_parser('build-corpus', help="并行构建目录或通配符下的多个文件")
+    p.add_argument('spec', help="目录、通配符（支持 **）或单个文件")
+    p.add_argument('-j', '--processes', type=int, default=None)
+    p.add_argument('--boundary', choices=['join', 'split'], default='join',
+                   help="join: 前后文件首尾单词相连；split: 不产生跨文件的边")
+    p.add_argument('-o', '--output', help="保存快照的路径")
+    p.set_defaults(func=cmd_build_corpus)
+
+    p = sub.add_parser('bridge', help="查询桥接词")
+    p.add_argument('file')
+    p.add_argument('word1')
+    p.add_argument('word2')
+    p.set_defaults(func=cmd_bridge)
+
+    p = sub.add_parser('bridge-batch', help="从文件批量查询桥接词")
+    p.add_argument('file')
+    p.add_argument('pairs', help="每行两个单词")
+    p.add_argument('output', help="结果文件，每行 word1\\tword2\\t结果")
+    p.add_argument('-j', '--processes', type=int, default=None)
+    p.add_argument('--index', action='store_true', help="先构建桥接词索引")
+    p.set_defaults(func=cmd_bridge_batch)
+
+    p = sub.add_parser('generate', help="根据桥接词生成新文本")
+    p.add_argument('file')
+    p.add_argument('text')
+    p.add_argument('--seed', type=int, default=None)
+    p.add_argument('--weighted', action='store_true', help="按出现次数加权选择桥接词")
+    p.set_defaults(func=cmd_generate)
+
+    p = sub.add_parser('path', help="最短路径查询，省略 word2 时查询到所有单词")
+    p.add_argument('file')
+    p.add_argument('word1')
+    p.add_argument('word2', nargs='?')
+    p.set_defaults(func=cmd_path)
+
+    p = sub.add_parser('path-batch', help="从文件批量查询最短路径，同一起点只搜索一次")
+    p.add_argument('file')
+    p.add_argument('pairs', help="每行两个单词")
+    p.add_argument('output', help="结果文件，每行 word1\\tword2\\t长度\\t路径")
+    p.set_defaults(func=cmd_path_batch)
+
+    p = sub.add_parser('pagerank', help="计算 PageRank")
+    p.add_argument('file')
+    p.add_argument('--damping', type=float, default=0.85)
+    p.add_argument('--top', type=int, help="只输出前 K 名")
+    p.add_argument('-o', '--output', help="把完整排名导出为 CSV（.parquet 结尾时导出 Parquet）")
+    p.set_defaults(func=cmd_pagerank)
+
+    p = sub.add_parser('walk', help="随机游走")
+    p.add_argument('file')
+    p.add_argument('--seed', type=int, default=None)
+    p.add_argument('--output', default="random_walk_results.txt")
+    p.add_argument('--weighted', action='store_true', help="按边权选择下一个单词")
+    p.set_defaults(func=cmd_walk)
+
+    p = sub.add_parser('walks', help="批量随机游走（向量化，多进程）")
+    p.add_argument('file')
+    p.add_argument('-n', '--num-walks', type=int, default=100000)
+    p.add_argument('--seed', type=int, default=None)
+    p.add_argument('--max-steps', type=int, default=None)
+    p.add_argument('-j', '--processes', type=int, default=None)
+    p.add_argument('-o', '--output', help="每行一次游走经过的单词")
+    p.add_argument('--weighted', action='store_true', help="按边权选择下一个单词")
+    p.set_defaults(func=cmd_walks)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+    if args.time:
+        elapsed = time.perf_counter() - START_TIME
+        status = "达标" if elapsed <= COLD_START_BUDGET else "超出目标"
+        print(f"耗时 {elapsed:.3f} 秒（目标 {COLD_START_BUDGET} 秒，{status}）",
+              file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
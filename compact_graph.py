@@ -0,0 +1,551 @@
+from itertools import islice
+
+import numpy as np
+
+from instrument import span
+
+BIGRAM_CHUNK = 1 << 20  # 统计相邻单词对时每块的单词数
+
+
+class Vocabulary:
+    """
+    单词与整数 ID 的双向映射，每个不同的单词只保存一份。
+
+    ID 按单词第一次出现的顺序分配，与 networkx 中节点的插入顺序一致。
+    每个单词的元数据放在与 ID 对齐的平行数组中：
+    freq 是出现次数，first 是第一次出现时在语料中的单词偏移（未知时为 -1）。
+    没有经过 count 统计的单词（例如由 networkx 图转换而来）两项分别为 0 和 -1。
+    """
+
+    __slots__ = ('words', 'index', 'tokens', '_freq', '_first')
+
+    def __init__(self, words=()):
+        self.words = []
+        self.index = {}
+        self.tokens = 0  # 已统计的单词总数，即下一个单词在语料中的偏移
+        self._freq = np.zeros(0, dtype=np.int64)
+        self._first = np.zeros(0, dtype=np.int64)
+        for word in words:
+            self.add(word)
+
+    def add(self, word):
+        idx = self.index.get(word)
+        if idx is None:
+            idx = len(self.words)
+            self.index[word] = idx
+            self.words.append(word)
+        return idx
+
+    def get(self, word, default=None):
+        return self.index.get(word, default)
+
+    @property
+    def freq(self):
+        self._reserve(len(self))
+        return self._freq[:len(self)]
+
+    @property
+    def first(self):
+        self._reserve(len(self))
+        return self._first[:len(self)]
+
+    def _reserve(self, n):
+        # 平行数组按倍数扩容，追加文本时不必每次复制；
+        # 从快照内存映射的只读数组在第一次修改前复制一份
+        if len(self._freq) >= n and self._freq.flags.writeable:
+            return
+        size = max(n, 2 * len(self._freq), 16)
+        freq = np.zeros(size, dtype=np.int64)
+        first = np.full(size, -1, dtype=np.int64)
+        freq[:len(self._freq)] = self._freq
+        first[:len(self._first)] = self._first
+        self._freq, self._first = freq, first
+
+    def count(self, ids):
+        """
+        把一段连续语料（单词 ID 数组）计入词频，并记录新单词第一次出现的偏移。
+
+        参数:
+            ids: 单词 ID 数组，紧接在已统计的 tokens 个单词之后
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        n = len(self)
+        self._reserve(n)
+        self._freq[:n] += np.bincount(ids, minlength=n)
+        unseen = self._first[ids] < 0
+        if unseen.any():
+            pos = np.flatnonzero(unseen)
+            first = np.full(n, np.iinfo(np.int64).max)
+            np.minimum.at(first, ids[pos], pos + self.tokens)
+            hit = first < np.iinfo(np.int64).max
+            self._first[:n][hit] = first[hit]
+        self.tokens += len(ids)
+
+    def merge_counts(self, ids, freq, first, base=None):
+        """
+        并入另一段语料的统计结果（例如并行构建时单个文件的局部词表）。
+
+        不修改 tokens，由调用方在并入整段后累加。
+
+        参数:
+            ids: 该段词表中各单词在本词表中的 ID（互不相同）
+            freq: 各单词在该段中的词频
+            first: 各单词在该段中第一次出现的偏移，以该段开头为 0
+            base: 该段开头在语料中的偏移，默认是当前的 tokens
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        first = np.asarray(first, dtype=np.int64)
+        self._reserve(len(self))
+        self._freq[ids] += np.asarray(freq, dtype=np.int64)
+        unseen = (self._first[ids] < 0) & (first >= 0)
+        self._first[ids[unseen]] = first[unseen] + (self.tokens if base is None else base)
+
+    def nbytes(self):
+        """词表占用的内存字节数（单词字符串、查找字典和元数据数组）。"""
+        import sys
+        return (sum(map(sys.getsizeof, self.words)) + sys.getsizeof(self.words)
+                + sys.getsizeof(self.index) + self._freq.nbytes + self._first.nbytes)
+
+    def __len__(self):
+        return len(self.words)
+
+    def __contains__(self, word):
+        return word in self.index
+
+    def __getitem__(self, idx):
+        return self.words[idx]
+
+    def __iter__(self):
+        return iter(self.words)
+
+
+class CompactGraph:
+    """
+    基于 CSR 数组的紧凑有向图。
+
+    正向邻接: indptr[u]:indptr[u+1] 区间内的 indices/weights 是 u 的后继及边权，
+    每行内的顺序与边第一次出现的顺序一致（即 networkx 的 successors 顺序）。
+    反向邻接: rindptr/rindices 给出前驱，redges 指向正向数组中的边位置，
+    因此边权只存一份。
+
+    单词级接口（in、successors、predecessors、has_edge、out_degree 等）
+    与 networkx.DiGraph 保持一致，原来基于 networkx 的代码可以直接使用。
+
+    last_word 是语料的最后一个单词，追加文本时用来补上跨越边界的那条边；
+    version 每次修改图时加一，派生结构（桥接词索引、PageRank 等）据此判断是否过期。
+    """
+
+    def __init__(self, vocab, indptr, indices, weights,
+                 rindptr=None, rindices=None, redges=None, last_word=None):
+        self.vocab = vocab
+        self.last_word = last_word
+        self.version = 0
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        if rindptr is None:
+            rindptr, rindices, redges = _reverse_csr(len(vocab), indptr, indices)
+        self.rindptr = rindptr
+        self.rindices = rindices
+        self.redges = redges
+        self._edge_keys = None
+        self._edge_key_slots = None
+        self._nx = None
+
+    # ---------- 构建 ----------
+
+    @classmethod
+    def from_edges(cls, vocab, src, dst, weight, last_word=None):
+        """
+        由按出现顺序排列的边列表构建图。
+
+        参数:
+            vocab: Vocabulary
+            src, dst: 整数数组，边的起点和终点 ID
+            weight: 整数数组，边权
+        """
+        n = len(vocab)
+        with span('graph.build_csr'):
+            src = np.asarray(src, dtype=np.int64)
+            dst = np.asarray(dst, dtype=np.int32)
+            weight = np.asarray(weight, dtype=np.int32)
+            # 稳定排序保证每行内仍保持边出现的先后顺序
+            order = np.argsort(src, kind='stable')
+            indptr = np.zeros(n + 1, dtype=np.int64)
+            np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+            indices = dst[order]
+            weights = weight[order]
+            # 反向邻接同样按边出现顺序排列，和 networkx 的 predecessors 一致
+            slot_of = np.empty(len(order), dtype=np.int64)
+            slot_of[order] = np.arange(len(order))
+            rorder = np.argsort(dst, kind='stable')
+            rindptr = np.zeros(n + 1, dtype=np.int64)
+            np.cumsum(np.bincount(dst, minlength=n), out=rindptr[1:])
+            rindices = src[rorder].astype(np.int32)
+            redges = slot_of[rorder].astype(np.int32)
+        return cls(vocab, indptr, indices, weights, rindptr, rindices, redges, last_word)
+
+    @classmethod
+    def from_words(cls, words):
+        """由单词序列（列表或生成器）构建图，结果与 build_graph 相同。"""
+        vocab = Vocabulary()
+        # 与 build_graph 一致：不足两个单词时图为空，但仍记住这个单词以便追加
+        src, dst, weight, last_word = bigram_arrays(vocab, words)
+        return cls.from_edges(vocab, src, dst, weight, last_word)
+
+    @classmethod
+    def from_networkx(cls, Graph):
+        vocab = Vocabulary(Graph.nodes())
+        edges = list(Graph.edges(data='weight', default=1))
+        src = [vocab.index[a] for a, _, _ in edges]
+        dst = [vocab.index[b] for _, b, _ in edges]
+        weight = [w for _, _, w in edges]
+        return cls.from_edges(vocab, src, dst, weight)
+
+    def to_networkx(self):
+        """转换为 networkx.DiGraph（用于绘图），结果会被缓存。"""
+        if self._nx is None:
+            import networkx as nx
+            Graph = nx.DiGraph()
+            Graph.add_nodes_from(self.vocab.words)
+            words = self.vocab.words
+            src = np.repeat(np.arange(len(words)), np.diff(self.indptr))
+            Graph.add_weighted_edges_from(
+                (words[a], words[b], int(w))
+                for a, b, w in zip(src.tolist(), self.indices.tolist(),
+                                   self.weights.tolist()))
+            self._nx = Graph
+        return self._nx
+
+    def append_words(self, words):
+        """
+        把新文本的单词追加到图中，只处理新文本，不重新构建整张图。
+
+        新文本第一个单词与原语料最后一个单词之间的边也会被加入。
+        已有边的权重原地累加；新边追加到所在行的末尾，原有边在行内的位置不变。
+
+        返回:
+            GraphDelta，描述本次变化，供派生结构增量更新
+        """
+        n_old = len(self.vocab)
+        src, dst, count, self.last_word = bigram_arrays(self.vocab, words, self.last_word)
+        n = len(self.vocab)
+        if not self.weights.flags.writeable:
+            # 从快照映射加载的数组是只读的，修改前复制一份
+            self.weights = np.array(self.weights)
+
+        # 所有新单词对用一次二分查找对照已有的边；涉及新单词的单词对一定找不到
+        keys = (src << 32) | dst
+        edge_keys, edge_key_slots = self._ensure_edge_keys()
+        pos = np.searchsorted(edge_keys, keys)
+        hit = pos < len(edge_keys)
+        hit[hit] = edge_keys[pos[hit]] == keys[hit]
+        updated = edge_key_slots[pos[hit]]
+        self.weights[updated] += count[hit].astype(self.weights.dtype)
+        new = ~hit
+        # bigram_arrays 按第一次出现的顺序返回，新边在行末尾的顺序因此与逐词追加相同
+        new_src, new_dst, new_w = src[new], dst[new], count[new]
+
+        indptr, slot_map, new_slots = _append_to_rows(self.indptr, n, new_src)
+        m = int(indptr[-1])
+        indices = np.empty(m, dtype=np.int32)
+        indices[slot_map] = self.indices
+        indices[new_slots] = new_dst
+        weights = np.empty(m, dtype=np.int32)
+        weights[slot_map] = self.weights
+        weights[new_slots] = new_w
+        rindptr, rslot_map, rnew_slots = _append_to_rows(self.rindptr, n, new_dst)
+        rindices = np.empty(m, dtype=np.int32)
+        rindices[rslot_map] = self.rindices
+        rindices[rnew_slots] = new_src
+        redges = np.empty(m, dtype=np.int32)
+        redges[rslot_map] = slot_map[self.redges]
+        redges[rnew_slots] = new_slots
+
+        old_indptr = self.indptr
+        self.indptr, self.indices, self.weights = indptr, indices, weights
+        self.rindptr, self.rindices, self.redges = rindptr, rindices, redges
+        # 已有边的键不变，只需换成新位置；新边的键按序插入，不必重新排序整个数组
+        new_keys = keys[new]
+        order = np.argsort(new_keys)
+        at = np.searchsorted(edge_keys, new_keys[order])
+        self._edge_keys = np.insert(edge_keys, at, new_keys[order])
+        self._edge_key_slots = np.insert(slot_map[edge_key_slots], at, new_slots[order])
+        self.version += 1
+        if self._nx is not None:
+            words = self.vocab.words
+            for u, v, c in zip(src.tolist(), dst.tolist(), count.tolist()):
+                a, b = words[u], words[v]
+                if self._nx.has_edge(a, b):
+                    self._nx[a][b]['weight'] += c
+                else:
+                    self._nx.add_edge(a, b, weight=c)
+
+        updated_rows = np.searchsorted(old_indptr, updated, side='right') - 1
+        return GraphDelta(n_old, slot_map, new_src, new_dst, new_slots, slot_map[updated],
+                          np.union1d(updated_rows, new_src))
+
+    # ---------- ID 级接口 ----------
+
+    @property
+    def out_degrees(self):
+        return np.diff(self.indptr)
+
+    def number_of_nodes(self):
+        return len(self.vocab)
+
+    def number_of_edges(self):
+        return len(self.indices)
+
+    def successor_ids(self, u):
+        return self.indices[self.indptr[u]:self.indptr[u + 1]]
+
+    def successor_weights(self, u):
+        return self.weights[self.indptr[u]:self.indptr[u + 1]]
+
+    def predecessor_ids(self, v):
+        return self.rindices[self.rindptr[v]:self.rindptr[v + 1]]
+
+    def _ensure_edge_keys(self):
+        """
+        所有边的键 (起点 << 32) | 终点（升序）及其在正向数组中的位置，用于二分查找边。
+
+        第一次使用时排序一次，之后由 append_words 增量维护。
+        """
+        if self._edge_keys is None:
+            rows = np.repeat(np.arange(len(self.indptr) - 1, dtype=np.int64),
+                             np.diff(self.indptr))
+            keys = (rows << 32) | self.indices.astype(np.int64)
+            order = np.argsort(keys)
+            self._edge_keys = keys[order]
+            self._edge_key_slots = order.astype(np.int64)
+        return self._edge_keys, self._edge_key_slots
+
+    def edge_slot(self, u, v):
+        """返回边 u->v 在正向数组中的位置，不存在时返回 -1。"""
+        keys, slots = self._ensure_edge_keys()
+        key = (int(u) << 32) | int(v)
+        k = np.searchsorted(keys, key)
+        if k < len(keys) and keys[k] == key:
+            return int(slots[k])
+        return -1
+
+    def has_edge_id(self, u, v):
+        return self.edge_slot(u, v) >= 0
+
+    # ---------- 单词级接口（兼容 networkx） ----------
+
+    def __len__(self):
+        return len(self.vocab)
+
+    def __contains__(self, word):
+        return word in self.vocab
+
+    def __iter__(self):
+        return iter(self.vocab.words)
+
+    def nodes(self):
+        return list(self.vocab.words)
+
+    def successors(self, word):
+        words = self.vocab.words
+        return (words[v] for v in self.successor_ids(self.vocab.index[word]).tolist())
+
+    def predecessors(self, word):
+        words = self.vocab.words
+        return (words[u] for u in self.predecessor_ids(self.vocab.index[word]).tolist())
+
+    def has_edge(self, a, b):
+        u, v = self.vocab.get(a), self.vocab.get(b)
+        if u is None or v is None:
+            return False
+        return self.has_edge_id(u, v)
+
+    def out_degree(self, word):
+        u = self.vocab.index[word]
+        return int(self.indptr[u + 1] - self.indptr[u])
+
+    def weight(self, a, b):
+        slot = self.edge_slot(self.vocab.index[a], self.vocab.index[b])
+        if slot < 0:
+            raise KeyError((a, b))
+        return int(self.weights[slot])
+
+    def edges(self):
+        words = self.vocab.words
+        src = np.repeat(np.arange(len(words)), np.diff(self.indptr))
+        return [(words[a], words[b], int(w))
+                for a, b, w in zip(src.tolist(), self.indices.tolist(),
+                                   self.weights.tolist())]
+
+
+class GraphDelta:
+    """
+    一次 append_words 带来的变化。
+
+    属性:
+        old_nodes: 追加前的节点数，ID 不小于它的都是新节点
+        slot_map: 旧边位置 -> 新边位置
+        new_src, new_dst, new_slots: 新增边的起点、终点及其在正向数组中的位置
+        updated_slots: 权重发生变化的已有边（新位置）
+        changed_rows: 出边集合或出边权重发生变化的节点
+    """
+
+    def __init__(self, old_nodes, slot_map, new_src, new_dst, new_slots,
+                 updated_slots, changed_rows):
+        self.old_nodes = old_nodes
+        self.slot_map = slot_map
+        self.new_src = new_src
+        self.new_dst = new_dst
+        self.new_slots = new_slots
+        self.updated_slots = updated_slots
+        self.changed_rows = changed_rows
+
+
+def intern_words(vocab, words):
+    """
+    把单词列表转换成 ID 数组，新单词按第一次出现的顺序加入 vocab。
+
+    去重（dict.fromkeys）和查表（map）都在 C 层完成，Python 循环只处理新单词。
+    """
+    index = vocab.index
+    for word in [w for w in dict.fromkeys(words) if w not in index]:
+        vocab.add(word)
+    return np.fromiter(map(index.__getitem__, words), dtype=np.int64, count=len(words))
+
+
+def _count_keys(keys):
+    """
+    对键数组去重计数，同时求每个键第一次出现的下标。
+
+    比 np.unique(return_index=True) 快：后者需要稳定排序，
+    这里用普通排序，再对每段下标取最小值。
+    """
+    order = np.argsort(keys)
+    ordered = keys[order]
+    starts = np.flatnonzero(np.r_[True, ordered[1:] != ordered[:-1]])
+    counts = np.diff(np.r_[starts, len(keys)])
+    return ordered[starts], np.minimum.reduceat(order, starts), counts
+
+
+def _merge_counts(table, keys, first, counts):
+    """
+    把一块的计数结果并入按键排序的累计表 (键, 第一次出现的位置, 次数)。
+
+    已有的键只累加次数（第一次出现的位置一定更早），新键按顺序插入。
+    累计表的大小只与不同的单词对数有关。
+    """
+    if table is None:
+        return keys, first, counts
+    tkeys, tfirst, tcounts = table
+    pos = np.searchsorted(tkeys, keys)
+    hit = pos < len(tkeys)
+    hit[hit] = tkeys[pos[hit]] == keys[hit]
+    tcounts[pos[hit]] += counts[hit]
+    new = ~hit
+    at = pos[new]
+    return (np.insert(tkeys, at, keys[new]), np.insert(tfirst, at, first[new]),
+            np.insert(tcounts, at, counts[new]))
+
+
+def bigram_arrays(vocab, words, last_word=None, chunk_size=BIGRAM_CHUNK):
+    """
+    向量化统计相邻单词对的出现次数。
+
+    按块把单词转成 ID 数组，相邻单词对编码为 (起点 << 32) | 终点，
+    排序后计数并记下第一次出现的位置，再并入按键排序的累计表，
+    因此内存只与不同的单词对数和块大小有关，与语料长度无关。
+    结果与逐词累加字典完全相同，边按第一次出现的顺序排列。
+    同时用 Vocabulary.count 统计词频和第一次出现的偏移。
+
+    参数:
+        vocab: Vocabulary，会把新单词加入其中
+        words: 单词序列（列表或生成器）
+        last_word: 可选，前一段语料的最后一个单词，与 words 的第一个单词相连
+        chunk_size: int，每块的单词数
+
+    返回:
+        (src, dst, weight, 最后一个单词)，前三项是 int64 数组
+    """
+    it = iter(words)
+    empty = np.zeros(0, dtype=np.int64)
+    # 前一段语料的最后一个单词已经计过词频，除非它此前没能成为节点
+    counted = last_word is not None and last_word in vocab
+    if last_word is None:
+        last_word = next(it, None)
+        if last_word is None:
+            return empty, empty, empty, None
+    table = None
+    prev = None
+    offset = 0
+    while True:
+        chunk = list(islice(it, chunk_size))
+        if not chunk:
+            break
+        with span('graph.intern'):
+            if prev is None:
+                # 单词只有在出现在某条边上时才成为节点，所以到这里才加入词表
+                ids = intern_words(vocab, [last_word] + chunk)
+                vocab.count(ids[1:] if counted else ids)
+            else:
+                ids = np.concatenate([[prev], intern_words(vocab, chunk)])
+                vocab.count(ids[1:])
+        with span('graph.count_bigrams'):
+            pair_keys = (ids[:-1] << 32) | ids[1:]
+            uniq, first, count = _count_keys(pair_keys)
+            table = _merge_counts(table, uniq, first + offset, count)
+        offset += len(pair_keys)
+        prev = int(ids[-1])
+        last_word = chunk[-1]
+    if table is None:
+        return empty, empty, empty, last_word
+    uniq, first, count = table
+    order = np.argsort(first)
+    uniq = uniq[order]
+    return uniq >> 32, uniq & 0xFFFFFFFF, count[order], last_word
+
+
+def count_bigrams(vocab, words, last_word=None):
+    """
+    统计相邻单词对的出现次数，按第一次出现的顺序返回。
+
+    参数:
+        vocab: Vocabulary，会把新单词加入其中
+        words: 单词序列
+        last_word: 可选，前一段语料的最后一个单词，与 words 的第一个单词相连
+
+    返回:
+        ({(起点 ID, 终点 ID): 次数}, 最后一个单词)
+    """
+    src, dst, weight, last_word = bigram_arrays(vocab, words, last_word)
+    return dict(zip(zip(src.tolist(), dst.tolist()), weight.tolist())), last_word
+
+
+def _append_to_rows(indptr, n, rows):
+    """
+    在 CSR 各行末尾追加新元素，行数扩展到 n。
+
+    返回:
+        (新 indptr, 旧元素的新位置, 新元素的位置)，新元素按 rows 中的顺序排在各自行末尾
+    """
+    n_old = len(indptr) - 1
+    old_deg = np.zeros(n, dtype=np.int64)
+    old_deg[:n_old] = np.diff(indptr)
+    new_indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(old_deg + np.bincount(rows, minlength=n), out=new_indptr[1:])
+    old_rows = np.repeat(np.arange(n_old), old_deg[:n_old])
+    old_pos = new_indptr[old_rows] + np.arange(int(indptr[-1])) - indptr[old_rows]
+    order = np.argsort(rows, kind='stable')
+    sorted_rows = rows[order]
+    rank = np.arange(len(rows)) - np.searchsorted(sorted_rows, sorted_rows)
+    new_pos = np.empty(len(rows), dtype=np.int64)
+    new_pos[order] = new_indptr[sorted_rows] + old_deg[sorted_rows] + rank
+    return new_indptr, old_pos, new_pos
+
+
+def _reverse_csr(n, indptr, indices):
+    src = np.repeat(np.arange(n, dtype=np.int32), np.diff(indptr))
+    rorder = np.argsort(indices, kind='stable')
+    rindptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(indices, minlength=n), out=rindptr[1:])
+    return rindptr, src[rorder], rorder.astype(np.int32)
@@ -0,0 +1,248 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+
+MAX_EVENTS = 100_000   # 最多保留的计时事件数（用于导出 Chrome trace），更早的被丢弃
+PROFILE_LINES = 30     # cProfile 报告保留的函数行数
+
+
+class _NullSpan:
+    """未启用统计时 span() 返回的空上下文，进入和退出都不做任何事。"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('recorder', 'name', 'args', 'start')
+
+    def __init__(self, recorder, name, args):
+        self.recorder = recorder
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.recorder._finish(self.name, self.start, time.perf_counter(), self.args)
+        return False
+
+
+class Stat:
+    """同名计时的汇总：次数、总耗时和最长一次的耗时（秒）。"""
+
+    __slots__ = ('count', 'total', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+
+class Recorder:
+    """
+    轻量的计时器和计数器。
+
+    各模块在热点阶段外包一层 span(名称)，未启用时 span 直接返回一个共享的空上下文，
+    开销只是一次函数调用和一次属性判断。启用后记录每次计时的起止时间（用于 Chrome trace）
+    并按名称汇总；operation() 标记一次完整的用户操作，可选地用 cProfile 分析、
+    用 tracemalloc 记录峰值内存。
+
+    计时可能来自多个线程（后台任务），汇总时加锁。
+    tracemalloc 的峰值是进程级的，几个操作同时运行时互相包含。
+    """
+
+    def __init__(self, max_events=MAX_EVENTS):
+        self.enabled = False
+        self.profile = False
+        self.trace_memory = False
+        self.max_events = max_events
+        self._lock = threading.Lock()
+        self._started_tracing = False
+        self.reset()
+
+    def configure(self, enabled=None, profile=None, trace_memory=None):
+        """修改开关；开启 trace_memory 时启动 tracemalloc，关闭时停止。"""
+        if enabled is not None:
+            self.enabled = enabled
+        if profile is not None:
+            self.profile = profile
+        if trace_memory is not None:
+            self.trace_memory = trace_memory
+        want = self.enabled and self.trace_memory
+        if want and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        elif not want and self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def reset(self):
+        """清空已记录的计时、计数和操作报告。"""
+        with self._lock:
+            self.events = deque(maxlen=self.max_events)
+            self.stats = {}
+            self.counters = {}
+            self.reports = {}
+            self.origin = time.perf_counter()
+
+    def span(self, name, **args):
+        """
+        计时上下文：with span('阶段名'): ...
+
+        参数:
+            name: str，阶段名，同名的计时合并汇总
+            args: 附加信息，导出到 Chrome trace 的 args 中（需能转成 JSON）
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, args)
+
+    def count(self, name, n=1):
+        """计数器 name 加 n。"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def _finish(self, name, start, end, args):
+        duration = end - start
+        with self._lock:
+            stat = self.stats.get(name)
+            if stat is None:
+                stat = self.stats[name] = Stat()
+            stat.count += 1
+            stat.total += duration
+            if duration > stat.max:
+                stat.max = duration
+            self.events.append((name, threading.get_ident(), start, duration, args))
+
+    @contextmanager
+    def operation(self, name, **args):
+        """
+        一次完整的用户操作（例如打开文件、查询最短路径）。
+
+        与 span 一样计时；开启 profile 时在当前线程中运行 cProfile，
+        开启 trace_memory 时记录期间的峰值内存。结果保存在 reports[name] 中。
+        """
+        if not self.enabled:
+            yield
+            return
+        profiler = None
+        if self.profile:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                profiler = None  # 另一个分析器正在运行
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+        try:
+            with self.span(name, **args):
+                yield
+        finally:
+            report = {}
+            if profiler is not None:
+                profiler.disable()
+                report['profile'] = _profile_text(profiler)
+            if tracing and tracemalloc.is_tracing():
+                report['peak_memory'] = tracemalloc.get_traced_memory()[1]
+            if report:
+                with self._lock:
+                    self.reports[name] = report
+
+    def summary(self):
+        """按总耗时从大到小排列的 [(名称, 次数, 总耗时, 平均耗时, 最长耗时)]。"""
+        with self._lock:
+            rows = [(name, s.count, s.total, s.mean, s.max) for name, s in self.stats.items()]
+        rows.sort(key=lambda row: -row[2])
+        return rows
+
+    def format_stats(self, limit=15):
+        """统计面板显示的文本。"""
+        if not self.enabled and not self.stats:
+            return "统计未启用"
+        lines = [f"{'阶段':<22}{'次数':>6}{'总计ms':>10}{'平均ms':>9}{'最长ms':>9}"]
+        for name, count, total, mean, longest in self.summary()[:limit]:
+            lines.append(f"{name:<24}{count:>6}{total * 1e3:>10.1f}"
+                         f"{mean * 1e3:>9.2f}{longest * 1e3:>9.1f}")
+        with self._lock:
+            counters = sorted(self.counters.items())
+            reports = sorted(self.reports.items())
+        for name, value in counters:
+            lines.append(f"{name} = {value}")
+        for name, report in reports:
+            if 'peak_memory' in report:
+                lines.append(f"{name} 峰值内存 {report['peak_memory'] / (1 << 20):.1f} MB")
+        return "\n".join(lines)
+
+    def to_dict(self):
+        with self._lock:
+            counters = dict(self.counters)
+            reports = {name: dict(report) for name, report in self.reports.items()}
+        return {
+            'stats': [{'name': name, 'count': count, 'total': total, 'mean': mean, 'max': longest}
+                      for name, count, total, mean, longest in self.summary()],
+            'counters': counters,
+            'operations': reports,
+        }
+
+    def export_json(self, path):
+        """把汇总、计数和各操作的 cProfile/内存报告写成 JSON。"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    def chrome_trace(self):
+        """Chrome trace 格式（chrome://tracing、Perfetto 可直接打开）的字典。"""
+        pid = os.getpid()
+        with self._lock:
+            events = list(self.events)
+            counters = dict(self.counters)
+            origin = self.origin
+        trace = [{'name': name, 'cat': name.split('.')[0], 'ph': 'X', 'pid': pid, 'tid': tid,
+                  'ts': (start - origin) * 1e6, 'dur': duration * 1e6, 'args': args}
+                 for name, tid, start, duration, args in events]
+        if counters:
+            end = max((e['ts'] + e['dur'] for e in trace), default=0.0)
+            trace.append({'name': 'counters', 'ph': 'C', 'pid': pid, 'tid': 0, 'ts': end,
+                          'args': counters})
+        return {'traceEvents': trace, 'displayTimeUnit': 'ms'}
+
+    def export_chrome_trace(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.chrome_trace(), f)
+
+
+def _profile_text(profiler):
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(PROFILE_LINES)
+    return out.getvalue()
+
+
+# 全局记录器；各模块直接使用下面绑定好的方法
+recorder = Recorder()
+span = recorder.span
+count = recorder.count
+operation = recorder.operation
@@ -0,0 +1,192 @@
+import queue
+import threading
+
+POLL_MS = 50  # 主线程检查任务结果的间隔（毫秒）
+
+
+class JobCancelled(Exception):
+    """任务被取消时由 Job.report/Job.check 抛出，用于中断计算。"""
+
+
+class Job:
+    """
+    一个后台任务。计算函数通过 report 汇报进度，同时检查是否已被取消。
+
+    属性:
+        kind: 任务类型，同一类型同时只运行一个
+        fraction: 最近一次汇报的进度（0~1），未知时为 None
+        message: 最近一次汇报的说明文字
+    """
+
+    def __init__(self, executor, kind, callbacks):
+        self.kind = kind
+        self.callbacks = callbacks
+        self.fraction = None
+        self.message = ''
+        self._executor = executor
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self.mutating = False
+        self.thread = None
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        """请求取消；任务已开始修改共享数据（见 begin_mutation）时拒绝并返回 False。"""
+        with self._lock:
+            if self.mutating:
+                return False
+            self._cancel.set()
+            return True
+
+    def begin_mutation(self):
+        """
+        声明任务即将修改共享数据（在工作线程中调用）。
+
+        之后任务不能再被取消，一定会运行到底并交回结果，
+        避免别的任务看到改了一半的数据。已被取消时抛出 JobCancelled。
+        """
+        with self._lock:
+            self.check()
+            self.mutating = True
+
+    def check(self):
+        if self._cancel.is_set():
+            raise JobCancelled(self.kind)
+
+    def report(self, done, total=None, message=''):
+        """
+        汇报进度（在工作线程中调用）。
+
+        参数:
+            done: 已完成的数量
+            total: 总数量，未知时为 None
+            message: 说明文字
+        """
+        self.check()
+        self.fraction = min(done / total, 1.0) if total else None
+        self.message = message
+        self._executor._post(self, 'progress', (self.fraction, message))
+
+
+class JobExecutor:
+    """
+    在工作线程中运行耗时计算，结果通过队列交回主线程。
+
+    工作线程不直接操作 Tk 控件：它们只把结果放进队列，
+    主线程用 root.after 定期调用 poll() 取出并执行回调。
+    同一类型（kind）的任务同时只运行一个。
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._jobs = {}
+        self._draining = set()  # 已取消但线程还没结束的任务
+
+    def attach(self, root, interval=POLL_MS):
+        """用 root.after 在 Tk 主循环中定期调用 poll。"""
+        def tick():
+            self.poll()
+            root.after(interval, tick)
+
+        root.after(interval, tick)
+
+    def running(self, kind=None):
+        """
+        kind 类型的任务（省略时为任意任务）是否正在运行。
+
+        已取消但线程还没退出的任务也算在内。
+        """
+        if kind is None:
+            return bool(self._jobs) or bool(self._draining)
+        return kind in self._jobs or any(job.kind == kind for job in self._draining)
+
+    def submit(self, kind, func, *args, on_done=None, on_error=None, on_progress=None):
+        """
+        在新线程中运行 func(job, *args)。
+
+        参数:
+            kind: str，任务类型；该类型已有任务在运行时不提交，返回 None
+            func: 计算函数，第一个参数是 Job
+            on_done: 主线程回调 on_done(结果)
+            on_error: 主线程回调 on_error(异常)
+            on_progress: 主线程回调 on_progress(进度 0~1 或 None, 说明文字)
+
+        返回:
+            Job 或 None
+        """
+        if kind in self._jobs:
+            return None
+        job = Job(self, kind, {'done': on_done, 'error': on_error, 'progress': on_progress})
+        self._jobs[kind] = job
+
+        def run():
+            try:
+                result = func(job, *args)
+            except JobCancelled:
+                self._post(job, 'cancelled', None)
+            except Exception as exc:
+                self._post(job, 'error', exc)
+            else:
+                self._post(job, 'done', result)
+
+        job.thread = threading.Thread(target=run, name=f"job-{kind}", daemon=True)
+        job.thread.start()
+        return job
+
+    def cancel(self, kind=None):
+        """
+        取消 kind 类型的任务（省略时取消全部），返回被取消的任务数。
+
+        取消后立即可以提交同类型的新任务；旧线程在下一次 report/check 时退出，
+        它的结果不会再交给回调，但在线程退出前 running() 仍把它算作运行中。
+        已开始修改共享数据的任务不能取消，会正常完成并执行回调。
+        """
+        kinds = list(self._jobs) if kind is None else [k for k in self._jobs if k == kind]
+        cancelled = 0
+        for k in kinds:
+            job = self._jobs[k]
+            if job.cancel():
+                del self._jobs[k]
+                self._draining.add(job)
+                cancelled += 1
+        return cancelled
+
+    def _post(self, job, event, value):
+        self._queue.put((job, event, value))
+
+    def poll(self):
+        """
+        在主线程中执行已完成任务和进度汇报的回调。
+
+        被取消的任务即使算完了，结果也会被丢弃。
+
+        返回:
+            处理的事件数
+        """
+        handled = 0
+        while True:
+            try:
+                job, event, value = self._queue.get_nowait()
+            except queue.Empty:
+                return handled
+            handled += 1
+            if event != 'progress':
+                self._draining.discard(job)
+                if self._jobs.get(job.kind) is job:
+                    del self._jobs[job.kind]
+            callback = job.callbacks.get(event)
+            if job.cancelled or callback is None:
+                continue
+            if event == 'progress':
+                callback(*value)
+            else:
+                callback(value)
+
+    def wait(self, timeout=None):
+        """等待所有任务结束并处理回调（供测试和命令行使用）。"""
+        for job in list(self._jobs.values()) + list(self._draining):
+            job.thread.join(timeout)
+        return self.poll()
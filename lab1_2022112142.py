@@ -1,142 +1,219 @@
-import tkinter as tk
-from tkinter import filedialog
-import re
-import networkx as nx
-import matplotlib.pyplot as plt
 import random
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from itertools import cycle
-from collections import Counter
+from text_graph import (NO_GRAPH_MESSAGE, append_file, build_from_paths, clean_text,
+                        expand_paths, load_graph)
+from compact_graph import CompactGraph
+from pagerank import PageRankCache, PageRankRanking, format_top_pagerank
+from bridge_words import BridgeIndex, bridge_words_message, generate_text
+from shortest_path import ShortestPathCache, shortest_path_message
+from layout import LayoutCache
+from render import GraphView
+import instrument
+from jobs import JobExecutor
+from sampling import AliasTables
+from random_walk import WALK_RESULTS_FILE, save_walk_results as write_walk_results
+
+# 图形界面相关的模块（tkinter、matplotlib）只在真正用到时才导入，
+# 这样在没有显示器的服务器上也能 import 本模块使用其中的算法。
 
 G = None
-pos = {}  # 布局坐标缓存
+bridge_index = None
+alias_tables = None  # 按边权抽样用的别名表，与图一起构建
+pagerank_cache = PageRankCache()
+layout_cache = LayoutCache()
+shortest_path_cache = ShortestPathCache()  # 同一起点的重复查询直接用缓存的最短路径树
+pos = {}  # 最近一次绘图使用的布局坐标
+graph_view = None  # 常驻的绘图区域，第一次绘图时创建
+ranking_window = None  # PageRank 排名窗口，第一次计算 PageRank 时创建
+jobs = JobExecutor()  # 耗时计算在后台线程中运行，结果回到 Tk 主循环处理
 stop_walk = False
-walk_thread = None
-visited_nodes = []
+visited_nodes = []  # 随机游走经过的节点 ID，显示和保存时才换成单词
 visited_edges = []
 
+root = None
+entry_word1 = None
+entry_word2 = None
+entry_damping = None
+entry_new_sentence = None
+result_var = None
+weighted_var = None
+canvas_frame = None
+stats_var = None
+stats_options = {}  # 统计面板的开关：enabled、profile、trace_memory
+STATS_REFRESH_MS = 1000
 
-def clean_text(text):
-    text = re.sub(r'[^A-Za-z\s]', ' ', text)
-    text = text.lower()
-    return text.split()
 
+def draw_graph(Graph, local_canvas_frame, highlight_edges_list=None):
+    """
+    在常驻的绘图区域中显示图，大图只绘制最重要的节点和高亮路径。
 
-def build_graph(words):
-    Graph = nx.DiGraph()
-    for i in range(len(words) - 1):
-        a, b = words[i], words[i + 1]
-        if Graph.has_edge(a, b):
-            Graph[a][b]['weight'] += 1
-        else:
-            Graph.add_edge(a, b, weight=1)
-    return Graph
+    图和布局没有变化时不重绘整张图，只替换高亮路径的叠加层。
+    """
+    global pos, graph_view
+    with instrument.operation('draw_graph'):
+        if not isinstance(Graph, CompactGraph):
+            Graph = CompactGraph.from_networkx(Graph)
+        # 布局按图的版本缓存，高亮路径等重复绘图不再重新计算
+        pos = layout_cache.positions(Graph)
+        if graph_view is None:
+            graph_view = GraphView(local_canvas_frame)
+        # 算过 PageRank 时按 PageRank 选出要显示的节点，否则按度数
+        scores = None
+        if pagerank_cache.graph is Graph and pagerank_cache.version == Graph.version:
+            scores = pagerank_cache.vector
+        graph_view.show_graph(Graph, pos, scores)
+        graph_view.highlight(highlight_edges_list)
 
 
-def draw_graph(Graph, local_canvas_frame, highlight_edges_list=None):
-    global pos
-    fig, ax = plt.subplots(figsize=(10, 8))
-    for widget in local_canvas_frame.winfo_children():
-        widget.destroy()
-    # try:
-    #     pos = nx.nx_agraph.graphviz_layout(Graph, prog='dot')
-    # except (ImportError, ValueError, nx.NetworkXException):
-    #     pos = nx.kamada_kawai_layout(Graph)
-    # try:
-    #     pos = nx.nx_agraph.graphviz_layout(Graph, prog='dot')
-    # except:
-    #     pos = nx.kamada_kawai_layout(Graph)
-    pos = nx.kamada_kawai_layout(Graph)
-    # try:
-    #     # 尝试使用 Graphviz 的 dot 布局
-    #     pos = nx.nx_agraph.graphviz_layout(Graph, prog='dot')
-    # except (ImportError, nx.NetworkXException) as e:
-    #     print(f"Graphviz 布局失败，使用备用布局：{e}")
-    #     # 备用布局：Kamada-Kawai
-    #     pos = nx.kamada_kawai_layout(Graph)
-
-    nx.draw(Graph, pos, ax=ax, with_labels=True, node_color='lightblue',
-            node_size=600, font_size=10, arrows=True, arrowsize=20,
-            connectionstyle='arc3,rad=0.1')
-
-    edge_labels = nx.get_edge_attributes(Graph, 'weight')
-    nx.draw_networkx_edge_labels(
-        Graph,
-        pos,
-        edge_labels=edge_labels,
-        ax=ax,
-        font_size=8
-    )
-
-    if highlight_edges_list:
-        colors = cycle([
-            'red',
-            'green',
-            'purple',
-            'orange',
-            'brown',
-            'magenta'
-        ])
-
-        for path_edges in highlight_edges_list:
-            color = next(colors)
-            nx.draw_networkx_edges(Graph, pos, edgelist=path_edges,
-                                   edge_color=color,
-                                   width=2.5,
-                                   ax=ax,
-                                   connectionstyle='arc3,rad=0.1')
-
-    canvas = FigureCanvasTkAgg(fig, master=local_canvas_frame)
-    canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-    canvas.draw()
+def redraw():
+    """在后台线程计算布局，算完后回到主线程绘图。"""
+    graph = G
+
+    def done(_):
+        if graph is G:
+            draw_graph(graph, canvas_frame)
+
+    jobs.cancel('layout')
+    jobs.submit('layout', lambda job: layout_cache.positions(graph),
+                on_done=done, on_error=show_error)
+
+
+def show_progress(fraction, message):
+    if fraction is not None:
+        message += f"（{fraction:.0%}）"
+    result_var.set(message)
+
+
+def show_error(exc):
+    result_var.set(f"出错：{exc}")
+
+
+def graph_busy():
+    """正在加载或追加文本时图不可用，返回 True 并提示。"""
+    if jobs.running('load'):
+        result_var.set("正在加载文本，请稍候……")
+        return True
+    return False
+
+
+def _set_graph(graph, index, tables, message):
+    global G, bridge_index, alias_tables
+    G = graph
+    bridge_index = index
+    alias_tables = tables
+    redraw()
+    result_var.set(message)
 
 
 def open_file():
-    global G
+    from tkinter import filedialog
     file_path = filedialog.askopenfilename(filetypes=[("Text files", "*.txt")])
-    if file_path:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            text = f.read().replace('\n', ' ')
-            words = clean_text(text)
-            G = build_graph(words)
-            draw_graph(G, canvas_frame)
-            result_var.set("图构建完成。可以查找桥接词、生成新文本或查询最短路径。")
+    if not file_path or graph_busy():
+        return
+    # 换了一张图，其它任务的结果都已过时
+    jobs.cancel()
+
+    def work(job):
+        with instrument.operation('open_file'):
+            graph = load_graph(file_path,
+                               progress=lambda done, total: job.report(done, total, "正在构建图"))
+            job.check()
+            return graph, None, AliasTables(graph)
+
+    jobs.submit('load', work, on_progress=show_progress, on_error=show_error,
+                on_done=lambda result: _set_graph(
+                    *result, "图构建完成。可以查找桥接词、生成新文本或查询最短路径。"))
+
+
+def open_folder():
+    """读取文件夹中的所有 .txt 文件，多进程并行构建。"""
+    from tkinter import filedialog
+    folder = filedialog.askdirectory()
+    if not folder or graph_busy():
+        return
+    jobs.cancel()
 
+    def work(job):
+        with instrument.operation('open_folder'):
+            paths = expand_paths(folder)
+            graph = build_from_paths(
+                paths, progress=lambda done, total: job.report(done, total, "正在读取文件"))
+            job.check()
+            return graph, None, AliasTables(graph), len(paths)
 
-def find_bridge_words():
-    word1 = entry_word1.get().lower().strip()
-    word2 = entry_word2.get().lower().strip()
+    def done(result):
+        graph, index, tables, count = result
+        _set_graph(graph, index, tables, f"已读取 {count} 个文件，图构建完成。")
+
+    jobs.submit('load', work, on_done=done, on_progress=show_progress, on_error=show_error)
+
+
+def append_text_file():
+    """把新的文本文件追加到当前图中，只处理新文本，派生结构增量更新。"""
+    from tkinter import filedialog
     if G is None:
-        result_var.set("请先加载文本文件并生成图！")
+        open_file()
+        return
+    if jobs.running():
+        result_var.set("请等待当前任务完成后再追加文本。")
         return
-    if word1 not in G or word2 not in G:
-        result_var.set(f"No {word1} or {word2} in the graph!")
+    file_path = filedialog.askopenfilename(filetypes=[("Text files", "*.txt")])
+    if not file_path:
         return
+    graph, index, tables = G, bridge_index, alias_tables
+
+    def work(job):
+        # 流式读取时新单词就已加入词表，所以从一开始就不能取消，保证图的一致性；
+        # 任务结束前 graph_busy 会挡住其它查询
+        job.begin_mutation()
+        with instrument.operation('append_text'):
+            with instrument.span('graph.append'):
+                delta = append_file(
+                    graph, file_path,
+                    progress=lambda done, total: job.report(done, total, "正在追加文本"))
+            with instrument.span('bridge.refresh'):
+                if index is not None:
+                    index.refresh(delta)
+            with instrument.span('sampling.refresh'):
+                if tables is not None:
+                    tables.refresh(delta)
+            return delta
+
+    def done(delta):
+        redraw()
+        result_var.set(f"已追加文本：新增 {len(graph) - delta.old_nodes} 个单词，"
+                       f"{len(delta.new_src)} 条边。")
+
+    jobs.submit('load', work, on_done=done, on_progress=show_progress, on_error=show_error)
+
+
+def weighted_tables():
+    """勾选“按词频加权”时返回别名表，否则返回 None（均匀抽取）。"""
+    if weighted_var is not None and weighted_var.get():
+        return alias_tables
+    return None
+
+
+def cancel_jobs():
+    count = jobs.cancel()
+    message = f"已取消 {count} 个任务。" if count else "当前没有可以取消的任务。"
+    if jobs.running('load'):
+        message += "正在修改图的任务会继续完成。"
+    result_var.set(message)
 
-    bridge_words = [w3 for w3 in G.successors(word1) if G.has_edge(w3, word2)]
-    if not bridge_words:
-        result_var.set(f"No bridge words from {word1} to {word2}!")
-    else:
-        if len(bridge_words) == 1:
-            result = (
-                f"The bridge word from {word1} to {word2} "
-                f"is: {bridge_words[0]}."
-            )
 
-        else:
-            formatted = (
-                ", ".join(bridge_words[:-1])
-                + f", and {bridge_words[-1]}"
-            )
-            result = (
-                f"The bridge words from {word1} to {word2} are: {formatted}."
-            )
-        result_var.set(result)
+def find_bridge_words():
+    if graph_busy():
+        return
+    with instrument.operation('find_bridge_words'):
+        result_var.set(bridge_words_message(G, entry_word1.get(), entry_word2.get(),
+                                            bridge_index))
 
 
 def generate_new_text():
     if G is None:
-        result_var.set("请先加载文本文件并生成图！")
+        result_var.set(NO_GRAPH_MESSAGE)
+        return
+    if graph_busy():
         return
     text = entry_new_sentence.get().strip()
     words = clean_text(text)
@@ -144,171 +221,176 @@ def generate_new_text():
         result_var.set("请输入至少两个单词！")
         return
 
-    new_words = []
-    for i in range(len(words) - 1):
-        w1, w2 = words[i], words[i + 1]
-        new_words.append(w1)
-        if w1 in G and w2 in G:
-            bridges = [w3 for w3 in G.successors(w1) if G.has_edge(w3, w2)]
-            if bridges:
-                bridge = random.choice(bridges)
-                new_words.append(bridge)
-    new_words.append(words[-1])
+    with instrument.operation('generate_new_text'):
+        new_words = generate_text(G, words, bridge_index, tables=weighted_tables())
     result = " ".join(new_words)
     result_var.set("生成新文本：\n" + result)
+    ensure_bridge_index()
 
 
-def find_shortest_path():
-    word1 = entry_word1.get().lower().strip()
-    word2 = entry_word2.get().lower().strip()
-    if G is None:
-        result_var.set("请先加载文本文件并生成图！")
-        return
-    if not word1:
-        result_var.set("请输入至少一个单词！")
-        return
+def ensure_bridge_index():
+    """
+    第一次生成新文本后在后台构建桥接词索引，之后的生成直接查索引。
 
-    if word1 not in G:
-        result_var.set(f"单词 '{word1}' 不在图中！")
+    索引只在用到时才建，单次查询用求交集已经足够快；构建前和构建中都回退到求交集。
+    """
+    if bridge_index is not None or G is None or jobs.running():
         return
+    graph = G
+
+    def work(job):
+        with instrument.operation('bridge_index'):
+            return BridgeIndex(graph)
+
+    def done(index):
+        global bridge_index
+        # 构建期间图被替换或追加了文本，索引已过时，丢弃
+        if graph is G and not index.is_stale:
+            bridge_index = index
+
+    jobs.submit('index', work, on_done=done, on_error=show_error)
 
-    if word2 and word2 not in G:
-        result_var.set(f"单词 '{word2}' 不在图中！")
+
+def find_shortest_path():
+    if graph_busy():
         return
+    graph = G
+    cache = shortest_path_cache
+    word1, word2 = entry_word1.get(), entry_word2.get()
+
+    def done(result):
+        message, highlight_paths = result
+        if graph is not G:
+            return
+        result_var.set(message)
+        # 布局还在计算时先只显示文字
+        if highlight_paths is not None and not jobs.running('layout'):
+            draw_graph(graph, canvas_frame, highlight_edges_list=highlight_paths)
 
-    if word2:
-        try:
-            all_paths = list(nx.all_shortest_paths(G,
-                                                   source=word1,
-                                                   target=word2,
-                                                   weight='weight'))
-            result_lines = []
-            highlight_paths = []
-            for path in all_paths:
-                weight = sum(
-                    G[path[i]][path[i + 1]]['weight']
-                    for i in range(len(path) - 1))
-                result_lines.append(" -> ".join(path) + f"（路径长度: {weight}）")
-                edges = [(path[i], path[i + 1]) for i in range(len(path) - 1)]
-                highlight_paths.append(edges)
-
-            draw_graph(G, canvas_frame, highlight_edges_list=highlight_paths)
-            result = f"{word1} 到 {word2} 的所有最短路径：\n" + "\n".join(result_lines)
-            result_var.set(result)
-        except nx.NetworkXNoPath:
-            result_var.set(f"{word1} 到 {word2} 不可达。")
-    else:
-        paths = nx.single_source_dijkstra_path(G, word1, weight='weight')
-        lengths = nx.single_source_dijkstra_path_length(G,
-                                                        word1,
-                                                        weight='weight')
-        result_lines = []
-        for target, path in paths.items():
-            if target == word1:
-                continue
-            line = (
-                f"{word1} -> {target}：路径 = {' -> '.join(path)}, "
-                f"长度 = {lengths[target]}"
-            )
-
-            result_lines.append(line)
-        result_var.set("\n".join(result_lines[:30]))
-        draw_graph(G, canvas_frame)
-
-
-def calculate_pagerank(Graph,
-                       damping_factor,
-                       max_iter=100,
-                       tol=1e-6,
-                       word_list=None):
-    N = len(Graph)
-    if N == 0:
-        return {}
-
-    # 计算词频并归一化
-    if word_list:
-        freq = Counter(word_list)
-        total = sum(freq[node] for node in Graph if node in freq)
-        pr = {node: freq[node] / total
-              if node in freq else 0 for node in Graph}
-    else:
-        pr = {node: 1 / N for node in Graph}
-
-    nodes = list(Graph.nodes())
-
-    for _ in range(max_iter):
-        new_pr = {}
-        dangling_sum = sum(
-            pr[node]
-            for node in nodes if Graph.out_degree(node) == 0)
-
-        for node in nodes:
-            rank = (1 - damping_factor) / N
-            rank += damping_factor * dangling_sum / N
-
-            for pred in Graph.predecessors(node):
-                if Graph.out_degree(pred) > 0:
-                    rank += damping_factor * pr[pred] / Graph.out_degree(pred)
-            new_pr[node] = rank
-
-        diff = sum(abs(new_pr[node] - pr[node]) for node in nodes)
-        pr = new_pr
-        if diff < tol:
-            break
-
-    return pr
+    def work(job):
+        with instrument.operation('find_shortest_path'):
+            return shortest_path_message(graph, word1, word2, cache)
+
+    jobs.cancel('path')
+    jobs.submit('path', work, on_done=done, on_error=show_error)
+    if graph is not None:
+        result_var.set("正在查询最短路径……")
 
 
 def calculate_and_display_pagerank():
     if G is None:
-        result_var.set("请先加载文本文件并生成图！")
+        result_var.set(NO_GRAPH_MESSAGE)
+        return
+    if graph_busy():
         return
 
+    graph = G
     damping_factor = float(entry_damping.get())
-    pagerank = calculate_pagerank(G, damping_factor)
-    result = "PageRank值：\n"
-    for node, rank in pagerank.items():
-        result += f"{node}: {rank:.4f}\n"
 
-    result_var.set(result)
+    def work(job):
+        with instrument.operation('calculate_pagerank'):
+            vector = pagerank_cache.compute(
+                graph, damping_factor,
+                progress=lambda done, total: job.report(done, total, "正在计算 PageRank"))
+            ranking = PageRankRanking(graph.vocab, vector)
+            # 结果文字只列出前几名，完整排名在排名窗口中分页查看
+            text = (format_top_pagerank(ranking)
+                    + f"迭代 {pagerank_cache.iterations} 次，"
+                    f"比从头计算约少 {pagerank_cache.saved_iterations} 次")
+        return ranking, text
+
+    def done(result):
+        ranking, text = result
+        result_var.set(text)
+        show_ranking(ranking)
+
+    if jobs.submit('pagerank', work, on_done=done, on_progress=show_progress,
+                   on_error=show_error) is None:
+        result_var.set("PageRank 正在计算中，请稍候……")
+
+
+def show_ranking(ranking):
+    global ranking_window
+    from ranking_view import RankingWindow
+    if ranking_window is None or not ranking_window.alive:
+        ranking_window = RankingWindow(root, on_export=export_ranking)
+    ranking_window.show(ranking)
+
+
+def export_ranking(ranking, path):
+    """在后台线程中把完整排名流式写入 CSV/Parquet 文件。"""
+    def work(job):
+        with instrument.operation('export_pagerank'):
+            return ranking.export(
+                path, progress=lambda done, total: job.report(done, total, "正在导出排名"))
+
+    def done(rows):
+        result_var.set(f"已导出 {rows} 个单词的排名到：{path}")
+
+    if jobs.submit('export', work, on_done=done, on_progress=show_progress,
+                   on_error=show_error) is None:
+        result_var.set("正在导出排名，请稍候……")
 
 
 def random_walk():
     global stop_walk, visited_nodes, visited_edges
     if G is None:
-        result_var.set("请先加载文本文件并生成图！")
+        result_var.set(NO_GRAPH_MESSAGE)
+        return
+    if graph_busy():
         return
 
     visited_nodes = []
     visited_edges = []
+    if graph_view is not None:
+        graph_view.clear_overlays()
 
-    current_node = random.choice(list(G.nodes()))
-    visited_nodes.append(current_node)
+    graph = G
+    tables = weighted_tables()
+    words = graph.vocab
+    current = random.randrange(len(graph))
+    visited_nodes.append(current)
+    # 已经过的边放在集合里，判断是否重复是 O(1)
+    seen = set()
 
     stop_walk = False
 
     def walk_step():
-        nonlocal current_node
+        nonlocal current
         if stop_walk:
-            save_walk_results()
+            save_walk_results(words)
+            return
+        if jobs.running('load'):
+            # 追加文本时图正在被修改，等任务结束再继续走
+            root.after(500, walk_step)
             return
 
-        neighbors = list(G.successors(current_node))
-        if not neighbors:
-            save_walk_results()
+        with instrument.span('walk.step'):
+            neighbors = graph.successor_ids(current)
+            if len(neighbors) == 0:
+                nxt = None
+            elif tables is not None:
+                nxt = tables.draw(current)
+            else:
+                nxt = int(random.choice(neighbors))
+        if nxt is None:
+            save_walk_results(words)
             return
-        next_node = random.choice(neighbors)
-        edge = (current_node, next_node)
+        instrument.count('walk.steps')
 
-        if edge in visited_edges:
-            save_walk_results()
+        if (current, nxt) in seen:
+            save_walk_results(words)
             return
 
-        visited_edges.append(edge)
-        visited_nodes.append(next_node)
+        seen.add((current, nxt))
+        visited_edges.append((current, nxt))
+        visited_nodes.append(nxt)
+        if graph_view is not None and graph_view.graph is graph:
+            # 每一步只在缓存的背景上叠加一条边
+            graph_view.add_overlay([(words[current], words[nxt])])
 
-        current_node = next_node
-        result_var.set("随机游走节点：\n" + " -> ".join(visited_nodes))
+        current = nxt
+        result_var.set("随机游走节点：\n" + " -> ".join(map(words.__getitem__, visited_nodes)))
         root.after(500, walk_step)
 
     walk_step()
@@ -320,104 +402,235 @@ def stop_random_walk():
     result_var.set("随机游走已停止。")
 
 
-def save_walk_results():
-    with open("random_walk_results.txt", "w", encoding="utf-8") as f:
-        f.write("经过的节点：\n")
-        f.write(" -> ".join(visited_nodes) + "\n")
-        f.write("经过的边：\n")
-        for edge in visited_edges:
-            f.write(f"{edge}\n")
-    result_var.set("随机游走结果已保存到文件：random_walk_results.txt")
-
-
-# GUI界面
-root = tk.Tk()
-root.title("文本图分析器")
-root.geometry("1024x960")
-
-btn = tk.Button(root, text="选择文本文件", command=open_file, font=('Arial', 14))
-btn.pack(pady=10)
-
-input_frame = tk.Frame(root)
-input_frame.pack(pady=10)
-
-tk.Label(input_frame,
-         text="Word 1:",
-         font=('Arial', 12)).grid(row=0, column=0, padx=5)
-entry_word1 = tk.Entry(input_frame, width=15, font=('Arial', 12))
-entry_word1.grid(row=0, column=1, padx=5)
-
-tk.Label(input_frame,
-         text="Word 2:",
-         font=('Arial', 12)).grid(row=0, column=2, padx=5)
-entry_word2 = tk.Entry(input_frame, width=15, font=('Arial', 12))
-entry_word2.grid(row=0, column=3, padx=5)
-
-btn_find = tk.Button(input_frame,
-                     text="查找桥接词",
-                     command=find_bridge_words,
-                     font=('Arial', 12))
-btn_find.grid(row=0, column=4, padx=5)
-
-btn_path = tk.Button(input_frame,
-                     text="最短路径查询",
-                     command=find_shortest_path,
-                     font=('Arial', 12))
-btn_path.grid(row=0, column=5, padx=5)
-
-input_frame_pagerank = tk.Frame(root)
-input_frame_pagerank.pack(pady=10)
-
-tk.Label(input_frame_pagerank,
-         text="阻尼因子(damping):",
-         font=('Arial', 12)).grid(row=0, column=0, padx=5)
-entry_damping = tk.Entry(input_frame_pagerank, width=10, font=('Arial', 12))
-entry_damping.grid(row=0, column=1, padx=5)
-entry_damping.insert(0, "0.85")
-
-btn_pagerank = tk.Button(input_frame_pagerank,
-                         text="计算PageRank",
-                         command=calculate_and_display_pagerank,
-                         font=('Arial', 12))
-btn_pagerank.grid(row=0, column=2, padx=5)
-
-btn_walk = tk.Button(root,
-                     text="开始随机游走",
-                     command=random_walk,
-                     font=('Arial', 12))
-btn_walk.pack(pady=10)
-
-btn_stop_walk = tk.Button(root,
-                          text="停止随机游走",
-                          command=stop_random_walk,
-                          font=('Arial', 12))
-btn_stop_walk.pack(pady=10)
-
-sentence_frame = tk.Frame(root)
-sentence_frame.pack(pady=10)
-
-tk.Label(sentence_frame,
-         text="输入新文本：",
-         font=('Arial', 12)).pack(side=tk.LEFT, padx=5)
-entry_new_sentence = tk.Entry(sentence_frame, width=60, font=('Arial', 12))
-entry_new_sentence.pack(side=tk.LEFT, padx=5)
-
-btn_generate = tk.Button(sentence_frame,
-                         text="生成新文本",
-                         command=generate_new_text,
-                         font=('Arial', 12))
-btn_generate.pack(side=tk.LEFT, padx=10)
+def save_walk_results(words):
+    write_walk_results([words[v] for v in visited_nodes],
+                       [(words[a], words[b]) for a, b in visited_edges])
+    result_var.set(f"随机游走结果已保存到文件：{WALK_RESULTS_FILE}")
+
+
+def apply_stats_options():
+    """统计面板的复选框变化时修改记录器的开关。"""
+    instrument.recorder.configure(**{key: var.get() for key, var in stats_options.items()})
+    refresh_stats()
+
+
+def refresh_stats():
+    if stats_var is not None:
+        stats_var.set(instrument.recorder.format_stats())
+
+
+def _schedule_stats_refresh():
+    # 只有启用统计时才需要更新面板
+    if instrument.recorder.enabled:
+        refresh_stats()
+    root.after(STATS_REFRESH_MS, _schedule_stats_refresh)
 
-result_var = tk.StringVar()
-result_label = tk.Label(root,
-                        textvariable=result_var,
-                        wraplength=960,
-                        justify="left",
-                        font=('Arial', 12),
-                        fg="blue")
-result_label.pack(pady=10)
 
-canvas_frame = tk.Frame(root)
-canvas_frame.pack(pady=10)
+def reset_stats():
+    instrument.recorder.reset()
+    refresh_stats()
 
-root.mainloop()
+
+def export_stats(kind):
+    """把统计结果导出为 JSON（kind='json'）或 Chrome trace（kind='trace'）文件。"""
+    from tkinter import filedialog
+    default = "stats.json" if kind == 'json' else "trace.json"
+    path = filedialog.asksaveasfilename(defaultextension=".json", initialfile=default,
+                                        filetypes=[("JSON files", "*.json")])
+    if not path:
+        return
+    try:
+        if kind == 'json':
+            instrument.recorder.export_json(path)
+        else:
+            instrument.recorder.export_chrome_trace(path)
+    except OSError as exc:
+        show_error(exc)
+        return
+    result_var.set(f"统计结果已导出到：{path}")
+
+
+def show_profiles():
+    """在新窗口中显示各操作最近一次的 cProfile 结果。"""
+    import tkinter as tk
+    reports = instrument.recorder.reports
+    text = "\n\n".join(f"== {name} ==\n{report['profile']}"
+                       for name, report in sorted(reports.items()) if 'profile' in report)
+    window = tk.Toplevel(root)
+    window.title("cProfile 结果")
+    box = tk.Text(window, width=110, height=40, font=('Courier', 9))
+    box.insert('1.0', text or "还没有 cProfile 结果：请勾选“cProfile”后再执行操作。")
+    box.configure(state='disabled')
+    box.pack(fill=tk.BOTH, expand=True)
+
+
+def build_stats_panel(parent):
+    """结果文字旁边的统计面板：开关、各阶段耗时汇总和导出按钮。"""
+    global stats_var
+    import tkinter as tk
+    panel = tk.LabelFrame(parent, text="性能统计", font=('Arial', 10))
+    options = tk.Frame(panel)
+    options.pack(anchor='w')
+    for key, text in (('enabled', "启用"), ('profile', "cProfile"),
+                      ('trace_memory', "tracemalloc")):
+        stats_options[key] = tk.BooleanVar(value=getattr(instrument.recorder, key))
+        tk.Checkbutton(options, text=text, variable=stats_options[key],
+                       command=apply_stats_options).pack(side=tk.LEFT)
+    stats_var = tk.StringVar(value=instrument.recorder.format_stats())
+    tk.Label(panel, textvariable=stats_var, justify="left", anchor='w',
+             font=('Courier', 9)).pack(anchor='w', padx=5)
+    buttons = tk.Frame(panel)
+    buttons.pack(anchor='w', pady=2)
+    for text, command in (("导出 JSON", lambda: export_stats('json')),
+                          ("导出 Chrome trace", lambda: export_stats('trace')),
+                          ("cProfile 结果", show_profiles),
+                          ("清空", reset_stats)):
+        tk.Button(buttons, text=text, command=command,
+                  font=('Arial', 9)).pack(side=tk.LEFT, padx=2)
+    return panel
+
+
+def close_window():
+    """关闭窗口前显式释放绘图区域。"""
+    global graph_view
+    jobs.cancel()
+    if graph_view is not None:
+        graph_view.close()
+        graph_view = None
+    root.destroy()
+
+
+def main():
+    """创建 GUI 界面并进入主循环。"""
+    global root, entry_word1, entry_word2, entry_damping
+    global entry_new_sentence, result_var, canvas_frame, weighted_var
+    import tkinter as tk
+
+    root = tk.Tk()
+    root.title("文本图分析器")
+    root.geometry("1024x960")
+
+    file_frame = tk.Frame(root)
+    file_frame.pack(pady=10)
+
+    btn = tk.Button(file_frame, text="选择文本文件", command=open_file, font=('Arial', 14))
+    btn.pack(side=tk.LEFT, padx=5)
+
+    btn_folder = tk.Button(file_frame,
+                           text="选择文件夹",
+                           command=open_folder,
+                           font=('Arial', 14))
+    btn_folder.pack(side=tk.LEFT, padx=5)
+
+    btn_append = tk.Button(file_frame,
+                           text="追加文本文件",
+                           command=append_text_file,
+                           font=('Arial', 14))
+    btn_append.pack(side=tk.LEFT, padx=5)
+
+    btn_cancel = tk.Button(file_frame,
+                           text="取消任务",
+                           command=cancel_jobs,
+                           font=('Arial', 14))
+    btn_cancel.pack(side=tk.LEFT, padx=5)
+
+    input_frame = tk.Frame(root)
+    input_frame.pack(pady=10)
+
+    tk.Label(input_frame,
+             text="Word 1:",
+             font=('Arial', 12)).grid(row=0, column=0, padx=5)
+    entry_word1 = tk.Entry(input_frame, width=15, font=('Arial', 12))
+    entry_word1.grid(row=0, column=1, padx=5)
+
+    tk.Label(input_frame,
+             text="Word 2:",
+             font=('Arial', 12)).grid(row=0, column=2, padx=5)
+    entry_word2 = tk.Entry(input_frame, width=15, font=('Arial', 12))
+    entry_word2.grid(row=0, column=3, padx=5)
+
+    btn_find = tk.Button(input_frame,
+                         text="查找桥接词",
+                         command=find_bridge_words,
+                         font=('Arial', 12))
+    btn_find.grid(row=0, column=4, padx=5)
+
+    btn_path = tk.Button(input_frame,
+                         text="最短路径查询",
+                         command=find_shortest_path,
+                         font=('Arial', 12))
+    btn_path.grid(row=0, column=5, padx=5)
+
+    input_frame_pagerank = tk.Frame(root)
+    input_frame_pagerank.pack(pady=10)
+
+    tk.Label(input_frame_pagerank,
+             text="阻尼因子(damping):",
+             font=('Arial', 12)).grid(row=0, column=0, padx=5)
+    entry_damping = tk.Entry(input_frame_pagerank, width=10, font=('Arial', 12))
+    entry_damping.grid(row=0, column=1, padx=5)
+    entry_damping.insert(0, "0.85")
+
+    btn_pagerank = tk.Button(input_frame_pagerank,
+                             text="计算PageRank",
+                             command=calculate_and_display_pagerank,
+                             font=('Arial', 12))
+    btn_pagerank.grid(row=0, column=2, padx=5)
+
+    btn_walk = tk.Button(root,
+                         text="开始随机游走",
+                         command=random_walk,
+                         font=('Arial', 12))
+    btn_walk.pack(pady=10)
+
+    btn_stop_walk = tk.Button(root,
+                              text="停止随机游走",
+                              command=stop_random_walk,
+                              font=('Arial', 12))
+    btn_stop_walk.pack(pady=10)
+
+    weighted_var = tk.BooleanVar(value=False)
+    tk.Checkbutton(root,
+                   text="随机游走和生成新文本时按词频加权",
+                   variable=weighted_var,
+                   font=('Arial', 12)).pack(pady=5)
+
+    sentence_frame = tk.Frame(root)
+    sentence_frame.pack(pady=10)
+
+    tk.Label(sentence_frame,
+             text="输入新文本：",
+             font=('Arial', 12)).pack(side=tk.LEFT, padx=5)
+    entry_new_sentence = tk.Entry(sentence_frame, width=60, font=('Arial', 12))
+    entry_new_sentence.pack(side=tk.LEFT, padx=5)
+
+    btn_generate = tk.Button(sentence_frame,
+                             text="生成新文本",
+                             command=generate_new_text,
+                             font=('Arial', 12))
+    btn_generate.pack(side=tk.LEFT, padx=10)
+
+    result_frame = tk.Frame(root)
+    result_frame.pack(pady=10, fill=tk.X)
+
+    result_var = tk.StringVar()
+    result_label = tk.Label(result_frame,
+                            textvariable=result_var,
+                            wraplength=560,
+                            justify="left",
+                            font=('Arial', 12),
+                            fg="blue")
+    result_label.pack(side=tk.LEFT, padx=10, anchor='n')
+    build_stats_panel(result_frame).pack(side=tk.RIGHT, padx=10, anchor='n')
+
+    canvas_frame = tk.Frame(root)
+    canvas_frame.pack(pady=10)
+
+    jobs.attach(root)
+    root.after(STATS_REFRESH_MS, _schedule_stats_refresh)
+    root.protocol("WM_DELETE_WINDOW", close_window)
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
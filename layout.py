@@ -0,0 +1,155 @@
+import threading
+
+import numpy as np
+import scipy.sparse as sp
+
+from instrument import span
+
+KAMADA_KAWAI_MAX_NODES = 300   # Kamada-Kawai 是 O(N^2) 内存、约 O(N^3) 时间，只用于小图
+# 多层布局时先做力导向布局的高度数节点数。力导向布局每轮 O(N^2)，几百个节点后就要数秒，
+# 所以自动选择时不直接对大图使用 'spring'，而是只对这部分节点使用
+COARSE_NODES = 300
+
+
+def choose_engine(n):
+    """按节点数自动选择布局算法；'spring' 只在显式指定时使用。"""
+    if n <= KAMADA_KAWAI_MAX_NODES:
+        return 'kamada_kawai'
+    return 'multilevel'
+
+
+def _undirected_adjacency(graph):
+    n = len(graph)
+    src = np.repeat(np.arange(n), graph.out_degrees)
+    A = sp.csr_matrix((np.ones(len(src)), (src, graph.indices)), shape=(n, n))
+    return ((A + A.T) > 0).astype(np.float64)
+
+
+def place_new_nodes(graph, coords, placed, seed=0):
+    """
+    把未放置的节点放到已放置邻居的重心附近（加少量抖动），逐轮向外扩展。
+
+    每一轮是一次稀疏矩阵乘法，整体 O(边数 × 轮数)。与已放置节点不连通的节点随机放在边界框内。
+
+    参数:
+        graph: CompactGraph
+        coords: (N, 2) 数组，已放置节点的坐标有效，会被原地修改
+        placed: 长度 N 的布尔数组，会被原地修改
+    """
+    rng = np.random.default_rng(seed)
+    if placed.any():
+        lo, hi = coords[placed].min(axis=0), coords[placed].max(axis=0)
+    else:
+        lo, hi = np.full(2, -1.0), np.full(2, 1.0)
+    jitter = 0.02 * max(float((hi - lo).max()), 1e-3)
+    A = _undirected_adjacency(graph)
+    while not placed.all():
+        weight = placed.astype(np.float64)
+        count = A @ weight
+        ready = (count > 0) & ~placed
+        if not ready.any():
+            break
+        sums = A @ (coords * weight[:, None])
+        coords[ready] = sums[ready] / count[ready, None] \
+            + rng.normal(scale=jitter, size=(int(ready.sum()), 2))
+        placed |= ready
+    rest = ~placed
+    coords[rest] = rng.uniform(lo, hi, size=(int(rest.sum()), 2))
+    placed[:] = True
+    return coords
+
+
+def _multilevel_layout(graph, seed=0):
+    """
+    两层布局：优先用 graphviz 的 sfdp；没有 pygraphviz、找不到 sfdp 程序或它运行失败时，
+    先对度数最高的 COARSE_NODES 个节点做力导向布局，其余节点按邻居重心逐层放置。
+    """
+    import networkx as nx
+    nx_graph = graph.to_networkx()
+    try:
+        pos = nx.nx_agraph.graphviz_layout(nx_graph, prog='sfdp')
+        return np.array([pos[w] for w in graph.vocab.words], dtype=np.float64)
+    except (ImportError, OSError, ValueError):
+        # pygraphviz 找不到 sfdp 时抛出 ValueError，sfdp 运行出错时抛出 OSError 或 ValueError
+        pass
+    n = len(graph)
+    degree = graph.out_degrees + np.diff(graph.rindptr)
+    hubs = np.argsort(-degree, kind='stable')[:COARSE_NODES]
+    words = graph.vocab.words
+    hub_pos = nx.spring_layout(nx_graph.subgraph(words[i] for i in hubs.tolist()), seed=seed)
+    coords = np.zeros((n, 2))
+    placed = np.zeros(n, dtype=bool)
+    coords[hubs] = [hub_pos[words[i]] for i in hubs.tolist()]
+    placed[hubs] = True
+    return place_new_nodes(graph, coords, placed, seed)
+
+
+def compute_layout(graph, engine=None, seed=0):
+    """
+    计算整张图的布局。
+
+    返回:
+        (N, 2) 坐标数组，下标为单词 ID
+    """
+    import networkx as nx
+    n = len(graph)
+    if n == 0:
+        return np.zeros((0, 2))
+    engine = engine or choose_engine(n)
+    if engine == 'multilevel':
+        return _multilevel_layout(graph, seed)
+    nx_graph = graph.to_networkx()
+    if engine == 'kamada_kawai':
+        pos = nx.kamada_kawai_layout(nx_graph)
+    elif engine == 'spring':
+        pos = nx.spring_layout(nx_graph, seed=seed)
+    else:
+        raise ValueError(f"未知的布局算法：{engine}")
+    return np.array([pos[w] for w in graph.vocab.words], dtype=np.float64)
+
+
+class LayoutCache:
+    """
+    按图的版本缓存布局坐标，重复绘图（例如高亮最短路径）时直接复用。
+
+    同一张图追加文本后只放置新节点，已有节点的坐标保持不变；
+    换了一张图才重新完整计算。
+    """
+
+    def __init__(self, engine=None, seed=0):
+        self.engine = engine
+        self.seed = seed
+        self.graph = None
+        self.version = None
+        self.coords = None
+        self._pos = None
+        self.full_computes = 0
+        self.incremental_updates = 0
+        self._lock = threading.Lock()  # 布局可能在后台线程中计算
+
+    def positions(self, graph):
+        """返回 {单词: (x, y)}，可直接传给 networkx 的绘图函数。"""
+        with self._lock:
+            return self._positions(graph)
+
+    def _positions(self, graph):
+        if self.graph is graph and self.version == graph.version:
+            return self._pos
+        n = len(graph)
+        if self.graph is graph and self.coords is not None and len(self.coords) <= n:
+            old = len(self.coords)
+            coords = np.zeros((n, 2))
+            coords[:old] = self.coords
+            placed = np.zeros(n, dtype=bool)
+            placed[:old] = True
+            with span('layout.place_new', nodes=n - old):
+                self.coords = place_new_nodes(graph, coords, placed, self.seed)
+            self.incremental_updates += 1
+        else:
+            with span('layout.compute', nodes=n):
+                self.coords = compute_layout(graph, self.engine, self.seed)
+            self.full_computes += 1
+        self.graph = graph
+        self.version = graph.version
+        self._pos = dict(zip(graph.vocab.words, map(tuple, self.coords.tolist())))
+        return self._pos
@@ -0,0 +1,304 @@
+import csv
+from collections import Counter
+
+import numpy as np
+import scipy.sparse as sp
+
+from compact_graph import CompactGraph
+from instrument import count, span
+
+TOP_K = 20                 # 结果文字中列出的前 K 个单词
+EXPORT_CHUNK = 1 << 16     # 导出完整排名时每次写入的行数
+
+
+def transition_matrix(graph):
+    """
+    构建转移矩阵的转置 M^T（稀疏 CSR），M^T[v, u] = 1 / out_degree(u)。
+
+    与原实现一致，出度按不同后继的个数计算，不考虑边权。
+    """
+    n = len(graph)
+    outdeg = graph.out_degrees
+    src = np.repeat(np.arange(n), outdeg)
+    data = 1.0 / outdeg[src]
+    return sp.csr_matrix((data, (graph.indices, src)), shape=(n, n))
+
+
+def initial_vector(graph, word_list=None):
+    n = len(graph)
+    if word_list:
+        # 计算词频并归一化，图中未出现在 word_list 的词初值为 0
+        freq = Counter(word_list)
+        counts = np.array([freq.get(word, 0) for word in graph.vocab.words],
+                          dtype=np.float64)
+        total = counts.sum()
+        if total > 0:
+            return counts / total
+        # word_list 与图没有共同的词时退回均匀分布，避免除以 0 得到 NaN
+    return np.full(n, 1 / n)
+
+
+def pagerank_vector(graph, damping_factor, max_iter=100, tol=1e-6,
+                    word_list=None, start=None, matrix=None, progress=None):
+    """
+    用稀疏矩阵迭代计算 PageRank。
+
+    参数:
+        graph: CompactGraph
+        damping_factor: float，阻尼因子
+        max_iter: int，最大迭代次数
+        tol: float，两次迭代 L1 差小于该值时停止
+        word_list: 可选，单词列表，用词频作为初始向量
+        start: 可选，初始向量，优先于 word_list
+        matrix: 可选，事先构建好的 transition_matrix(graph)
+        progress: 可选，每轮迭代后调用 progress(已迭代次数, max_iter)，
+            抛出异常即可中断计算
+
+    返回:
+        (numpy 数组, 实际迭代次数)，数组下标为单词 ID
+    """
+    n = len(graph)
+    if n == 0:
+        return np.zeros(0), 0
+    if matrix is None:
+        with span('pagerank.matrix'):
+            matrix = transition_matrix(graph)
+    pr = initial_vector(graph, word_list) if start is None else start
+    dangling = graph.out_degrees == 0
+    teleport = (1 - damping_factor) / n
+
+    iterations = 0
+    with span('pagerank.iterate', nodes=n):
+        for _ in range(max_iter):
+            iterations += 1
+            dangling_sum = pr[dangling].sum()
+            new_pr = matrix @ pr
+            new_pr *= damping_factor
+            new_pr += teleport + damping_factor * dangling_sum / n
+            diff = np.abs(new_pr - pr).sum()
+            pr = new_pr
+            if diff < tol:
+                break
+            if progress is not None:
+                progress(iterations, max_iter)
+    count('pagerank.iterations', iterations)
+    return pr, iterations
+
+
+class PageRankCache:
+    """
+    保存上一次的 PageRank 向量及计算它时的图版本、阻尼因子、tol、max_iter 和 word_list。
+
+    同一张图再次计算时：图没变、阻尼因子和 word_list 相同，且 tol 不更小、max_iter 不更大
+    （要求不比上一次更严格）则直接返回；
+    要求更严格、图只追加了少量文本或阻尼因子略有变化时，从上一次的向量开始迭代（热启动），
+    新增节点的初值取 1/N 后整体归一化。word_list 决定初始向量，换了 word_list 就重新冷启动。
+    转移矩阵也按图的版本缓存。
+
+    属性:
+        iterations: 最近一次计算实际迭代的次数
+        saved_iterations: 与最近一次冷启动的迭代次数相比节省的次数（估计值）
+    """
+
+    def __init__(self):
+        self.graph = None
+        self.version = None
+        self.damping_factor = None
+        self.tol = None
+        self.max_iter = None
+        self.word_list = None
+        self.vector = None
+        self.matrix = None
+        self.cold_iterations = None
+        self.iterations = 0
+        self.saved_iterations = 0
+
+    def compute(self, graph, damping_factor, max_iter=100, tol=1e-6, word_list=None,
+                progress=None):
+        """返回 PageRank 向量（numpy 数组，下标为单词 ID）。"""
+        word_list = list(word_list) if word_list else None
+        same_graph = (self.graph is graph and self.vector is not None
+                      and self.word_list == word_list)
+        unchanged = same_graph and self.version == graph.version
+        if (unchanged and self.damping_factor == damping_factor
+                and tol >= self.tol and max_iter <= self.max_iter):
+            # 直接命中时省下了一次完整的冷启动计算
+            self.saved_iterations = self.cold_iterations
+            self.iterations = 0
+            return self.vector
+
+        if self.graph is not graph or self.version != graph.version:
+            with span('pagerank.matrix'):
+                self.matrix = transition_matrix(graph)
+        start = None
+        if same_graph:
+            n = len(graph)
+            start = np.full(n, 1 / n)
+            start[:len(self.vector)] = self.vector[:n]
+            start /= start.sum()
+
+        pr, iterations = pagerank_vector(graph, damping_factor, max_iter, tol,
+                                         word_list, start=start, matrix=self.matrix,
+                                         progress=progress)
+        if start is None:
+            self.cold_iterations = iterations
+        self.iterations = iterations
+        self.saved_iterations = max(0, (self.cold_iterations or 0) - iterations)
+        self.graph = graph
+        self.version = graph.version
+        self.damping_factor = damping_factor
+        self.tol = tol
+        self.max_iter = max_iter
+        self.word_list = word_list
+        self.vector = pr
+        return pr
+
+
+def calculate_pagerank(Graph,
+                       damping_factor,
+                       max_iter=100,
+                       tol=1e-6,
+                       word_list=None,
+                       cache=None,
+                       progress=None):
+    """
+    与原 calculate_pagerank 参数和返回值相同，返回 {单词: PageRank 值}。
+
+    传入 cache（PageRankCache）时复用上一次的结果做热启动；
+    progress 的含义见 pagerank_vector。
+    """
+    if not isinstance(Graph, CompactGraph):
+        Graph = CompactGraph.from_networkx(Graph)
+    if cache is not None:
+        pr = cache.compute(Graph, damping_factor, max_iter, tol, word_list, progress)
+    else:
+        pr, _ = pagerank_vector(Graph, damping_factor, max_iter, tol, word_list,
+                                progress=progress)
+    return dict(zip(Graph.vocab.words, pr.tolist()))
+
+
+def top_k(vector, k):
+    """
+    PageRank 最高的 k 个单词 ID，从高到低排列，值相同时 ID 小的在前。
+
+    先用 np.partition 找出第 k 大的值，只对不小于它的候选排序，整体 O(N + k log k)。
+    """
+    vector = np.asarray(vector)
+    k = min(k, len(vector))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    neg = -vector
+    if k == len(vector):
+        return np.argsort(neg, kind='stable')
+    kth = np.partition(neg, k - 1)[k - 1]
+    candidates = np.flatnonzero(neg <= kth)
+    return candidates[np.argsort(neg[candidates], kind='stable')][:k]
+
+
+class PageRankRanking:
+    """
+    一次 PageRank 结果的完整排名，供分页显示、查找名次和导出。
+
+    完整排序只在第一次翻页或导出时做一次；取前 K 个和查找单个单词的名次都不需要完整排序。
+    名次从 1 开始，值相同时单词 ID 小的在前。
+
+    参数:
+        vocab: Vocabulary
+        vector: PageRank 向量，下标为单词 ID
+    """
+
+    def __init__(self, vocab, vector):
+        self.vocab = vocab
+        self.vector = vector
+        self._order = None
+
+    def __len__(self):
+        return len(self.vector)
+
+    @property
+    def order(self):
+        """按名次排列的单词 ID。"""
+        if self._order is None:
+            with span('pagerank.rank_sort'):
+                self._order = np.argsort(-self.vector, kind='stable')
+        return self._order
+
+    def top(self, k=TOP_K):
+        """[(名次, 单词, PageRank 值)]，前 k 个。"""
+        ids = self._order[:k] if self._order is not None else top_k(self.vector, k)
+        return self._rows(1, ids)
+
+    def page(self, start, size):
+        """从第 start 名（从 0 开始的偏移）起的 size 行。"""
+        return self._rows(start + 1, self.order[start:start + size])
+
+    def _rows(self, first_rank, ids):
+        words = self.vocab
+        return [(first_rank + i, words[u], score)
+                for i, (u, score) in enumerate(zip(ids.tolist(), self.vector[ids].tolist()))]
+
+    def rank_of(self, word):
+        """单词的名次，不在图中时返回 None。只扫描一遍向量，不需要排序。"""
+        u = self.vocab.get(word.lower().strip())
+        if u is None:
+            return None
+        value = self.vector[u]
+        ahead = int(np.count_nonzero(self.vector > value))
+        ties = int(np.count_nonzero(self.vector[:u] == value))
+        return ahead + ties + 1
+
+    def export(self, path, progress=None):
+        """
+        把完整排名流式写入文件，按扩展名选择格式：.parquet 用 pyarrow，其余写 CSV。
+
+        每次只把 EXPORT_CHUNK 行转换成 Python 对象，内存与单词数无关。
+
+        参数:
+            progress: 可选，每写一块调用 progress(已写行数, 总行数)，抛出异常即可中断
+
+        返回:
+            写入的行数
+        """
+        if path.lower().endswith('.parquet'):
+            return self._export_parquet(path, progress)
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['rank', 'word', 'pagerank'])
+            for start in range(0, len(self), EXPORT_CHUNK):
+                writer.writerows(self.page(start, EXPORT_CHUNK))
+                if progress is not None:
+                    progress(min(start + EXPORT_CHUNK, len(self)), len(self))
+        return len(self)
+
+    def _export_parquet(self, path, progress):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("导出 Parquet 需要安装 pyarrow，也可以改为导出 CSV") from None
+        schema = pa.schema([('rank', pa.int64()), ('word', pa.string()),
+                            ('pagerank', pa.float64())])
+        words = self.vocab
+        with pq.ParquetWriter(path, schema) as writer:
+            for start in range(0, len(self), EXPORT_CHUNK):
+                ids = self.order[start:start + EXPORT_CHUNK]
+                writer.write_table(pa.table({
+                    'rank': np.arange(start + 1, start + 1 + len(ids)),
+                    'word': [words[u] for u in ids.tolist()],
+                    'pagerank': self.vector[ids],
+                }, schema=schema))
+                if progress is not None:
+                    progress(start + len(ids), len(self))
+        return len(self)
+
+
+def format_top_pagerank(ranking, k=TOP_K):
+    """结果文字：只列出前 k 个单词，完整排名在排名窗口中分页查看。"""
+    rows = ranking.top(k)
+    lines = [f"{rank}. {word}: {score:.4f}\n" for rank, word, score in rows]
+    return f"PageRank 前 {len(rows)} 名（共 {len(ranking)} 个单词）：\n" + "".join(lines)
+
+
+def format_pagerank(pagerank):
+    lines = [f"{node}: {rank:.4f}\n" for node, rank in pagerank.items()]
+    return "PageRank值：\n" + "".join(lines)
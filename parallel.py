@@ -0,0 +1,57 @@
+import multiprocessing
+import os
+import threading
+
+# 创建进程池时交给子进程的 (函数, 只读数据)；使用 fork 时由父进程直接继承，不随任务序列化
+_shared = None
+_fork_lock = threading.Lock()
+
+
+def _set_shared(func, shared):
+    global _shared
+    _shared = (func, shared)
+
+
+def _run(task):
+    func, shared = _shared
+    return func(shared, task)
+
+
+def run_shared_pool(func, tasks, shared, processes=None):
+    """
+    对 tasks 中的每个任务调用 func(shared, task)，按输入顺序产出结果（生成器）。
+
+    shared 是所有任务共用的只读数据（例如图和索引），每个子进程只拿到一次：
+    支持 fork 的平台上先设置全局变量再 fork，子进程直接共享父进程的 CSR 数组页；
+    否则在子进程启动时通过 initializer 传入，而不是每个任务都传。
+
+    参数:
+        func: 模块级函数 func(shared, task)（不支持 fork 时需能被 pickle）
+        tasks: 可迭代的任务，按需取用，可以是生成器
+        shared: 只读数据
+        processes: int，进程数，默认 CPU 核数；为 1 时在当前进程内计算
+
+    返回:
+        生成器，产出各任务的结果；提前关闭时终止进程池
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if processes <= 1:
+        for task in tasks:
+            yield func(shared, task)
+        return
+    if 'fork' in multiprocessing.get_all_start_methods():
+        # 全局变量只在 fork 的瞬间需要，之后立即清掉，不同线程的进程池互不影响
+        with _fork_lock:
+            _set_shared(func, shared)
+            try:
+                pool = multiprocessing.get_context('fork').Pool(processes)
+            finally:
+                _set_shared(None, None)
+    else:
+        pool = multiprocessing.Pool(processes, initializer=_set_shared,
+                                    initargs=(func, shared))
+    try:
+        yield from pool.imap(_run, tasks)
+    finally:
+        pool.terminate()
@@ -0,0 +1,248 @@
+import os
+import random
+
+import numpy as np
+
+from instrument import span
+from parallel import run_shared_pool
+
+WALK_RESULTS_FILE = "random_walk_results.txt"
+WALK_SHARD_SIZE = 1 << 14  # 批量游走时每个分片（子任务）包含的游走数
+_HASH_MULT = np.uint64(0x9E3779B97F4A7C15)
+
+
+def random_walk_path(graph, rng=random, start=None, tables=None):
+    """
+    从随机（或指定）起点出发随机游走，遇到没有出边的节点或第一次重复经过某条边时停止。
+
+    参数:
+        graph: CompactGraph
+        rng: 提供 choice 方法的随机数生成器
+        start: 可选，起点单词
+        tables: 可选，AliasTables；给出时按边权抽取后继，否则均匀抽取
+
+    返回:
+        (经过的节点列表, 经过的边列表)
+    """
+    if len(graph) == 0:
+        return [], []
+    words = graph.vocab
+    current = words.index[start] if start is not None else rng.choice(range(len(words)))
+    nodes = [words[current]]
+    edges = []
+    seen = set()
+    while True:
+        neighbors = graph.successor_ids(current)
+        if len(neighbors) == 0:
+            break
+        if tables is not None:
+            nxt = tables.draw(current, rng)
+        else:
+            nxt = rng.choice(neighbors.tolist())
+        if (current, nxt) in seen:
+            break
+        seen.add((current, nxt))
+        edges.append((words[current], words[nxt]))
+        nodes.append(words[nxt])
+        current = nxt
+    return nodes, edges
+
+
+def save_walk_results(nodes, edges, path=WALK_RESULTS_FILE):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("经过的节点：\n")
+        f.write(" -> ".join(nodes) + "\n")
+        f.write("经过的边：\n")
+        for edge in edges:
+            f.write(f"{edge}\n")
+
+
+class EdgeSet:
+    """
+    基于 numpy 开放寻址哈希表的 int64 集合，一次插入一批键，每个键期望 O(1)。
+
+    用来记录“某次游走经过了哪条边”，键为 游走编号 * 边数 + 边的位置。
+    """
+
+    EMPTY = -1
+
+    def __init__(self, capacity=1024):
+        bits = max(10, int(2 * capacity - 1).bit_length())
+        self.table = np.full(1 << bits, self.EMPTY, dtype=np.int64)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def _slots(self, keys, table):
+        bits = len(table).bit_length() - 1
+        return ((keys.astype(np.uint64) * _HASH_MULT) >> np.uint64(64 - bits)).astype(np.int64)
+
+    def _insert(self, table, keys):
+        mask = len(table) - 1
+        new = np.zeros(len(keys), dtype=bool)
+        idx = np.arange(len(keys))
+        pos = self._slots(keys, table)
+        while len(idx):
+            k = keys[idx]
+            cur = table[pos]
+            present = cur == k
+            empty = cur == self.EMPTY
+            # 多个键落在同一个空位时只有最后写入的成功，其余继续向后探测
+            table[pos[empty]] = k[empty]
+            claimed = np.zeros(len(idx), dtype=bool)
+            claimed[empty] = table[pos[empty]] == k[empty]
+            new[idx[claimed]] = True
+            keep = ~(present | claimed)
+            idx = idx[keep]
+            pos = (pos[keep] + 1) & mask
+        return new
+
+    def add(self, keys):
+        """
+        插入一批互不相同的非负键。
+
+        返回:
+            布尔数组，True 表示该键之前不在集合中
+        """
+        keys = np.asarray(keys, dtype=np.int64)
+        if 2 * (self.size + len(keys)) > len(self.table):
+            old = self.table[self.table != self.EMPTY]
+            bits = int(4 * (self.size + len(keys)) - 1).bit_length()
+            self.table = np.full(1 << bits, self.EMPTY, dtype=np.int64)
+            self._insert(self.table, old)
+        new = self._insert(self.table, keys)
+        self.size += int(new.sum())
+        return new
+
+
+class WalkBatch:
+    """
+    一批游走的结果，所有游走的节点 ID 首尾相接存放。
+
+    第 i 次游走经过的节点是 nodes[offsets[i]:offsets[i + 1]]。
+    """
+
+    def __init__(self, offsets, nodes):
+        self.offsets = offsets
+        self.nodes = nodes
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.nodes[self.offsets[i]:self.offsets[i + 1]]
+
+    @property
+    def lengths(self):
+        """每次游走经过的边数。"""
+        return np.maximum(np.diff(self.offsets) - 1, 0)
+
+    def words(self, graph, i):
+        return [graph.vocab[v] for v in self[i].tolist()]
+
+    @classmethod
+    def concat(cls, batches):
+        batches = list(batches)
+        sizes = [len(b.nodes) for b in batches]
+        shifts = np.cumsum([0] + sizes[:-1])
+        offsets = [np.zeros(1, dtype=np.int64)]
+        offsets += [b.offsets[1:] + shift for b, shift in zip(batches, shifts)]
+        nodes = [b.nodes for b in batches]
+        return cls(np.concatenate(offsets), np.concatenate(nodes or [np.zeros(0, np.int32)]))
+
+
+def walk_shard(graph, starts, rng, max_steps=None, tables=None):
+    """
+    所有游走同步前进的向量化随机游走。
+
+    每一步对所有仍在进行的游走一次性抽取后继；
+    与 random_walk_path 相同，没有出边或第一次重复经过某条边时停止，重复的那条边不计入。
+
+    参数:
+        graph: CompactGraph
+        starts: 起点 ID 数组
+        rng: numpy.random.Generator
+        max_steps: 可选，每次游走最多的步数
+        tables: 可选，AliasTables；给出时按边权抽取后继
+
+    返回:
+        WalkBatch
+    """
+    indptr, indices = graph.indptr, graph.indices
+    m = max(len(indices), 1)
+    seen = EdgeSet(8 * len(starts))
+    active = np.arange(len(starts), dtype=np.int64)
+    cur = np.asarray(starts, dtype=np.int64)
+    walk_ids, visited = [active], [cur]
+    steps = 0
+    while len(active) and (max_steps is None or steps < max_steps):
+        lo = indptr[cur]
+        deg = indptr[cur + 1] - lo
+        alive = deg > 0
+        active, lo, deg = active[alive], lo[alive], deg[alive]
+        if tables is not None:
+            slot = tables.draw_slots(lo, deg, rng)
+        else:
+            slot = lo + (rng.random(len(active)) * deg).astype(np.int64)
+        # 边由它在正向数组中的位置唯一标识
+        fresh = seen.add(active * m + slot)
+        active = active[fresh]
+        cur = indices[slot[fresh]].astype(np.int64)
+        walk_ids.append(active)
+        visited.append(cur)
+        steps += 1
+    walk_ids = np.concatenate(walk_ids)
+    # 稳定排序：同一游走内保持步数顺序
+    order = np.argsort(walk_ids, kind='stable')
+    counts = np.bincount(walk_ids, minlength=len(starts))
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    return WalkBatch(offsets, np.concatenate(visited)[order].astype(np.int32))
+
+
+def _run_shard(shared, task):
+    starts, count, seed, max_steps = task
+    graph, tables = shared
+    rng = np.random.default_rng(seed)
+    if starts is None:
+        starts = rng.integers(len(graph), size=count)
+    return walk_shard(graph, starts, rng, max_steps, tables)
+
+
+def random_walks(graph, num_walks=None, starts=None, seed=None, max_steps=None,
+                 processes=None, shard_size=WALK_SHARD_SIZE, tables=None):
+    """
+    批量随机游走，按分片在多个进程中并行。
+
+    每个分片使用由 seed 派生的独立随机数流，
+    因此同一个 seed 的结果与进程数无关。
+
+    参数:
+        graph: CompactGraph
+        num_walks: 游走次数（起点随机）；给出 starts 时可省略
+        starts: 可选，起点 ID 数组
+        seed: 可选，随机种子
+        max_steps: 可选，每次游走最多的步数
+        processes: int，进程数，默认 CPU 核数；为 1 时在当前进程内计算
+        shard_size: int，每个分片的游走数
+        tables: 可选，AliasTables；给出时按边权抽取后继
+
+    返回:
+        WalkBatch
+    """
+    if num_walks is None and starts is None:
+        raise ValueError("random_walks 需要 num_walks 或 starts 参数")
+    if len(graph) == 0:
+        return WalkBatch(np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int32))
+    if starts is not None:
+        starts = np.asarray(starts, dtype=np.int64)
+        num_walks = len(starts)
+    bounds = list(range(0, num_walks, shard_size)) + [num_walks]
+    seeds = np.random.SeedSequence(seed).spawn(len(bounds) - 1)
+    tasks = [(None if starts is None else starts[a:b], b - a, s, max_steps)
+             for a, b, s in zip(bounds, bounds[1:], seeds)]
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = min(processes, len(tasks))
+    with span('walk.batch', walks=num_walks, processes=processes):
+        return WalkBatch.concat(run_shared_pool(_run_shard, tasks, (graph, tables), processes))
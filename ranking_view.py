@@ -0,0 +1,117 @@
+PAGE_SIZE = 100  # 排名列表每页的行数
+
+
+class RankingWindow:
+    """
+    PageRank 排名窗口：分页列表、按单词查找名次、导出完整排名。
+
+    列表框中每次只放一页（PAGE_SIZE 行），控件大小与单词总数无关；
+    翻页时才从 PageRankRanking 取出这一页的单词。
+
+    参数:
+        master: Tk 父窗口
+        on_export: 回调 on_export(ranking, 文件路径)，由调用方决定如何（在后台）写文件
+    """
+
+    def __init__(self, master, on_export=None):
+        import tkinter as tk
+        self.on_export = on_export
+        self.ranking = None
+        self.start = 0
+        self.window = tk.Toplevel(master)
+        self.window.title("PageRank 排名")
+        self.window.protocol("WM_DELETE_WINDOW", self.window.withdraw)
+
+        search = tk.Frame(self.window)
+        search.pack(fill=tk.X, padx=5, pady=5)
+        tk.Label(search, text="查找单词：", font=('Arial', 11)).pack(side=tk.LEFT)
+        self.entry = tk.Entry(search, width=20, font=('Arial', 11))
+        self.entry.pack(side=tk.LEFT, padx=5)
+        self.entry.bind('<Return>', lambda event: self.search())
+        tk.Button(search, text="查找", command=self.search).pack(side=tk.LEFT)
+        tk.Button(search, text="导出 CSV/Parquet", command=self.export).pack(side=tk.RIGHT)
+
+        body = tk.Frame(self.window)
+        body.pack(fill=tk.BOTH, expand=True, padx=5)
+        scrollbar = tk.Scrollbar(body)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.listbox = tk.Listbox(body, width=50, height=25, font=('Courier', 11),
+                                  yscrollcommand=scrollbar.set)
+        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.config(command=self.listbox.yview)
+
+        nav = tk.Frame(self.window)
+        nav.pack(fill=tk.X, padx=5, pady=5)
+        for text, command in (("首页", self.first_page), ("上一页", self.prev_page),
+                              ("下一页", self.next_page), ("末页", self.last_page)):
+            tk.Button(nav, text=text, command=command).pack(side=tk.LEFT, padx=2)
+        self.status = tk.StringVar()
+        tk.Label(nav, textvariable=self.status, font=('Arial', 10)).pack(side=tk.LEFT, padx=10)
+
+    @property
+    def alive(self):
+        try:
+            return bool(self.window.winfo_exists())
+        except Exception:
+            return False
+
+    def show(self, ranking):
+        """显示新的排名，回到第一页。"""
+        self.ranking = ranking
+        self.start = 0
+        self._render()
+        self.window.deiconify()
+        self.window.lift()
+
+    def _render(self, select=None, message=''):
+        self.listbox.delete(0, 'end')
+        total = len(self.ranking)
+        for rank, word, score in self.ranking.page(self.start, PAGE_SIZE):
+            self.listbox.insert('end', f"{rank:>8}  {word:<24}{score:.6f}")
+        if select is not None:
+            self.listbox.selection_set(select)
+            self.listbox.see(select)
+        pages = max(1, -(-total // PAGE_SIZE))
+        self.status.set(f"第 {self.start // PAGE_SIZE + 1} / {pages} 页，共 {total} 个单词"
+                        + (f"  {message}" if message else ''))
+
+    def _go(self, start):
+        if self.ranking is None:
+            return
+        last = max(0, (len(self.ranking) - 1) // PAGE_SIZE * PAGE_SIZE)
+        self.start = min(max(0, start), last)
+        self._render()
+
+    def first_page(self):
+        self._go(0)
+
+    def prev_page(self):
+        self._go(self.start - PAGE_SIZE)
+
+    def next_page(self):
+        self._go(self.start + PAGE_SIZE)
+
+    def last_page(self):
+        self._go(len(self.ranking) if self.ranking is not None else 0)
+
+    def search(self):
+        """跳到输入单词所在的页并选中它。"""
+        if self.ranking is None:
+            return
+        word = self.entry.get().lower().strip()
+        rank = self.ranking.rank_of(word)
+        if rank is None:
+            self._render(message=f"单词 '{word}' 不在图中！")
+            return
+        self.start = (rank - 1) // PAGE_SIZE * PAGE_SIZE
+        self._render(select=rank - 1 - self.start, message=f"{word} 排第 {rank} 名")
+
+    def export(self):
+        from tkinter import filedialog
+        if self.ranking is None or self.on_export is None:
+            return
+        path = filedialog.asksaveasfilename(
+            parent=self.window, defaultextension=".csv", initialfile="pagerank.csv",
+            filetypes=[("CSV files", "*.csv"), ("Parquet files", "*.parquet")])
+        if path:
+            self.on_export(self.ranking, path)
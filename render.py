@@ -0,0 +1,261 @@
+from itertools import cycle, islice
+
+import numpy as np
+
+from bridge_words import gather_rows
+from instrument import span
+
+HIGHLIGHT_COLORS = ('red', 'green', 'purple', 'orange', 'brown', 'magenta')
+WALK_COLOR = 'red'
+
+# 细节层次：无论词表多大，每次完整绘制的图元数量都有上限
+MAX_VISIBLE_NODES = 300      # 最多绘制的节点数（按 PageRank 或度数取前 K 个）
+MAX_VISIBLE_EDGES = 3000     # 可见节点之间最多绘制的边数（取权重最大的）
+LABEL_ALL_NODES = 50         # 节点不超过这个数时所有节点都显示标签
+LABEL_MIN_SIZE = 300         # 否则只有绘制尺寸不小于这个值的节点显示标签，
+MAX_LABELS = 60              # 且最多显示这么多个（取尺寸最大的）
+EDGE_LABEL_MAX_EDGES = 150   # 可见边不超过这个数时才显示边的权重
+MIN_NODE_SIZE = 60
+MAX_NODE_SIZE = 600
+OVERLAY_NODE_SIZE = 300
+ARROW_POSITION = 0.85        # 箭头在边上的相对位置
+
+
+def select_visible(rank, k=MAX_VISIBLE_NODES):
+    """
+    选出分数最高的 k 个节点。
+
+    返回:
+        按单词 ID 升序排列的节点 ID 数组
+    """
+    rank = np.asarray(rank)
+    if len(rank) <= k:
+        return np.arange(len(rank))
+    top = np.argpartition(-rank, k - 1)[:k]
+    top.sort()
+    return top
+
+
+def visible_edges(graph, visible, max_edges=MAX_VISIBLE_EDGES):
+    """
+    两端都可见的边。
+
+    返回:
+        (src, dst, weight)，src/dst 是 visible 中的下标；
+        超过 max_edges 条时只保留权重最大的边
+    """
+    n = len(graph)
+    local = np.full(n, -1, dtype=np.int64)
+    local[visible] = np.arange(len(visible))
+    dst = local[gather_rows(graph.indptr, graph.indices, visible)]
+    weight = gather_rows(graph.indptr, graph.weights, visible)
+    src = np.repeat(np.arange(len(visible)), graph.out_degrees[visible])
+    keep = dst >= 0
+    src, dst, weight = src[keep], dst[keep], weight[keep]
+    if len(src) > max_edges:
+        top = np.sort(np.argpartition(-weight, max_edges - 1)[:max_edges])
+        src, dst, weight = src[top], dst[top], weight[top]
+    return src, dst, weight
+
+
+def node_sizes(rank):
+    """把节点分数线性映射到 [MIN_NODE_SIZE, MAX_NODE_SIZE] 的绘制尺寸。"""
+    rank = np.asarray(rank, dtype=np.float64)
+    if len(rank) == 0:
+        return rank
+    lo, hi = rank.min(), rank.max()
+    if hi <= lo:
+        return np.full(len(rank), float(MAX_NODE_SIZE))
+    return MIN_NODE_SIZE + (MAX_NODE_SIZE - MIN_NODE_SIZE) * (rank - lo) / (hi - lo)
+
+
+def _tk_canvas(figure, master):
+    import tkinter as tk
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    canvas = FigureCanvasTkAgg(figure, master=master)
+    canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+    return canvas
+
+
+class GraphView:
+    """
+    常驻的绘图区域：整张图只在图或布局变化时完整绘制一次，
+    绘制结果缓存为背景位图；最短路径高亮和随机游走的每一步作为叠加层，
+    只在背景上重画这几条边（blit），不重建 Figure。
+
+    大图只绘制分数最高的 max_nodes 个节点及其间权重最大的 max_edges 条边
+    （默认见 MAX_VISIBLE_NODES、MAX_VISIBLE_EDGES），叠加层中的节点总会画出。
+
+    Figure 直接创建而不经过 pyplot，不会留在 pyplot 的全局列表里；
+    不再使用时调用 close() 释放。
+    """
+
+    def __init__(self, master=None, figsize=(10, 8), canvas_factory=_tk_canvas,
+                 max_nodes=MAX_VISIBLE_NODES, max_edges=MAX_VISIBLE_EDGES):
+        from matplotlib.figure import Figure
+        self.figure = Figure(figsize=figsize)
+        self.ax = self.figure.add_subplot()
+        self.canvas = canvas_factory(self.figure, master)
+        self.max_nodes = max_nodes
+        self.max_edges = max_edges
+        self.graph = None
+        self.pos = None
+        self.overlays = []
+        self.base_draws = 0
+        self.visible = None
+        self._version = None
+        self._scores = None
+        self._labelled = set()
+        self._background = None
+        self._draw_cid = self.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _on_draw(self, event):
+        # 窗口缩放等触发完整重绘后，重新缓存背景并补画叠加层
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+        for artist in self.overlays:
+            self.ax.draw_artist(artist)
+
+    def show_graph(self, graph, pos, scores=None):
+        """
+        绘制整张图。图的版本、布局和排序分数都没变时直接返回，不重复绘制。
+
+        节点多于 MAX_VISIBLE_NODES 时只画分数最高的节点及它们之间的边，
+        其余节点不画；高亮路径上的节点由叠加层补画。
+
+        参数:
+            graph: CompactGraph
+            pos: {单词: (x, y)}
+            scores: 按单词 ID 排列的节点重要性（例如 PageRank），默认用度数
+        """
+        if (graph is self.graph and graph.version == self._version and pos is self.pos
+                and scores is self._scores):
+            return False
+        with span('render.draw', nodes=len(graph)):
+            self._show_graph(graph, pos, scores)
+        return True
+
+    def _show_graph(self, graph, pos, scores):
+        self.clear_overlays(redraw=False)
+        self.ax.clear()
+        self.ax.set_axis_off()
+        words = graph.vocab.words
+        if scores is None or len(scores) != len(graph):
+            scores = None
+            rank = graph.out_degrees + np.diff(graph.rindptr)
+        else:
+            rank = scores
+        visible = select_visible(rank, self.max_nodes)
+        src, dst, weight = visible_edges(graph, visible, self.max_edges)
+        xy = np.array([pos[words[i]] for i in visible.tolist()], dtype=np.float64).reshape(-1, 2)
+        sizes = node_sizes(rank[visible])
+        self._draw_edges(xy, src, dst)
+        self.ax.scatter(xy[:, 0], xy[:, 1], s=sizes, c='lightblue', zorder=2)
+        labelled = np.ones(len(visible), dtype=bool)
+        if len(graph) > LABEL_ALL_NODES:
+            labelled = np.zeros(len(visible), dtype=bool)
+            largest = np.argsort(-sizes, kind='stable')[:MAX_LABELS]
+            labelled[largest[sizes[largest] >= LABEL_MIN_SIZE]] = True
+        for i in np.flatnonzero(labelled).tolist():
+            self.ax.text(xy[i, 0], xy[i, 1], words[visible[i]], fontsize=10,
+                         ha='center', va='center', zorder=3)
+        if len(src) <= EDGE_LABEL_MAX_EDGES:
+            mid = (xy[src] + xy[dst]) / 2
+            for (x, y), w in zip(mid.tolist(), weight.tolist()):
+                self.ax.text(x, y, str(w), fontsize=8, ha='center', va='center', zorder=3,
+                             bbox=dict(boxstyle='round', ec='none', fc='white', alpha=0.7))
+        if len(visible) < len(graph):
+            self.ax.text(0.01, 0.01, f"{len(visible)} / {len(graph)} nodes",
+                         transform=self.ax.transAxes, fontsize=9, color='gray')
+        self.ax.autoscale_view()
+        self.graph = graph
+        self.pos = pos
+        self._scores = scores
+        self._version = graph.version
+        self._labelled = {words[i] for i in visible[labelled].tolist()}
+        self.visible = visible
+        self.base_draws += 1
+        # draw_event 回调会缓存背景
+        self.canvas.draw()
+
+    def _draw_edges(self, xy, src, dst, colors='gray', width=1.0, animated=False):
+        """所有边放进一个 LineCollection，箭头放进一个 quiver，只产生两个图元。"""
+        from matplotlib.collections import LineCollection
+        if len(src) == 0:
+            return []
+        start, end = xy[src], xy[dst]
+        lines = LineCollection(np.stack([start, end], axis=1), colors=colors,
+                               linewidths=width, zorder=1, animated=animated)
+        self.ax.add_collection(lines)
+        # 箭头画在靠近终点的位置，指向终点
+        tip = start + (end - start) * ARROW_POSITION
+        delta = (end - start) * 0.01
+        arrows = self.ax.quiver(tip[:, 0], tip[:, 1], delta[:, 0], delta[:, 1],
+                                color=colors, angles='xy', scale_units='xy', scale=1, pivot='tip',
+                                units='dots',
+                                width=width, headwidth=6, headlength=8, headaxislength=7,
+                                zorder=1, animated=animated)
+        return [lines, arrows]
+
+    def _new_overlay(self, edge_lists, colors):
+        """把若干组高亮边及其端点画成叠加层（每组一种颜色）。"""
+        edges = [edge for group in edge_lists for edge in group]
+        if not edges or self.graph is None:
+            return []
+        seg_colors = [color for group, color in zip(edge_lists, colors) for _ in group]
+        nodes = list(dict.fromkeys(word for edge in edges for word in edge))
+        index = {word: i for i, word in enumerate(nodes)}
+        xy = np.array([self.pos[word] for word in nodes], dtype=np.float64)
+        src = np.array([index[a] for a, _ in edges])
+        dst = np.array([index[b] for _, b in edges])
+        artists = self._draw_edges(xy, src, dst, seg_colors, width=2.5, animated=True)
+        # 不在基础画面中的节点（被省略或没有标签）在叠加层里补画
+        hidden = [i for i, word in enumerate(nodes) if word not in self._labelled]
+        if hidden:
+            artists.append(self.ax.scatter(xy[hidden, 0], xy[hidden, 1], s=OVERLAY_NODE_SIZE,
+                                           c='lightyellow', edgecolors='gray', zorder=2,
+                                           animated=True))
+            artists.extend(self.ax.text(xy[i, 0], xy[i, 1], nodes[i], fontsize=10,
+                                        ha='center', va='center', zorder=3, animated=True)
+                           for i in hidden)
+        self.overlays.extend(artists)
+        return artists
+
+    def add_overlay(self, edges, color=WALK_COLOR):
+        """在当前画面上叠加一组高亮边，返回新建的图元列表。"""
+        artists = self._new_overlay([edges], [color])
+        self._blit(artists)
+        return artists
+
+    def highlight(self, edge_lists):
+        """用新的路径替换当前所有叠加层，每条路径一种颜色。"""
+        self.clear_overlays(redraw=False)
+        edge_lists = edge_lists or []
+        self._new_overlay(edge_lists, islice(cycle(HIGHLIGHT_COLORS), len(edge_lists)))
+        self._blit(self.overlays, restore=True)
+
+    def clear_overlays(self, redraw=True):
+        for artist in self.overlays:
+            artist.remove()
+        self.overlays = []
+        if redraw:
+            self._blit([], restore=True)
+
+    def _blit(self, artists, restore=False):
+        if self._background is None:
+            return
+        with span('render.blit'):
+            if restore:
+                self.canvas.restore_region(self._background)
+            for artist in artists:
+                self.ax.draw_artist(artist)
+            self.canvas.blit(self.figure.bbox)
+
+    def close(self):
+        """释放 Figure 和画布控件。"""
+        self.clear_overlays(redraw=False)
+        self.canvas.mpl_disconnect(self._draw_cid)
+        widget = getattr(self.canvas, 'get_tk_widget', None)
+        if widget is not None:
+            widget().destroy()
+        self.figure.clear()
+        self.graph = self.pos = self._scores = self._background = None
@@ -0,0 +1,144 @@
+import random
+from bisect import bisect_right
+
+import numpy as np
+
+from instrument import span
+
+BRIDGE_ATTEMPTS = 16  # 按权重抽桥接词时拒绝采样的最多次数，之后改用累计权重
+
+
+class AliasTables:
+    """
+    每个节点一张 Walker 别名表，按边权（二元组出现次数）O(1) 抽取后继。
+
+    表与正向 CSR 数组对齐：对节点 u 的第 k 条出边（位置 slot = indptr[u] + k），
+    prob[slot] 是保留该边的概率，alias[slot] 是落选时改用的边位置。
+    抽样时在 u 的出边中均匀选一个位置，再用一个随机数决定取它还是它的别名。
+
+    参数:
+        graph: CompactGraph
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        with span('sampling.alias_tables'):
+            self._build()
+
+    def _build(self):
+        g = self.graph
+        self.version = g.version
+        m = len(g.indices)
+        self.prob = np.ones(m)
+        self.alias = np.arange(m, dtype=np.int64)
+        self._build_rows(self._weighted_rows(np.arange(len(g))))
+
+    def _weighted_rows(self, rows):
+        """rows 中出边权重不全相同的节点；权重全相同的行保持均匀抽样即可。"""
+        g = self.graph
+        rows = np.asarray(rows, dtype=np.int64)
+        degree = g.out_degrees
+        nonempty = np.flatnonzero(degree > 0)
+        uniform = np.ones(len(g), dtype=bool)
+        if len(nonempty):
+            # 非空行在正向数组中首尾相接，reduceat 恰好逐行求最小、最大值
+            starts = g.indptr[nonempty]
+            uniform[nonempty] = (np.minimum.reduceat(g.weights, starts)
+                                 == np.maximum.reduceat(g.weights, starts))
+        return rows[(degree[rows] > 1) & ~uniform[rows]]
+
+    def _build_rows(self, rows):
+        """用 Vose 算法为 rows 中的每个节点建表。"""
+        g = self.graph
+        for u in rows.tolist():
+            lo, hi = int(g.indptr[u]), int(g.indptr[u + 1])
+            weights = g.weights[lo:hi].astype(np.float64)
+            scaled = (weights * (len(weights) / weights.sum())).tolist()
+            prob = [1.0] * len(scaled)
+            alias = list(range(lo, hi))
+            small = [i for i, p in enumerate(scaled) if p < 1.0]
+            large = [i for i, p in enumerate(scaled) if p >= 1.0]
+            while small and large:
+                s, big = small.pop(), large.pop()
+                prob[s] = scaled[s]
+                alias[s] = lo + big
+                scaled[big] -= 1.0 - scaled[s]
+                (small if scaled[big] < 1.0 else large).append(big)
+            self.prob[lo:hi] = prob
+            self.alias[lo:hi] = alias
+
+    @property
+    def is_stale(self):
+        return self.version != self.graph.version
+
+    def refresh(self, delta):
+        """
+        图追加文本后增量更新：已有的表随边位置一起搬移，只重建出边变化的节点。
+
+        参数:
+            delta: CompactGraph.append_words 返回的 GraphDelta
+        """
+        m = len(self.graph.indices)
+        prob = np.ones(m)
+        alias = np.arange(m, dtype=np.int64)
+        slot_map = delta.slot_map
+        prob[slot_map] = self.prob
+        alias[slot_map] = slot_map[self.alias]
+        self.prob, self.alias = prob, alias
+        rows = np.asarray(delta.changed_rows, dtype=np.int64)
+        g = self.graph
+        # 先把变化的行恢复成均匀抽样，再重建权重不全相同的行
+        for u in rows.tolist():
+            lo, hi = int(g.indptr[u]), int(g.indptr[u + 1])
+            self.prob[lo:hi] = 1.0
+            self.alias[lo:hi] = np.arange(lo, hi)
+        self._build_rows(self._weighted_rows(rows))
+        self.version = g.version
+
+    def draw_slot(self, u, rng=random):
+        """按边权抽取 u 的一条出边，返回它在正向数组中的位置；没有出边时返回 -1。"""
+        g = self.graph
+        lo = int(g.indptr[u])
+        degree = int(g.indptr[u + 1]) - lo
+        if degree == 0:
+            return -1
+        slot = lo + int(rng.random() * degree)
+        return slot if rng.random() < self.prob[slot] else int(self.alias[slot])
+
+    def draw(self, u, rng=random):
+        """按边权抽取 u 的一个后继 ID；没有出边时返回 None。"""
+        slot = self.draw_slot(u, rng)
+        return None if slot < 0 else int(self.graph.indices[slot])
+
+    def draw_slots(self, lo, degree, rng):
+        """
+        向量化抽样：对每个 (行起点, 出度) 各抽一条出边（出度必须大于 0）。
+
+        参数:
+            rng: numpy.random.Generator
+
+        返回:
+            边位置数组
+        """
+        slot = lo + (rng.random(len(lo)) * degree).astype(np.int64)
+        keep = rng.random(len(lo)) < self.prob[slot]
+        return np.where(keep, slot, self.alias[slot])
+
+    def choose_among(self, u, candidates, rng=random, attempts=BRIDGE_ATTEMPTS):
+        """
+        在 u 的后继 candidates 中按边权 u->c 抽取一个。
+
+        先用 u 的别名表拒绝采样；候选只占很小权重、多次未抽中时，
+        改为对候选的边权求累计和再抽取。
+        """
+        if len(candidates) == 1:
+            return int(candidates[0])
+        candidates = np.asarray(candidates).tolist()
+        wanted = set(candidates)
+        for _ in range(attempts):
+            v = self.draw(u, rng)
+            if v in wanted:
+                return v
+        g = self.graph
+        cum = np.cumsum([g.weights[g.edge_slot(u, c)] for c in candidates]).tolist()
+        return candidates[bisect_right(cum, rng.random() * cum[-1])]
@@ -0,0 +1,505 @@
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from heapq import heappop, heappush
+
+import numpy as np
+
+from instrument import count, span
+from text_graph import NO_GRAPH_MESSAGE
+
+SINGLE_SOURCE_LIMIT = 30  # 单源查询时最多显示的目标数
+MAX_LISTED_PATHS = 100    # 点对查询时最多列出的并列最短路径数
+PATH_TIME_BUDGET = 1.0    # 秒，列出并列最短路径的时间上限
+MAX_HIGHLIGHT_PATHS = 6   # 最多高亮的路径数
+INF = float('inf')
+TREE_CACHE_BYTES = 64 << 20  # 最短路径树缓存的默认内存上限
+
+
+def path_weight(graph, path):
+    return sum(graph.weight(path[i], path[i + 1]) for i in range(len(path) - 1))
+
+
+def path_edges(path):
+    return [(path[i], path[i + 1]) for i in range(len(path) - 1)]
+
+
+def _neighbors(graph, u, reverse=False):
+    """u 的后继（reverse 时为前驱）及对应边权，均为 Python 列表。"""
+    if reverse:
+        a, b = graph.rindptr[u], graph.rindptr[u + 1]
+        return graph.rindices[a:b].tolist(), graph.weights[graph.redges[a:b]].tolist()
+    a, b = graph.indptr[u], graph.indptr[u + 1]
+    return graph.indices[a:b].tolist(), graph.weights[a:b].tolist()
+
+
+class ShortestPathTree:
+    """
+    一次 Dijkstra 的结果：已确定最短距离的节点的距离和前驱。
+
+    属性:
+        source: 起点 ID
+        order: 按距离从小到大确定的节点 ID 列表，第一个是起点
+        dist: {节点 ID: 距离}，只含已确定的节点
+        pred: {节点 ID: 前驱 ID}；all_preds 时为所有等长前驱的列表
+    """
+
+    def __init__(self, source, order, dist, pred):
+        self.source = source
+        self.order = order
+        self.dist = dist
+        self.pred = pred
+
+    def distance(self, v):
+        return self.dist.get(v, INF)
+
+    def path(self, v):
+        """起点到 v 的一条最短路径（ID 列表），不可达时为 None。"""
+        if v not in self.dist:
+            return None
+        path = []
+        while v is not None:
+            path.append(v)
+            v = self.pred[v]
+            if isinstance(v, list):
+                v = v[0] if v else None
+        path.reverse()
+        return path
+
+
+class PackedTree:
+    """
+    以数组保存的完整单源最短路径树，供 ShortestPathCache 缓存。
+
+    属性:
+        source: 起点 ID
+        order: 按距离从小到大排列的可达节点 ID（int32 数组），第一个是起点
+        dist: 长度 N 的距离数组，不可达为 inf
+        pred: 长度 N 的前驱数组，起点和不可达节点为 -1
+    """
+
+    def __init__(self, tree, n):
+        self.source = tree.source
+        self.order = np.array(tree.order, dtype=np.int32)
+        # 距离用 float64 保存，以便用 inf 表示不可达
+        self.dist = np.full(n, INF)
+        self.dist[self.order] = [tree.dist[v] for v in tree.order]
+        self.pred = np.full(n, -1, dtype=np.int32)
+        self.pred[self.order[1:]] = [tree.pred[v] for v in tree.order[1:]]
+
+    @property
+    def nbytes(self):
+        return self.order.nbytes + self.dist.nbytes + self.pred.nbytes
+
+    def distance(self, v):
+        d = self.dist[v]
+        # 边权都是整数，返回 int 与 ShortestPathTree 一致
+        return INF if d == INF else int(d)
+
+    def path(self, v):
+        """起点到 v 的一条最短路径（ID 列表），不可达时为 None。"""
+        if self.dist[v] == INF:
+            return None
+        pred = self.pred
+        path = [v]
+        while v != self.source:
+            v = int(pred[v])
+            path.append(v)
+        path.reverse()
+        return path
+
+    def tied_preds(self, graph, v):
+        """v 的所有等长前驱：满足 dist[u] + w(u, v) == dist[v] 的前驱 u。"""
+        a, b = graph.rindptr[v], graph.rindptr[v + 1]
+        preds = graph.rindices[a:b]
+        tight = self.dist[preds] + graph.weights[graph.redges[a:b]] == self.dist[v]
+        return preds[tight].tolist()
+
+
+class ShortestPathCache:
+    """
+    按 (图的版本, 起点) 缓存完整的单源最短路径树，LRU 淘汰。
+
+    同一起点的点对查询和“到所有单词”的查询都直接用缓存的树回答；
+    图换了或追加文本后（version 变化）自动清空。
+
+    属性:
+        hits / misses: 命中和未命中次数
+        evictions: 因超出内存上限被淘汰的树的个数
+        nbytes: 当前缓存的数组占用的字节数
+    """
+
+    def __init__(self, max_bytes=TREE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.graph = None
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.nbytes = 0
+        self._trees = OrderedDict()
+        self._lock = threading.Lock()  # 查询可能在后台线程中进行
+
+    def __len__(self):
+        return len(self._trees)
+
+    def clear(self):
+        with self._lock:
+            self._trees.clear()
+            self.nbytes = 0
+
+    def tree(self, graph, source):
+        """返回起点 source 的 PackedTree，缓存中没有时运行一次 Dijkstra。"""
+        with self._lock:
+            if graph is not self.graph or graph.version != self.version:
+                self._trees.clear()
+                self.nbytes = 0
+                self.graph = graph
+                self.version = graph.version
+            key = (graph.version, source)
+            tree = self._trees.get(key)
+            if tree is not None:
+                self._trees.move_to_end(key)
+                self.hits += 1
+                count('path.cache_hits')
+                return tree
+            self.misses += 1
+            count('path.cache_misses')
+            tree = PackedTree(dijkstra(graph, source), len(graph))
+            self._trees[key] = tree
+            self.nbytes += tree.nbytes
+            # 至少保留刚算出的这棵树
+            while self.nbytes > self.max_bytes and len(self._trees) > 1:
+                _, old = self._trees.popitem(last=False)
+                self.nbytes -= old.nbytes
+                self.evictions += 1
+            return tree
+
+
+def dijkstra(graph, source, targets=None, bound=INF, all_preds=False):
+    """
+    单源 Dijkstra，一遍同时得到距离和前驱树。
+
+    参数:
+        graph: CompactGraph
+        source: 起点 ID
+        targets: 可选，目标 ID 集合，全部确定后提前结束
+        bound: 距离超过 bound 的节点不再加入搜索
+        all_preds: 为 True 时记录所有等长前驱，用于枚举并列的最短路径
+
+    返回:
+        ShortestPathTree
+    """
+    tentative = {source: 0}
+    dist = {}
+    pred = {source: [] if all_preds else None}
+    order = []
+    remaining = set(targets) if targets is not None else None
+    heap = [(0, source)]
+    while heap:
+        d, u = heappop(heap)
+        if u in dist:
+            continue
+        dist[u] = d
+        order.append(u)
+        if remaining is not None:
+            remaining.discard(u)
+            if not remaining:
+                break
+        for v, w in zip(*_neighbors(graph, u)):
+            nd = d + w
+            if nd > bound or v in dist:
+                continue
+            old = tentative.get(v)
+            if old is None or nd < old:
+                tentative[v] = nd
+                pred[v] = [u] if all_preds else u
+                heappush(heap, (nd, v))
+            elif all_preds and nd == old:
+                pred[v].append(u)
+    return ShortestPathTree(source, order, dist, pred)
+
+
+def bidirectional_dijkstra(graph, source, target):
+    """
+    点到点的双向 Dijkstra：从起点沿出边、从终点沿入边同时搜索，
+    每次扩展队列较小的一侧，两侧队首距离之和不小于已知最短距离时停止。
+
+    返回:
+        (距离, 路径 ID 列表)，不可达时为 (INF, None)
+    """
+    if source == target:
+        return 0, [source]
+    dists = ({source: 0}, {target: 0})
+    preds = ({source: None}, {target: None})
+    done = (set(), set())
+    heaps = ([(0, source)], [(0, target)])
+    best, meet = INF, None
+    while heaps[0] and heaps[1]:
+        if heaps[0][0][0] + heaps[1][0][0] >= best:
+            break
+        side = 0 if len(heaps[0]) <= len(heaps[1]) else 1
+        d, u = heappop(heaps[side])
+        if u in done[side]:
+            continue
+        done[side].add(u)
+        mine, other = dists[side], dists[1 - side]
+        for v, w in zip(*_neighbors(graph, u, reverse=side == 1)):
+            nd = d + w
+            if nd < mine.get(v, INF):
+                mine[v] = nd
+                preds[side][v] = u
+                heappush(heaps[side], (nd, v))
+            if v in other and mine[v] + other[v] < best:
+                best, meet = mine[v] + other[v], v
+    if meet is None:
+        return INF, None
+    path = []
+    v = meet
+    while v is not None:
+        path.append(v)
+        v = preds[0][v]
+    path.reverse()
+    v = preds[1][meet]
+    while v is not None:
+        path.append(v)
+        v = preds[1][v]
+    return best, path
+
+
+class ShortestPathDAG:
+    """
+    起点到终点所有最短路径组成的有向无环图，用“等长前驱”表示。
+
+    paths() 按深度优先逐条产出路径，不会一次性展开所有路径；
+    count() 在 DAG 上做动态规划得到路径总数，不需要枚举。
+    """
+
+    def __init__(self, graph, source, target, distance, preds_of):
+        self.graph = graph
+        self.source = source
+        self.target = target
+        self.distance = distance
+        self._preds_of = preds_of
+        self._preds = {}
+        self._count = None
+
+    def preds(self, v):
+        preds = self._preds.get(v)
+        if preds is None:
+            preds = self._preds[v] = self._preds_of(v)
+        return preds
+
+    def count(self):
+        """最短路径的总条数（Python 整数，可以非常大）。"""
+        if self._count is None:
+            counts = {}
+            stack = [self.target]
+            while stack:
+                v = stack[-1]
+                if v in counts:
+                    stack.pop()
+                    continue
+                preds = self.preds(v)
+                missing = [u for u in preds if u not in counts]
+                if missing:
+                    stack.extend(missing)
+                    continue
+                stack.pop()
+                # 只有起点没有等长前驱
+                counts[v] = sum(counts[u] for u in preds) if preds else 1
+            self._count = counts[self.target]
+        return self._count
+
+    def paths(self, max_paths=None, time_budget=None):
+        """
+        逐条产出 (路径单词列表, 路径长度)。
+
+        参数:
+            max_paths: 可选，最多产出的路径数
+            time_budget: 可选，秒，超过后停止产出（至少产出一条）
+        """
+        words = self.graph.vocab
+        deadline = None if time_budget is None else time.perf_counter() + time_budget
+        produced = 0
+        stack = [(self.target, [self.target])]
+        while stack:
+            if max_paths is not None and produced >= max_paths:
+                return
+            # 至少产出一条路径
+            if deadline is not None and produced and time.perf_counter() > deadline:
+                return
+            v, suffix = stack.pop()
+            preds = self.preds(v)
+            if not preds:
+                produced += 1
+                yield [words[u] for u in reversed(suffix)], self.distance
+                continue
+            for u in reversed(preds):
+                stack.append((u, suffix + [u]))
+
+
+def shortest_path_dag(graph, word1, word2, cache=None):
+    """
+    构建 word1 到 word2 的最短路径 DAG，不可达时返回 None。
+
+    传入 cache（ShortestPathCache）时用起点的完整最短路径树，
+    等长前驱由距离数组判断。否则先用双向 Dijkstra 求出最短距离（不可达时很快结束），
+    再从起点做一次以该距离为上界、到达终点即停止的 Dijkstra，记录所有等长前驱。
+    """
+    s, t = graph.vocab.get(word1), graph.vocab.get(word2)
+    if cache is not None:
+        tree = cache.tree(graph, s)
+        distance = tree.distance(t)
+        if distance == INF:
+            return None
+        return ShortestPathDAG(graph, s, t, distance, lambda v: tree.tied_preds(graph, v))
+    distance, _ = bidirectional_dijkstra(graph, s, t)
+    if distance == INF:
+        return None
+    tree = dijkstra(graph, s, targets=(t,), bound=distance, all_preds=True)
+    return ShortestPathDAG(graph, s, t, distance, tree.pred.__getitem__)
+
+
+def all_shortest_paths(graph, word1, word2, cache=None, max_paths=None, time_budget=None):
+    """
+    两个单词之间的所有最短路径，可以限制条数和耗时（见 ShortestPathDAG.paths）。
+
+    返回:
+        [(路径单词列表, 路径长度)]，不可达时为空列表
+    """
+    dag = shortest_path_dag(graph, word1, word2, cache)
+    if dag is None:
+        return []
+    return list(dag.paths(max_paths, time_budget))
+
+
+def single_source_shortest_paths(graph, word1, limit=None, cache=None):
+    """
+    从 word1 到其它所有可达单词的最短路径，只做一遍 Dijkstra（有 cache 时直接取缓存）。
+
+    参数:
+        limit: 可选，只返回距离最近的 limit 个目标
+        cache: 可选，ShortestPathCache
+
+    返回:
+        [(目标单词, 路径单词列表, 路径长度)]，按 (距离, 单词 ID) 从小到大排列，不含 word1 本身
+    """
+    source = graph.vocab.get(word1)
+    tree = dijkstra(graph, source) if cache is None else cache.tree(graph, source)
+    targets = tree.order[1:] if limit is None else tree.order[1:limit + 1]
+    words = graph.vocab
+    return [(words[v], [words[u] for u in tree.path(v)], tree.distance(v)) for v in targets]
+
+
+def batch_shortest_paths(graph, pairs, cache=None):
+    """
+    批量查询 (起点, 终点) 单词对的最短路径。
+
+    按起点分组，每个起点只做一次 Dijkstra，所有终点都确定后提前结束；
+    传入 cache 时改用缓存的完整最短路径树。
+
+    返回:
+        与 pairs 顺序相同的 [(距离, 路径单词列表)]；
+        单词不在图中或不可达时为 (None, None)
+    """
+    pairs = [(w1.lower().strip(), w2.lower().strip()) for w1, w2 in pairs]
+    results = [(None, None)] * len(pairs)
+    groups = defaultdict(list)
+    for i, (w1, w2) in enumerate(pairs):
+        s, t = graph.vocab.get(w1), graph.vocab.get(w2)
+        if s is not None and t is not None:
+            groups[s].append((i, t))
+    words = graph.vocab
+    for s, queries in groups.items():
+        if cache is not None:
+            tree = cache.tree(graph, s)
+        else:
+            tree = dijkstra(graph, s, targets={t for _, t in queries})
+        for i, t in queries:
+            path = tree.path(t)
+            if path is not None:
+                results[i] = (tree.distance(t), [words[v] for v in path])
+    return results
+
+
+def shortest_path_batch_file(graph, pairs_path, out_path):
+    """
+    从文件读取单词对批量查询最短路径，
+    结果按 “word1\tword2\t长度\t路径” 逐行写入 out_path，不可达时长度为空。
+
+    返回:
+        查询的单词对数
+    """
+    from bridge_words import read_pairs
+    pairs = list(read_pairs(pairs_path))
+    with open(out_path, 'w', encoding='utf-8') as out:
+        for (w1, w2), (distance, path) in zip(pairs, batch_shortest_paths(graph, pairs)):
+            if path is None:
+                out.write(f"{w1}\t{w2}\t\t不可达\n")
+            else:
+                out.write(f"{w1}\t{w2}\t{distance}\t{' -> '.join(path)}\n")
+    return len(pairs)
+
+
+def format_pair_paths(word1, word2, results, total=None):
+    if not results:
+        return f"{word1} 到 {word2} 不可达。"
+    result_lines = [" -> ".join(path) + f"（路径长度: {weight}）"
+                    for path, weight in results]
+    if total is not None and total > len(results):
+        result_lines.append(f"……共 {total} 条最短路径，只列出前 {len(results)} 条。")
+    return f"{word1} 到 {word2} 的所有最短路径：\n" + "\n".join(result_lines)
+
+
+def format_single_source(word1, results, limit=SINGLE_SOURCE_LIMIT):
+    result_lines = [
+        f"{word1} -> {target}：路径 = {' -> '.join(path)}, "
+        f"长度 = {length}"
+        for target, path, length in results[:limit]
+    ]
+    return "\n".join(result_lines)
+
+
+def shortest_path_message(graph, word1, word2='', cache=None):
+    """
+    最短路径查询，返回与原 GUI 相同格式的提示文本以及需要高亮的路径。
+
+    只给出 word1 时列出距离最近的 SINGLE_SOURCE_LIMIT 个单词（按距离、再按单词 ID 排列）；
+    原 GUI 按 networkx 发现节点的顺序取前 30 个，列出的单词和顺序可能与此不同。
+
+    参数:
+        graph: CompactGraph 或 None
+        word1: str，起点
+        word2: str，终点，为空时查询 word1 到所有单词的最短路径
+        cache: 可选，ShortestPathCache
+
+    返回:
+        (结果文本, 高亮边列表)，高亮边列表中每一项是一条路径的边；
+        查询失败或不可达、不需要重新绘图时高亮边列表为 None
+    """
+    word1 = word1.lower().strip()
+    word2 = word2.lower().strip()
+    if graph is None:
+        return NO_GRAPH_MESSAGE, None
+    if not word1:
+        return "请输入至少一个单词！", None
+    if word1 not in graph:
+        return f"单词 '{word1}' 不在图中！", None
+    if word2 and word2 not in graph:
+        return f"单词 '{word2}' 不在图中！", None
+
+    if word2:
+        with span('path.search'):
+            dag = shortest_path_dag(graph, word1, word2, cache)
+        if dag is None:
+            return format_pair_paths(word1, word2, []), None
+        # 并列路径可能多到无法全部展开：逐条枚举并限制条数和耗时，总数由 DP 得到
+        with span('path.enumerate'):
+            results = list(dag.paths(MAX_LISTED_PATHS, PATH_TIME_BUDGET))
+            total = dag.count()
+        return (format_pair_paths(word1, word2, results, total),
+                [path_edges(path) for path, _ in results[:MAX_HIGHLIGHT_PATHS]])
+    with span('path.single_source'):
+        results = single_source_shortest_paths(graph, word1, SINGLE_SOURCE_LIMIT, cache)
+    return format_single_source(word1, results), []
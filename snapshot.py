@@ -0,0 +1,163 @@
+import hashlib
+import os
+import struct
+
+import numpy as np
+
+from compact_graph import CompactGraph, Vocabulary
+
+MAGIC = b'TXTGRAPH'
+VERSION = 3  # 2: 增加语料最后一个单词，用于追加文本；3: 增加词频和第一次出现的偏移
+SUFFIX = '.graph'
+# 魔数, 版本, 保留, 节点数, 边数, 词表字节数, 最后一个单词的字节数（0 表示没有）, 源文本 sha256
+HEADER = struct.Struct('<8sIIQQQQ32s')
+ALIGN = 8
+
+
+def file_digest(file_path, chunk_size=1 << 20):
+    """计算源文本文件内容的 sha256，用于判断快照是否过期。"""
+    h = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.digest()
+
+
+def snapshot_path(file_path):
+    return file_path + SUFFIX
+
+
+class MappedVocabulary(Vocabulary):
+    """
+    从快照中读出的词表，单词以 utf-8 拼接存放在内存映射的字节区中。
+
+    只有第一次按单词查找或取单词列表时才解码成 Python 字符串。
+    """
+
+    __slots__ = ('_blob', '_offsets', '_words', '_index')
+
+    def __init__(self, blob, offsets, freq, first, tokens):
+        self._blob = blob
+        self._offsets = offsets
+        self._words = None
+        self._index = None
+        self._freq = freq
+        self._first = first
+        self.tokens = tokens
+
+    @property
+    def words(self):
+        if self._words is None:
+            data = self._blob.tobytes().decode('utf-8')
+            bounds = self._offsets.tolist()
+            # 单词只含 ASCII 字母，字节偏移与字符偏移相同
+            self._words = [data[bounds[i]:bounds[i + 1]]
+                           for i in range(len(bounds) - 1)]
+        return self._words
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = {word: i for i, word in enumerate(self.words)}
+        return self._index
+
+    def __len__(self):
+        if self._words is not None:
+            return len(self._words)
+        return len(self._offsets) - 1
+
+    def __getitem__(self, idx):
+        if self._words is not None:
+            return self._words[idx]
+        return bytes(self._blob[self._offsets[idx]:self._offsets[idx + 1]]).decode('utf-8')
+
+
+def _sections(graph):
+    words = graph.vocab.words
+    blob = np.frombuffer(''.join(words).encode('utf-8'), dtype=np.uint8)
+    offsets = np.zeros(len(words) + 1, dtype='<i8')
+    np.cumsum([len(w) for w in words], out=offsets[1:])
+    return [
+        offsets,
+        blob,
+        graph.indptr.astype('<i8', copy=False),
+        graph.indices.astype('<i4', copy=False),
+        graph.weights.astype('<i4', copy=False),
+        graph.rindptr.astype('<i8', copy=False),
+        graph.rindices.astype('<i4', copy=False),
+        graph.redges.astype('<i4', copy=False),
+        graph.vocab.freq.astype('<i8', copy=False),
+        graph.vocab.first.astype('<i8', copy=False),
+        np.array([graph.vocab.tokens], dtype='<i8'),
+    ]
+
+
+def save_snapshot(graph, path, source_digest=b''):
+    """
+    把图写成二进制快照：定长文件头后依次是词表和 CSR 数组，每段按 8 字节对齐。
+
+    先写临时文件再改名，避免中途失败留下损坏的快照。
+    """
+    sections = _sections(graph)
+    last = (graph.last_word or '').encode('utf-8')
+    sections.append(np.frombuffer(last, dtype=np.uint8))
+    header = HEADER.pack(MAGIC, VERSION, 0, len(graph.vocab),
+                         graph.number_of_edges(), len(sections[1]), len(last),
+                         source_digest.ljust(32, b'\0'))
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        for arr in sections:
+            f.write(b'\0' * (-f.tell() % ALIGN))
+            arr.tofile(f)
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path, source_digest=None):
+    """
+    以内存映射方式加载快照，数组不会被复制。
+
+    参数:
+        path: str，快照文件路径
+        source_digest: 可选，源文本的 sha256；与快照记录的不一致时返回 None
+
+    返回:
+        CompactGraph，文件不存在、格式或版本不符、或已过期时返回 None
+    """
+    if not os.path.exists(path) or os.path.getsize(path) < HEADER.size:
+        return None
+    with open(path, 'rb') as f:
+        magic, version, _, n, m, blob_len, last_len, digest = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        return None
+    if source_digest is not None and digest != source_digest.ljust(32, b'\0'):
+        return None
+
+    buf = np.memmap(path, dtype=np.uint8, mode='r')
+    offset = HEADER.size
+
+    def take(dtype, count):
+        nonlocal offset
+        offset += -offset % ALIGN
+        nbytes = np.dtype(dtype).itemsize * count
+        arr = buf[offset:offset + nbytes].view(dtype)
+        offset += nbytes
+        return arr
+
+    offsets = take('<i8', n + 1)
+    blob = take(np.uint8, blob_len)
+    indptr = take('<i8', n + 1)
+    indices = take('<i4', m)
+    weights = take('<i4', m)
+    rindptr = take('<i8', n + 1)
+    rindices = take('<i4', m)
+    redges = take('<i4', m)
+    freq = take('<i8', n)
+    first = take('<i8', n)
+    tokens = int(take('<i8', 1)[0])
+    last_word = take(np.uint8, last_len).tobytes().decode('utf-8') or None
+    vocab = MappedVocabulary(blob, offsets, freq, first, tokens)
+    return CompactGraph(vocab, indptr, indices, weights, rindptr, rindices, redges, last_word)
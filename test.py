@@ -1,5 +1,63 @@
+import io
+import json
+import contextlib
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
 import unittest
+from collections import Counter
 import networkx as nx
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from text_graph import (append_text, build_from_paths, build_graph, clean_text,
+                        iter_bytes_words, iter_file_words, iter_words, load_graph)
+from compact_graph import CompactGraph, Vocabulary, bigram_arrays
+from render import (EDGE_LABEL_MAX_EDGES, MAX_LABELS, GraphView,
+                    select_visible, visible_edges)
+from shortest_path import (SINGLE_SOURCE_LIMIT, ShortestPathCache, all_shortest_paths,
+                           batch_shortest_paths,
+                           bidirectional_dijkstra, path_weight, shortest_path_batch_file,
+                           shortest_path_dag, shortest_path_message,
+                           single_source_shortest_paths)
+from sampling import AliasTables
+from random_walk import EdgeSet, random_walk_path, random_walks
+import instrument
+from jobs import JobCancelled, JobExecutor
+from parallel import run_shared_pool
+from layout import LayoutCache, choose_engine, compute_layout
+from pagerank import (PageRankCache, PageRankRanking, calculate_pagerank, format_top_pagerank,
+                      pagerank_vector, top_k)
+from snapshot import file_digest, load_snapshot, save_snapshot
+from bridge_words import (MIN_INDEX_BYTES, BridgeIndex, BatchStats, bridge_batch_file, bridge_ids,
+                          bridge_words_message, default_index_bytes, generate_text,
+                          iter_bridge_results)
+
+
+def letter_vocab(n):
+    """n 个互不相同、只含字母的单词（wa, wb, ..., waa, ...），经过 clean_text 后保持不变。"""
+    return ["w" + chr(ord("a") + i % 26) * (1 + i // 26) for i in range(n)]
+
+
+def random_words(vocab_size, length, seed):
+    """从 letter_vocab(vocab_size) 中均匀抽取 length 个单词，seed 固定时结果确定。"""
+    rng = random.Random(seed)
+    vocab = letter_vocab(vocab_size)
+    return [rng.choice(vocab) for _ in range(length)]
+
+
+def scale_task(shared, task):
+    """run_shared_pool 的测试任务，需定义在模块级以便子进程调用。"""
+    return shared * task
+
+
+def clean_text_pure(text):
+    """原来基于正则的 clean_text，作为字节分词的参照。"""
+    text = re.sub(r'[^A-Za-z\s]', ' ', text)
+    text = text.lower()
+    return text.split()
 
 
 def find_bridge_words_pure(G, word1, word2):
@@ -35,6 +93,52 @@ def find_bridge_words_pure(G, word1, word2):
             return f"The bridge words from {word1} to {word2} are: {formatted}."
 
 
+def calculate_pagerank_pure(Graph,
+                            damping_factor,
+                            max_iter=100,
+                            tol=1e-6,
+                            word_list=None):
+    """
+    原 lab1 中逐节点循环的 PageRank 实现，作为稀疏矩阵版本的参照。
+    """
+    N = len(Graph)
+    if N == 0:
+        return {}
+
+    # 计算词频并归一化
+    if word_list:
+        freq = Counter(word_list)
+        total = sum(freq[node] for node in Graph if node in freq)
+        pr = {node: freq[node] / total
+              if node in freq else 0 for node in Graph}
+    else:
+        pr = {node: 1 / N for node in Graph}
+
+    nodes = list(Graph.nodes())
+
+    for _ in range(max_iter):
+        new_pr = {}
+        dangling_sum = sum(
+            pr[node]
+            for node in nodes if Graph.out_degree(node) == 0)
+
+        for node in nodes:
+            rank = (1 - damping_factor) / N
+            rank += damping_factor * dangling_sum / N
+
+            for pred in Graph.predecessors(node):
+                if Graph.out_degree(pred) > 0:
+                    rank += damping_factor * pr[pred] / Graph.out_degree(pred)
+            new_pr[node] = rank
+
+        diff = sum(abs(new_pr[node] - pr[node]) for node in nodes)
+        pr = new_pr
+        if diff < tol:
+            break
+
+    return pr
+
+
 class TestFindBridgeWordsPure(unittest.TestCase):
 
     def setUp(self):
@@ -84,5 +188,982 @@ class TestFindBridgeWordsPure(unittest.TestCase):
         )
 
 
+class TestStreamingBuild(unittest.TestCase):
+
+    TEXT = ("The scientist carefully analyzed the data,\n"
+            "wrote a detailed report, and shared the report with the team.\n"
+            "But the team requested more data, so the scientist analyzed it again.")
+
+    def test_iter_words_matches_clean_text(self):
+        # 块大小取 1、7 等，单词必然被切断在块边界上
+        expected = clean_text(self.TEXT)
+        for chunk_size in (1, 2, 7, 64, 4096):
+            words = list(iter_words(io.StringIO(self.TEXT), chunk_size))
+            self.assertEqual(words, expected)
+
+    def test_streaming_graph_matches_list_graph(self):
+        expected = build_graph(clean_text(self.TEXT))
+        G = build_graph(iter_words(io.StringIO(self.TEXT), 5))
+        self.assertEqual(list(G.nodes()), list(expected.nodes()))
+        self.assertEqual(list(G.edges(data='weight')),
+                         list(expected.edges(data='weight')))
+
+
+class TestCompactGraph(unittest.TestCase):
+
+    def setUp(self):
+        words = clean_text(TestStreamingBuild.TEXT + " the end the team the data")
+        self.expected = build_graph(words)
+        self.G = CompactGraph.from_words(words)
+
+    def test_same_structure_as_networkx(self):
+        E = self.expected
+        self.assertEqual(len(self.G), len(E))
+        self.assertEqual(self.G.nodes(), list(E.nodes()))
+        for node in E:
+            self.assertEqual(list(self.G.successors(node)), list(E.successors(node)))
+            self.assertEqual(list(self.G.predecessors(node)), list(E.predecessors(node)))
+            self.assertEqual(self.G.out_degree(node), E.out_degree(node))
+            for other in E:
+                self.assertEqual(self.G.has_edge(node, other), E.has_edge(node, other))
+        for a, b, w in E.edges(data='weight'):
+            self.assertEqual(self.G.weight(a, b), w)
+
+    def test_networkx_round_trip(self):
+        back = CompactGraph.from_networkx(self.G.to_networkx())
+        self.assertEqual(back.edges(), self.G.edges())
+        self.assertEqual(list(self.G.to_networkx().edges(data='weight')),
+                         list(self.expected.edges(data='weight')))
+
+    def test_bridge_words_on_compact_graph(self):
+        for w1, w2 in [("the", "team"), ("analyzed", "data"), ("the", "report"), ("a", "b")]:
+            self.assertEqual(find_bridge_words_pure(self.G, w1, w2),
+                             find_bridge_words_pure(self.expected, w1, w2))
+
+    def test_single_word_is_empty(self):
+        self.assertEqual(len(CompactGraph.from_words(["alone"])), 0)
+
+    def test_vocabulary_metadata(self):
+        words = clean_text(TestStreamingBuild.TEXT + " the end the team the data")
+        counts = Counter(words)
+        vocab = self.G.vocab
+        self.assertFalse(hasattr(vocab, '__dict__'))
+        self.assertEqual(vocab.freq.tolist(), [counts[w] for w in vocab])
+        self.assertEqual(vocab.first.tolist(), [words.index(w) for w in vocab])
+        self.assertEqual(vocab.tokens, len(words))
+        # 分段追加的结果与一次构建相同，包括只有一个单词的开头
+        for k in (1, 2, 17):
+            G = CompactGraph.from_words(words[:k])
+            G.append_words(words[k:])
+            self.assertEqual(G.vocab.freq.tolist(), vocab.freq.tolist())
+            self.assertEqual(G.vocab.first.tolist(), vocab.first.tolist())
+
+    def test_vectorized_bigrams_match_loop(self):
+        # 逐词累加作为参照；块大小取 1、3 等，单词对跨越块边界
+        rng = random.Random(3)
+        words = [rng.choice("abcdefg") for _ in range(500)]
+        expected = {}
+        for pair in zip(["z"] + words, words):
+            expected[pair] = expected.get(pair, 0) + 1
+        for chunk_size in (1, 3, 64, 1 << 20):
+            vocab = Vocabulary()
+            src, dst, weight, last = bigram_arrays(vocab, iter(words), "z", chunk_size)
+            names = vocab.words
+            got = {(names[a], names[b]): w
+                   for a, b, w in zip(src.tolist(), dst.tolist(), weight.tolist())}
+            self.assertEqual(list(got.items()), list(expected.items()))
+            self.assertEqual(last, words[-1])
+
+
+class TestSparsePageRank(unittest.TestCase):
+
+    def setUp(self):
+        self.words = clean_text(TestStreamingBuild.TEXT + " again and again")
+        self.expected = build_graph(self.words)
+        self.G = CompactGraph.from_words(self.words)
+
+    def assertRanksEqual(self, actual, expected):
+        self.assertEqual(list(actual), list(expected))
+        for node, rank in expected.items():
+            self.assertAlmostEqual(actual[node], rank, places=12)
+
+    def test_matches_reference(self):
+        for damping in (0.5, 0.85):
+            self.assertRanksEqual(calculate_pagerank(self.G, damping),
+                                  calculate_pagerank_pure(self.expected, damping))
+
+    def test_word_list_prior_and_networkx_input(self):
+        expected = calculate_pagerank_pure(self.expected, 0.85, max_iter=3,
+                                           word_list=self.words)
+        self.assertRanksEqual(calculate_pagerank(self.G, 0.85, max_iter=3,
+                                                 word_list=self.words), expected)
+        self.assertRanksEqual(calculate_pagerank(self.expected, 0.85, max_iter=3,
+                                                 word_list=self.words), expected)
+
+    def test_word_list_without_graph_words_falls_back_to_uniform(self):
+        ranks = calculate_pagerank(self.G, 0.85, max_iter=3, word_list=["nosuchword"])
+        self.assertRanksEqual(ranks, calculate_pagerank(self.G, 0.85, max_iter=3))
+        self.assertFalse(any(np.isnan(rank) for rank in ranks.values()))
+
+    def test_empty_graph(self):
+        self.assertEqual(calculate_pagerank(CompactGraph.from_words([]), 0.85), {})
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, "corpus.txt")
+        with open(self.source, "w", encoding="utf-8") as f:
+            f.write(TestStreamingBuild.TEXT)
+        self.path = self.source + ".graph"
+        self.G = CompactGraph.from_words(clean_text(TestStreamingBuild.TEXT))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip_is_memory_mapped(self):
+        digest = file_digest(self.source)
+        save_snapshot(self.G, self.path, digest)
+        loaded = load_snapshot(self.path, digest)
+        self.assertIsInstance(loaded.indices, np.memmap)
+        self.assertEqual(loaded.vocab[3], self.G.vocab[3])
+        self.assertEqual(loaded.nodes(), self.G.nodes())
+        self.assertEqual(loaded.edges(), self.G.edges())
+        self.assertEqual(loaded.vocab.freq.tolist(), self.G.vocab.freq.tolist())
+        self.assertEqual(loaded.vocab.first.tolist(), self.G.vocab.first.tolist())
+        self.assertEqual(loaded.vocab.tokens, self.G.vocab.tokens)
+        self.assertEqual(list(loaded.predecessors("the")), list(self.G.predecessors("the")))
+        self.assertEqual(calculate_pagerank(loaded, 0.85), calculate_pagerank(self.G, 0.85))
+
+    def test_stale_or_missing_snapshot(self):
+        self.assertIsNone(load_snapshot(self.path))
+        save_snapshot(self.G, self.path, file_digest(self.source))
+        with open(self.source, "a", encoding="utf-8") as f:
+            f.write(" more words")
+        self.assertIsNone(load_snapshot(self.path, file_digest(self.source)))
+
+
+class TestBridgeIndex(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(7)
+        vocab = ["w%d" % i for i in range(40)]
+        # 少量高频词，保证存在桥接词很多的单词对
+        words = [rng.choice(vocab[:6]) if rng.random() < 0.5 else rng.choice(vocab)
+                 for _ in range(3000)]
+        self.expected = build_graph(words)
+        self.G = CompactGraph.from_words(words)
+
+    def all_pairs(self):
+        return [(a, b) for a in self.G.vocab.words for b in self.G.vocab.words]
+
+    def test_index_matches_reference(self):
+        index = BridgeIndex(self.G, min_bridges=3)
+        self.assertGreater(len(index), 0)
+        for a, b in self.all_pairs():
+            self.assertEqual(bridge_words_message(self.G, a, b, index),
+                             find_bridge_words_pure(self.expected, a, b))
+
+    def test_memory_budget_falls_back_to_intersection(self):
+        full = BridgeIndex(self.G, min_bridges=1)
+        small = BridgeIndex(self.G, min_bridges=1, max_bytes=full.nbytes // 4)
+        self.assertLess(len(small), len(full))
+        self.assertLessEqual(small.nbytes, full.nbytes // 4)
+        for a, b in self.all_pairs():
+            u, v = self.G.vocab.index[a], self.G.vocab.index[b]
+            expected = bridge_ids(self.G, u, v).tolist()
+            self.assertEqual(small.lookup(u, v).tolist(), expected)
+            self.assertEqual(full.lookup(u, v).tolist(), expected)
+
+    def test_default_budget_scales_with_graph(self):
+        small = CompactGraph.from_words(clean_text(TestStreamingBuild.TEXT))
+        self.assertEqual(default_index_bytes(small), MIN_INDEX_BYTES)
+        big = CompactGraph.from_words(random_words(5000, 200000, seed=3))
+        self.assertGreater(default_index_bytes(big), MIN_INDEX_BYTES)
+        index = BridgeIndex(big)
+        self.assertEqual(index.max_bytes, default_index_bytes(big))
+        self.assertLessEqual(index.nbytes, index.max_bytes)
+
+    def test_messages(self):
+        self.assertEqual(bridge_words_message(None, "a", "b"), "请先加载文本文件并生成图！")
+        self.assertEqual(bridge_words_message(self.G, " W1 ", "nope"),
+                         "No w1 or nope in the graph!")
+
+
+class TestBatchBridgeWords(unittest.TestCase):
+
+    def setUp(self):
+        self.G = CompactGraph.from_words(clean_text(TestStreamingBuild.TEXT))
+        words = self.G.nodes() + ["unseen"]
+        self.pairs = [(a, b) for a in words for b in words]
+
+    def test_pool_preserves_order_and_messages(self):
+        expected = [(a, b, bridge_words_message(self.G, a, b)) for a, b in self.pairs]
+        stats = BatchStats()
+        results = list(iter_bridge_results(self.G, iter(self.pairs), BridgeIndex(self.G),
+                                           processes=2, chunksize=37, stats=stats))
+        self.assertEqual(results, expected)
+        self.assertEqual(stats.pairs, len(self.pairs))
+        self.assertEqual(list(iter_bridge_results(self.G, self.pairs, processes=1)), expected)
+
+    def test_batch_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, "pairs.txt")
+            out = os.path.join(tmp, "out.tsv")
+            with open(src, "w", encoding="utf-8") as f:
+                f.write("the\tteam\n\nanalyzed data\n")
+            stats = bridge_batch_file(self.G, src, out, processes=1)
+            with open(out, encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        self.assertEqual(stats.pairs, 2)
+        self.assertEqual(lines[1], "analyzed\tdata\tThe bridge word from analyzed to data is: the.")
+
+
+class TestHeadless(unittest.TestCase):
+
+    def test_import_does_not_load_gui(self):
+        code = ("import sys, lab1_2022112142, cli\n"
+                "print(any(m in sys.modules for m in ('tkinter', 'matplotlib')))")
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+        self.assertEqual(out.stdout.strip(), "False")
+
+    def test_cli_subcommands(self):
+        import cli
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "corpus.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(TestStreamingBuild.TEXT)
+            buf = io.StringIO()
+            with contextlib.redirect_stdout(buf):
+                cli.main(["bridge", path, "analyzed", "data"])
+                cli.main(["--no-snapshot", "path", path, "the", "team"])
+                cli.main(["walk", path, "--seed", "1", "--output",
+                          os.path.join(tmp, "walk.txt")])
+            lines = buf.getvalue().splitlines()
+            self.assertTrue(os.path.exists(path + ".graph"))
+        self.assertEqual(lines[0], "The bridge word from analyzed to data is: the.")
+        self.assertEqual(lines[1:3], ["the 到 team 的所有最短路径：", "the -> team（路径长度: 2）"])
+
+
+class TestAppendText(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(3)
+        vocab = letter_vocab(30)
+        self.words = [rng.choice(vocab[:5]) if rng.random() < 0.4 else rng.choice(vocab)
+                      for _ in range(2000)]
+
+    def assertSameGraph(self, G, expected):
+        self.assertEqual(G.nodes(), expected.nodes())
+        self.assertEqual(G.edges(), expected.edges())
+        for node in expected:
+            self.assertEqual(list(G.predecessors(node)), list(expected.predecessors(node)))
+
+    def test_append_matches_full_build(self):
+        expected = CompactGraph.from_words(self.words)
+        G = CompactGraph.from_words(self.words[:1])
+        G.to_networkx()
+        for start, stop in [(1, 2), (2, 700), (700, 701), (701, 2000)]:
+            version = G.version
+            G.append_words(self.words[start:stop])
+            self.assertEqual(G.version, version + 1)
+        self.assertSameGraph(G, expected)
+        # 追加时增量维护的边查找表与重新排序得到的相同
+        for ours, fresh in zip(G._ensure_edge_keys(), expected._ensure_edge_keys()):
+            np.testing.assert_array_equal(ours, fresh)
+        self.assertEqual(list(G.to_networkx().edges(data='weight')),
+                         list(build_graph(self.words).edges(data='weight')))
+
+    def test_append_to_snapshot_and_refresh_index(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "corpus.graph")
+            save_snapshot(CompactGraph.from_words(self.words[:1500]), path)
+            G = load_snapshot(path)
+            index = BridgeIndex(G, min_bridges=2)
+            delta = append_text(G, " ".join(self.words[1500:]))
+            self.assertTrue(index.is_stale)
+            index.refresh(delta)
+            self.assertFalse(index.is_stale)
+            self.assertSameGraph(G, CompactGraph.from_words(self.words))
+            fresh = BridgeIndex(G, min_bridges=2)
+            self.assertEqual(len(index), len(fresh))
+            for u in range(len(G)):
+                for v in range(len(G)):
+                    self.assertEqual(index.lookup(u, v).tolist(), bridge_ids(G, u, v).tolist())
+
+
+class TestWarmStartPageRank(unittest.TestCase):
+
+    def test_warm_start_after_append_and_damping_change(self):
+        rng = random.Random(5)
+        vocab = letter_vocab(300)
+        words = [rng.choice(vocab[:rng.randint(1, 300)]) for _ in range(20000)]
+        G = CompactGraph.from_words(words[:19900])
+        cache = PageRankCache()
+        calculate_pagerank(G, 0.85, tol=1e-10, cache=cache)
+        cold = cache.iterations
+
+        # 要求不比上一次严格（tol 更大）时直接返回上一次的结果
+        self.assertEqual(calculate_pagerank(G, 0.85, cache=cache),
+                         calculate_pagerank(G, 0.85, tol=1e-10))
+        self.assertEqual(cache.iterations, 0)
+        self.assertEqual(cache.saved_iterations, cold)
+        # 连续第二次命中同样省下一次冷启动
+        calculate_pagerank(G, 0.85, cache=cache)
+        self.assertEqual(cache.saved_iterations, cold)
+
+        # 更严格的要求不能直接命中，要从上一次的结果继续迭代
+        loose = PageRankCache()
+        calculate_pagerank(G, 0.85, tol=1e-4, cache=loose)
+        ranks = calculate_pagerank(G, 0.85, tol=1e-10, cache=loose)
+        self.assertGreater(loose.iterations, 0)
+        self.assertLess(loose.iterations, cold)
+        expected, _ = pagerank_vector(G, 0.85, tol=1e-10)
+        np.testing.assert_allclose(list(ranks.values()), expected, atol=1e-9)
+        calculate_pagerank(G, 0.85, tol=1e-10, max_iter=200, cache=loose)
+        self.assertGreater(loose.iterations, 0)
+
+        # 换了 word_list 就重新冷启动
+        calculate_pagerank(G, 0.85, max_iter=3, word_list=words[:50], cache=loose)
+        self.assertEqual(loose.iterations, 3)
+        self.assertEqual(calculate_pagerank(G, 0.85, max_iter=3, word_list=words[:50],
+                                            cache=loose),
+                         calculate_pagerank(G, 0.85, max_iter=3, word_list=words[:50]))
+
+        G.append_words(words[19900:])
+        for damping in (0.85, 0.86):
+            ranks = calculate_pagerank(G, damping, tol=1e-10, cache=cache)
+            self.assertLess(cache.iterations, cold)
+            self.assertEqual(cache.saved_iterations, cold - cache.iterations)
+            expected, _ = pagerank_vector(G, damping, tol=1e-10)
+            np.testing.assert_allclose(list(ranks.values()), expected, atol=1e-9)
+
+
+class TestPageRankRanking(unittest.TestCase):
+
+    def setUp(self):
+        self.vocab = Vocabulary(letter_vocab(500))
+        rng = np.random.default_rng(2)
+        # 大量并列的值，检验名次在值相同时按单词 ID 排列
+        self.vector = rng.integers(0, 40, size=500) / 40.0
+        self.ranking = PageRankRanking(self.vocab, self.vector)
+
+    def test_top_page_and_rank_agree_with_full_sort(self):
+        expected = sorted(range(500), key=lambda u: (-self.vector[u], u))
+        for k in (1, 7, 100, 500, 600):
+            self.assertEqual(top_k(self.vector, k).tolist(), expected[:k])
+            self.assertEqual([self.vocab.get(w) for _, w, _ in self.ranking.top(k)],
+                             expected[:k])
+        rows = self.ranking.page(120, 50)
+        self.assertEqual([r for r, _, _ in rows], list(range(121, 171)))
+        self.assertEqual([self.vocab.get(w) for _, w, _ in rows], expected[120:170])
+        for rank, u in enumerate(expected, 1):
+            self.assertEqual(self.ranking.rank_of(self.vocab[u]), rank)
+        self.assertIsNone(self.ranking.rank_of("missing"))
+        text = format_top_pagerank(self.ranking, 3)
+        self.assertTrue(text.startswith("PageRank 前 3 名（共 500 个单词）：\n1. "))
+
+    def test_streaming_csv_export(self):
+        import csv
+        import pagerank
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "ranks.csv")
+            done = []
+            old, pagerank.EXPORT_CHUNK = pagerank.EXPORT_CHUNK, 64
+            try:
+                rows = self.ranking.export(path, progress=lambda d, t: done.append(d))
+            finally:
+                pagerank.EXPORT_CHUNK = old
+            with open(path, encoding="utf-8", newline="") as f:
+                table = list(csv.reader(f))
+        self.assertEqual(rows, 500)
+        self.assertEqual(done[-1], 500)
+        self.assertEqual(len(done), 8)
+        self.assertEqual(table[0], ["rank", "word", "pagerank"])
+        self.assertEqual([row[1] for row in table[1:]],
+                         [w for _, w, _ in self.ranking.page(0, 500)])
+
+
+class TestBytesTokenizer(unittest.TestCase):
+
+    TEXT = ("Héllo, WORLD!\tcafé\u00a0naïve x2y  \r\nIt's 2024 -- end\u2028Zed\ufeffq " * 7
+            + "tail")
+
+    def test_clean_text_matches_regex(self):
+        self.assertEqual(clean_text(self.TEXT), clean_text_pure(self.TEXT))
+        self.assertEqual(clean_text(TestStreamingBuild.TEXT),
+                         clean_text_pure(TestStreamingBuild.TEXT))
+
+    def test_bytes_stream_matches_regex(self):
+        data = self.TEXT.encode("utf-8")
+        expected = clean_text_pure(self.TEXT)
+        for chunk_size in (1, 2, 3, 5, 64, 1 << 16):
+            self.assertEqual(list(iter_bytes_words(io.BytesIO(data), chunk_size)), expected)
+
+
+class TestParallelCorpusBuild(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        rng = random.Random(11)
+        vocab = letter_vocab(40)
+        self.texts = []
+        for i in range(12):
+            n = [0, 1, 2, 300][i % 4]  # 包含空文件和只有一个单词的文件
+            self.texts.append(" ".join(rng.choice(vocab) for _ in range(n)))
+            sub = os.path.join(self.tmp.name, "sub" if i % 2 else "")
+            os.makedirs(sub, exist_ok=True)
+            with open(os.path.join(sub, "f%02d.txt" % i), "w", encoding="utf-8") as f:
+                f.write(self.texts[i])
+        self.paths = sorted(os.path.join(self.tmp.name, "sub" if i % 2 else "", "f%02d.txt" % i)
+                            for i in range(12))
+        self.texts = [self.texts[int(os.path.basename(p)[1:3])] for p in self.paths]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def assertSameGraph(self, G, expected):
+        self.assertEqual(G.nodes(), expected.nodes())
+        self.assertEqual(G.edges(), expected.edges())
+        self.assertEqual(G.last_word, expected.last_word)
+        self.assertEqual(G.vocab.freq.tolist(), expected.vocab.freq.tolist())
+
+    def test_join_matches_concatenated_build(self):
+        words = clean_text("\n".join(self.texts))
+        expected = CompactGraph.from_words(words)
+        for G in (build_from_paths(self.paths, processes=3),
+                  build_from_paths(self.tmp.name, processes=1)):
+            self.assertSameGraph(G, expected)
+            self.assertEqual(G.vocab.first.tolist(), expected.vocab.first.tolist())
+            self.assertEqual(G.vocab.tokens, len(words))
+        counts = Counter(words)
+        self.assertEqual(expected.vocab.freq.tolist(), [counts[w] for w in expected.nodes()])
+        self.assertEqual(expected.vocab.first.tolist(),
+                         [words.index(w) for w in expected.nodes()])
+
+    def test_split_matches_per_file_build(self):
+        expected = CompactGraph.from_words([])
+        for text in self.texts:
+            expected.last_word = None
+            expected.append_words(clean_text(text))
+        expected.last_word = clean_text(" ".join(self.texts))[-1]
+        self.assertSameGraph(build_from_paths(self.paths, processes=2, boundary="split"),
+                             expected)
+
+
+class TestLayoutCache(unittest.TestCase):
+
+    def test_reuse_and_incremental_placement(self):
+        words = clean_text(TestStreamingBuild.TEXT)
+        G = CompactGraph.from_words(words)
+        cache = LayoutCache()
+        pos = cache.positions(G)
+        self.assertIs(cache.positions(G), pos)
+        self.assertEqual(cache.full_computes, 1)
+
+        G.append_words(clean_text("the brand new words appear then the end"))
+        new_pos = cache.positions(G)
+        self.assertEqual(cache.full_computes, 1)
+        self.assertEqual(cache.incremental_updates, 1)
+        self.assertEqual(set(new_pos), set(G.nodes()))
+        for word, xy in pos.items():
+            self.assertEqual(new_pos[word], xy)
+        self.assertTrue(np.isfinite(cache.coords).all())
+
+    def test_engine_by_size(self):
+        self.assertEqual(choose_engine(50), "kamada_kawai")
+        self.assertEqual(choose_engine(301), "multilevel")
+        self.assertEqual(choose_engine(50000), "multilevel")
+        G = CompactGraph.from_words(random_words(400, 3000, seed=2))
+        coords = compute_layout(G, "multilevel")
+        self.assertEqual(coords.shape, (len(G), 2))
+        self.assertTrue(np.isfinite(coords).all())
+
+    def test_multilevel_falls_back_when_graphviz_fails(self):
+        from unittest import mock
+        G = CompactGraph.from_words(random_words(400, 3000, seed=2))
+        for error in (OSError("sfdp crashed"), ValueError("Program sfdp not found in path.")):
+            with mock.patch("networkx.nx_agraph.graphviz_layout", side_effect=error):
+                coords = compute_layout(G, "multilevel")
+            self.assertEqual(coords.shape, (len(G), 2))
+            self.assertTrue(np.isfinite(coords).all())
+
+
+class TestGraphView(unittest.TestCase):
+    # 用 Agg 画布代替 Tk 画布，无显示器也能运行
+
+    def setUp(self):
+        self.G = CompactGraph.from_words(clean_text(TestStreamingBuild.TEXT))
+        self.pos = LayoutCache().positions(self.G)
+        self.view = GraphView(canvas_factory=lambda fig, master: FigureCanvasAgg(fig))
+
+    def tearDown(self):
+        self.view.close()
+
+    def test_base_drawn_once_and_overlays_replaced(self):
+        import matplotlib.pyplot as plt
+        self.assertTrue(self.view.show_graph(self.G, self.pos))
+        self.assertFalse(self.view.show_graph(self.G, self.pos))
+        self.assertEqual(self.view.base_draws, 1)
+
+        self.view.highlight([[("the", "scientist")], [("the", "data"), ("data", "so")]])
+        # 所有高亮边共用一个 LineCollection 和一个 quiver
+        self.assertEqual(len(self.view.overlays), 2)
+        self.view.add_overlay([("team", "requested")])
+        self.assertEqual(len(self.view.overlays), 4)
+        self.view.highlight([[("the", "team")]])
+        self.assertEqual(len(self.view.overlays), 2)
+        self.view.clear_overlays()
+        self.assertEqual(self.view.overlays, [])
+        self.assertEqual(self.view.base_draws, 1)
+        # Figure 不经过 pyplot 创建，不会在全局列表里累积
+        self.assertEqual(plt.get_fignums(), [])
+
+    def test_redraw_after_append(self):
+        self.view.show_graph(self.G, self.pos)
+        self.G.append_words(["team", "brand", "new"])
+        self.assertTrue(self.view.show_graph(self.G, LayoutCache().positions(self.G)))
+        self.assertEqual(self.view.base_draws, 2)
+
+    def test_level_of_detail(self):
+        G = CompactGraph.from_words(random_words(2000, 20000, seed=5))
+        rng = random.Random(5)
+        view = GraphView(canvas_factory=lambda fig, master: FigureCanvasAgg(fig),
+                         max_nodes=100, max_edges=500)
+        self.addCleanup(view.close)
+        rank = G.out_degrees + np.diff(G.rindptr)
+        pos = {word: (rng.random(), rng.random()) for word in G.nodes()}
+        view.show_graph(G, pos)
+        self.assertEqual(len(view.visible), 100)
+        self.assertGreaterEqual(rank[view.visible].min(), np.sort(rank)[-100])
+        # 节点、边、箭头各是一个图元，标签数量也有上限
+        self.assertEqual(len(view.ax.collections), 3)
+        self.assertLessEqual(len(view.ax.texts), MAX_LABELS + EDGE_LABEL_MAX_EDGES + 1)
+
+        # 高亮路径上被省略的节点由叠加层补画
+        hidden = next(i for i in range(len(G)) if i not in set(view.visible.tolist()))
+        word = G.vocab.words[hidden]
+        succ = G.vocab.words[G.successor_ids(hidden)[0]]
+        view.highlight([[(word, succ)]])
+        self.assertTrue(any(getattr(a, "get_text", lambda: None)() == word
+                            for a in view.overlays))
+
+    def test_visible_edges_keep_heaviest(self):
+        G = CompactGraph.from_words("a b a b a b c a c d".split())
+        src, dst, weight = visible_edges(G, np.arange(len(G)), max_edges=2)
+        self.assertEqual(sorted(weight.tolist()), [2, 3])
+        src, dst, weight = visible_edges(G, select_visible([5, 4, 0, 1], 2))
+        self.assertEqual(list(zip(src.tolist(), dst.tolist(), weight.tolist())),
+                         [(0, 1, 3), (1, 0, 2)])
+
+
+class TestJobExecutor(unittest.TestCase):
+
+    def test_one_job_per_kind_and_results_on_poll(self):
+        import threading
+        executor = JobExecutor()
+        release = threading.Event()
+        results = []
+        job = executor.submit('pagerank', lambda job: release.wait(5) and 42,
+                              on_done=results.append)
+        self.assertIsNotNone(job)
+        self.assertIsNone(executor.submit('pagerank', lambda job: 0))
+        self.assertIsNotNone(executor.submit('path', lambda job: 'p', on_done=results.append))
+        release.set()
+        executor.wait(5)
+        # 回调只在调用 poll/wait 的线程（主线程）中执行
+        self.assertCountEqual(results, [42, 'p'])
+        self.assertFalse(executor.running())
+
+    def test_progress_cancel_and_error(self):
+        import threading
+        executor = JobExecutor()
+        started = threading.Event()
+        progress, done, errors = [], [], []
+
+        def work(job):
+            G = CompactGraph.from_words(clean_text(TestStreamingBuild.TEXT))
+
+            def report(i, total):
+                started.set()
+                job.report(i, total, "pagerank")
+                if i >= 3:
+                    # 等待主线程取消
+                    job._cancel.wait(5)
+            return calculate_pagerank(G, 0.85, tol=0, progress=report)
+
+        job = executor.submit('pagerank', work, on_done=done.append,
+                              on_progress=lambda f, m: progress.append(f))
+        started.wait(5)
+        self.assertEqual(executor.cancel('pagerank'), 1)
+        job.thread.join(5)
+        executor.poll()
+        self.assertTrue(job.cancelled)
+        self.assertEqual(done, [])
+        self.assertEqual(progress, [])
+
+        executor.submit('load', lambda job: 1 / 0, on_error=errors.append)
+        executor.wait(5)
+        self.assertIsInstance(errors[0], ZeroDivisionError)
+
+    def test_mutating_job_runs_to_completion(self):
+        import threading
+        executor = JobExecutor()
+        mutating, release = threading.Event(), threading.Event()
+        done = []
+
+        def work(job):
+            job.begin_mutation()
+            mutating.set()
+            release.wait(5)
+            return 'appended'
+
+        executor.submit('load', work, on_done=done.append)
+        mutating.wait(5)
+        self.assertEqual(executor.cancel('load'), 0)
+        self.assertTrue(executor.running('load'))
+        release.set()
+        executor.wait(5)
+        self.assertEqual(done, ['appended'])
+        self.assertFalse(executor.running('load'))
+
+    def test_cancelled_job_counts_as_running_until_exit(self):
+        import threading
+        executor = JobExecutor()
+        release = threading.Event()
+        job = executor.submit('load', lambda job: release.wait(5))
+        self.assertEqual(executor.cancel('load'), 1)
+        # 线程还没退出，仍然视为在运行
+        self.assertTrue(executor.running('load'))
+        release.set()
+        job.thread.join(5)
+        executor.poll()
+        self.assertFalse(executor.running('load'))
+
+    def test_library_progress_hooks(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "a.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(TestStreamingBuild.TEXT * 50)
+            seen = []
+            words = list(iter_file_words(path, 100, progress=lambda d, t: seen.append((d, t))))
+            self.assertEqual(words, clean_text(TestStreamingBuild.TEXT * 50))
+            self.assertEqual(seen[-1][0], seen[-1][1])
+
+            def cancel(done, total):
+                raise JobCancelled("load")
+            with self.assertRaises(JobCancelled):
+                load_graph(path, use_snapshot=False, progress=cancel)
+
+
+class TestShortestPathEngine(unittest.TestCase):
+
+    def setUp(self):
+        # 权重取值很少，保证有大量并列的最短路径
+        self.words = random_words(60, 400, seed=11)
+        self.G = CompactGraph.from_words(self.words)
+        self.nx_graph = build_graph(self.words)
+
+    def test_single_source_lists_nearest_targets_first(self):
+        for word1 in list(self.G.nodes())[:10]:
+            lengths = nx.single_source_dijkstra_path_length(self.nx_graph, word1)
+            nearest = sorted((d, self.G.vocab.get(t), t) for t, d in lengths.items() if t != word1)
+            nearest = [(t, d) for d, _, t in nearest[:SINGLE_SOURCE_LIMIT]]
+            results = single_source_shortest_paths(self.G, word1, SINGLE_SOURCE_LIMIT)
+            self.assertEqual([(t, d) for t, _, d in results], nearest)
+            message, _ = shortest_path_message(self.G, word1)
+            self.assertEqual([line.split("：")[0].split(" -> ")[1] for line in message.split("\n")],
+                             [t for t, _ in nearest])
+
+    def test_matches_networkx(self):
+        nodes = list(self.G.nodes())
+        for word1 in nodes[:15]:
+            lengths = nx.single_source_dijkstra_path_length(self.nx_graph, word1)
+            results = single_source_shortest_paths(self.G, word1)
+            self.assertEqual({t: d for t, _, d in results},
+                             {t: d for t, d in lengths.items() if t != word1})
+            for target, path, length in results:
+                self.assertEqual((path[0], path[-1]), (word1, target))
+                self.assertEqual(path_weight(self.G, path), length)
+            for word2 in nodes[-15:]:
+                s, t = self.G.vocab.get(word1), self.G.vocab.get(word2)
+                distance, path = bidirectional_dijkstra(self.G, s, t)
+                ours = all_shortest_paths(self.G, word1, word2)
+                if word2 not in lengths:
+                    self.assertIsNone(path)
+                    self.assertEqual(ours, [])
+                    continue
+                self.assertEqual(distance, lengths[word2])
+                self.assertEqual(path_weight(self.G, [self.G.vocab[v] for v in path]),
+                                 distance)
+                expected = nx.all_shortest_paths(self.nx_graph, word1, word2, weight="weight")
+                self.assertCountEqual([p for p, _ in ours], list(expected))
+                self.assertTrue(all(d == distance for _, d in ours))
+
+    def test_batch_groups_by_source(self):
+        nodes = list(self.G.nodes())
+        pairs = [(a, b) for a in nodes[:5] for b in nodes[-8:]] + [("nosuchword", nodes[0])]
+        results = batch_shortest_paths(self.G, pairs)
+        self.assertEqual(results[-1], (None, None))
+        for (a, b), (distance, path) in zip(pairs, results):
+            if path is None:
+                continue
+            self.assertEqual(distance,
+                             nx.dijkstra_path_length(self.nx_graph, a, b, weight="weight"))
+            self.assertEqual(path_weight(self.G, path), distance)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            pairs_path = os.path.join(tmp, "pairs.txt")
+            out_path = os.path.join(tmp, "out.txt")
+            with open(pairs_path, "w", encoding="utf-8") as f:
+                f.write("\n".join(f"{a} {b}" for a, b in pairs))
+            self.assertEqual(shortest_path_batch_file(self.G, pairs_path, out_path), len(pairs))
+            with open(out_path, encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        self.assertEqual(lines[-1], f"nosuchword\t{nodes[0]}\t\t不可达")
+
+    def test_tied_path_count_and_lazy_enumeration(self):
+        nodes = list(self.G.nodes())
+        for word2 in nodes[-10:]:
+            dag = shortest_path_dag(self.G, nodes[0], word2)
+            if dag is not None:
+                self.assertEqual(dag.count(), len(all_shortest_paths(self.G, nodes[0], word2)))
+
+        # 40 个菱形串联：2^40 条并列最短路径，不能全部展开
+        def name(prefix, i):
+            return prefix + "".join(chr(ord("a") + int(c)) for c in str(i))
+        words = []
+        for i in range(40):
+            words += [name("n", i), name("p", i), name("n", i + 1),
+                      name("n", i), name("q", i), name("n", i + 1)]
+        G = CompactGraph.from_words(words)
+        for cache in (None, ShortestPathCache()):
+            dag = shortest_path_dag(G, name("n", 0), name("n", 40), cache)
+            self.assertEqual(dag.count(), 2 ** 40)
+            paths = list(dag.paths(max_paths=10))
+            self.assertEqual(len(paths), 10)
+            self.assertEqual(len({tuple(p) for p, _ in paths}), 10)
+            self.assertTrue(all(d == 80 and path_weight(G, p) == 80 for p, d in paths))
+            self.assertEqual(len(list(dag.paths(time_budget=0))), 1)
+
+        message, highlight = shortest_path_message(G, name("n", 0), name("n", 40))
+        self.assertIn(f"共 {2 ** 40} 条最短路径", message)
+        self.assertEqual(len(highlight), 6)
+
+    def test_tree_cache(self):
+        nodes = list(self.G.nodes())
+        cache = ShortestPathCache()
+        for word1 in nodes[:5]:
+            self.assertEqual(single_source_shortest_paths(self.G, word1, cache=cache),
+                             single_source_shortest_paths(self.G, word1))
+            for word2 in nodes[-10:]:
+                self.assertCountEqual(all_shortest_paths(self.G, word1, word2, cache),
+                                      all_shortest_paths(self.G, word1, word2))
+        self.assertEqual((cache.misses, cache.hits), (5, 50))
+        self.assertEqual(len(cache), 5)
+
+        # 追加文本后版本变化，缓存自动失效
+        self.G.append_words(nodes[:3])
+        all_shortest_paths(self.G, nodes[0], nodes[1], cache)
+        self.assertEqual((cache.misses, len(cache)), (6, 1))
+
+        # 内存上限只够放两棵树时按 LRU 淘汰
+        small = ShortestPathCache(max_bytes=2 * cache.nbytes)
+        for word in (nodes[0], nodes[1], nodes[0], nodes[2]):
+            small.tree(self.G, self.G.vocab.get(word))
+        self.assertEqual((len(small), small.evictions), (2, 1))
+        self.assertEqual([source for _, source in small._trees],
+                         [self.G.vocab.get(nodes[0]), self.G.vocab.get(nodes[2])])
+
+
+class TestBatchRandomWalk(unittest.TestCase):
+
+    def test_edge_set(self):
+        rng = np.random.default_rng(3)
+        edges = EdgeSet(4)
+        expected = set()
+        for _ in range(20):
+            keys = np.unique(rng.integers(0, 5000, size=300))
+            rng.shuffle(keys)
+            fresh = edges.add(keys)
+            self.assertEqual(fresh.tolist(), [k not in expected for k in keys.tolist()])
+            expected.update(keys.tolist())
+        self.assertEqual(len(edges), len(expected))
+
+    def test_walks_follow_edges_and_stop_on_repeat(self):
+        # 环 a -> b -> c -> a：走完一圈后再走 a -> b 就是重复的边
+        G = CompactGraph.from_words("a b c a".split())
+        batch = random_walks(G, starts=[0, 1], seed=0, processes=1)
+        self.assertEqual(batch.words(G, 0), random_walk_path(G, start="a")[0])
+        self.assertEqual(batch.words(G, 0), ["a", "b", "c", "a"])
+        self.assertEqual(batch.words(G, 1), ["b", "c", "a", "b"])
+        with self.assertRaises(ValueError):
+            random_walks(G, seed=0, processes=1)
+
+        words = clean_text(TestStreamingBuild.TEXT * 3)
+        G = CompactGraph.from_words(words)
+        batch = random_walks(G, 3000, seed=7, processes=1, shard_size=700)
+        self.assertEqual(len(batch), 3000)
+        for i in range(len(batch)):
+            path = batch[i].tolist()
+            edges = list(zip(path, path[1:]))
+            self.assertEqual(len(set(edges)), len(edges))
+            self.assertTrue(all(G.has_edge_id(u, v) for u, v in edges))
+            # 停下时要么没有出边，要么所有出边中至少有一条已经走过
+            last = path[-1]
+            succ = G.successor_ids(last).tolist()
+            self.assertTrue(not succ or any((last, v) in edges for v in succ))
+
+        # 同一个种子的结果与进程数无关
+        parallel = random_walks(G, 3000, seed=7, processes=2, shard_size=700)
+        self.assertTrue(np.array_equal(batch.offsets, parallel.offsets))
+        self.assertTrue(np.array_equal(batch.nodes, parallel.nodes))
+        short = random_walks(G, 50, seed=1, max_steps=2, processes=1)
+        self.assertLessEqual(short.lengths.max(), 2)
+
+
+class TestSharedPool(unittest.TestCase):
+
+    def test_results_in_order_and_early_close(self):
+        for processes in (1, 3):
+            results = list(run_shared_pool(scale_task, range(50), 2, processes))
+            self.assertEqual(results, [2 * i for i in range(50)])
+        # 提前关闭生成器时终止进程池（imap 会在后台预取任务，所以不检查取用了多少）
+        results = run_shared_pool(scale_task, iter(range(1000)), 3, 2)
+        self.assertEqual(next(results), 0)
+        results.close()
+        with self.assertRaises(StopIteration):
+            next(results)
+
+
+class TestAliasTables(unittest.TestCase):
+
+    def implied(self, tables, G):
+        """别名表实际给出的每条边的抽取概率。"""
+        degree = G.out_degrees
+        row_deg = np.repeat(degree, degree).astype(np.float64)
+        p = tables.prob / row_deg
+        np.add.at(p, tables.alias, (1 - tables.prob) / row_deg)
+        expected = G.weights / np.repeat(
+            np.add.reduceat(G.weights, G.indptr[:-1][degree > 0]), degree[degree > 0])
+        return p, expected
+
+    def test_tables_match_weights_and_refresh(self):
+        G = CompactGraph.from_words(random_words(25, 3000, seed=4))
+        tables = AliasTables(G)
+        p, expected = self.implied(tables, G)
+        np.testing.assert_allclose(p, expected)
+
+        # 追加的文本带来新单词
+        delta = G.append_words(random_words(40, 500, seed=5))
+        self.assertTrue(tables.is_stale)
+        tables.refresh(delta)
+        self.assertFalse(tables.is_stale)
+        p, expected = self.implied(tables, G)
+        np.testing.assert_allclose(p, expected)
+
+    def test_weighted_sampling(self):
+        G = CompactGraph.from_words("a b a b a b a c a d b a".split())
+        tables = AliasTables(G)
+        rng = random.Random(1)
+        counts = Counter(G.vocab[tables.draw(0, rng)] for _ in range(20000))
+        self.assertAlmostEqual(counts["b"] / 20000, 3 / 5, delta=0.02)
+        self.assertAlmostEqual(counts["c"] / 20000, 1 / 5, delta=0.02)
+
+        # 候选集合中按边权抽取；拒绝采样次数为 0 时走累计权重的分支
+        for attempts in (16, 0):
+            picks = Counter(tables.choose_among(0, [2, 1], rng, attempts) for _ in range(8000))
+            self.assertAlmostEqual(picks[1] / 8000, 3 / 4, delta=0.03)
+
+        words = clean_text(TestStreamingBuild.TEXT)
+        G = CompactGraph.from_words(words)
+        tables = AliasTables(G)
+        text = generate_text(G, ["analyzed", "data"], rng=rng, tables=tables)
+        self.assertEqual(text, ["analyzed", "the", "data"])
+        batch = random_walks(G, 200, seed=3, processes=1, tables=tables)
+        for i in range(len(batch)):
+            path = batch[i].tolist()
+            edges = list(zip(path, path[1:]))
+            self.assertEqual(len(set(edges)), len(edges))
+            self.assertTrue(all(G.has_edge_id(u, v) for u, v in edges))
+        nodes, edges = random_walk_path(G, rng, start="the", tables=tables)
+        self.assertEqual(nodes[0], "the")
+        self.assertTrue(all(G.has_edge(a, b) for a, b in edges))
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def tearDown(self):
+        instrument.recorder.configure(enabled=False, profile=False, trace_memory=False)
+        instrument.recorder.reset()
+
+    def test_disabled_records_nothing(self):
+        rec = instrument.recorder
+        self.assertIs(instrument.span("a"), instrument.span("b"))
+        with instrument.operation("op"), instrument.span("stage"):
+            instrument.count("n")
+        self.assertEqual((rec.stats, rec.counters, rec.reports), ({}, {}, {}))
+
+    def test_stages_profile_and_exports(self):
+        rec = instrument.recorder
+        rec.configure(enabled=True, profile=True, trace_memory=True)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "corpus.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(TestStreamingBuild.TEXT)
+            with instrument.operation("open_file", path=path):
+                G = load_graph(path, use_snapshot=False)
+                BridgeIndex(G)
+            with instrument.operation("find_shortest_path"):
+                shortest_path_message(G, "the", "team")
+            calculate_pagerank(G, 0.85)
+            stages = {row[0] for row in rec.summary()}
+            for name in ("open_file", "tokenize", "graph.intern", "graph.count_bigrams",
+                         "graph.build_csr", "bridge.index", "find_shortest_path",
+                         "path.search", "pagerank.iterate"):
+                self.assertIn(name, stages)
+            self.assertGreater(rec.counters["pagerank.iterations"], 0)
+            self.assertIn("load_graph", rec.reports["open_file"]["profile"])
+            self.assertGreater(rec.reports["open_file"]["peak_memory"], 0)
+            self.assertIn("open_file", rec.format_stats())
+
+            rec.export_chrome_trace(os.path.join(tmp, "trace.json"))
+            rec.export_json(os.path.join(tmp, "stats.json"))
+            with open(os.path.join(tmp, "trace.json"), encoding="utf-8") as f:
+                events = json.load(f)["traceEvents"]
+            with open(os.path.join(tmp, "stats.json"), encoding="utf-8") as f:
+                self.assertIn("open_file", json.load(f)["operations"])
+        spans = {e["name"]: e for e in events if e["ph"] == "X"}
+        outer, inner = spans["open_file"], spans["graph.build_csr"]
+        self.assertEqual(outer["args"], {"path": path})
+        self.assertLessEqual(outer["ts"], inner["ts"])
+        self.assertLessEqual(inner["ts"] + inner["dur"], outer["ts"] + outer["dur"])
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+
+    def test_small_scale_report(self):
+        import benchmark
+        ops = ('load_graph', 'bridge', 'shortest_path', 'pagerank', 'random_walks', 'draw_graph')
+        report = benchmark.run_suite([2000], ops, repeat=1, isolate=False)
+        self.assertEqual([r['op'] for r in report['results']], list(ops))
+        for r in report['results']:
+            self.assertGreater(r['seconds'], 0)
+            self.assertGreater(r['nodes'], 0)
+        self.assertEqual(benchmark.parse_scale("100M"), 100_000_000)
+        # 结果可以写成 JSON 并与另一次运行对比
+        report = json.loads(json.dumps(report))
+        rows = benchmark.compare_reports(report, report)
+        self.assertEqual([row[1] for row in rows], list(ops))
+        self.assertTrue(all(row[4] == 1.0 and not row[5] for row in rows))
+        slower = json.loads(json.dumps(report))
+        slower['results'][0]['seconds'] *= 2
+        rows = benchmark.compare_reports(report, slower, threshold=1.5)
+        self.assertEqual([row[5] for row in rows], [True] + [False] * (len(ops) - 1))
+        self.assertFalse(benchmark.compare_reports(report, slower, threshold=3)[0][5])
+
+
 if __name__ == "__main__":
     unittest.main()
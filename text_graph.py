@@ -0,0 +1,304 @@
+import glob
+import multiprocessing
+import os
+
+import numpy as np
+
+from compact_graph import CompactGraph, Vocabulary, bigram_arrays
+from instrument import span
+from snapshot import file_digest, snapshot_path, load_snapshot, save_snapshot
+
+CHUNK_SIZE = 1 << 20  # 流式读取时每块的字符（字节）数
+NO_GRAPH_MESSAGE = "请先加载文本文件并生成图！"  # 各项查询在没有图时的提示
+
+# 字节翻译表：大写字母转成小写，其余非字母字节一律变成空格。
+# utf-8 中非 ASCII 字符的每个字节都不小于 0x80，也会变成空格，
+# 因此与原来 re.sub(r'[^A-Za-z\s]', ' ', text).lower().split() 的结果完全一致。
+BYTE_TABLE = bytes(b + 32 if 65 <= b <= 90 else b if 97 <= b <= 122 else 32
+                   for b in range(256))
+SPACE = 32
+
+
+def clean_text(text):
+    return text.encode('utf-8', 'replace').translate(BYTE_TABLE).decode('ascii').split()
+
+
+def _split_partial(text):
+    """
+    把文本切成“完整部分”和“末尾可能未结束的单词”。
+
+    末尾若是字母，它可能与下一块开头的字母属于同一个单词，
+    需要留到下一块再处理。
+    """
+    end = len(text)
+    while end > 0 and text[end - 1].isascii() and text[end - 1].isalpha():
+        end -= 1
+    return text[:end], text[end:]
+
+
+def iter_words(f, chunk_size=CHUNK_SIZE):
+    """
+    按块读取文件对象，逐个产出单词，结果与 clean_text(f.read()) 完全一致。
+
+    参数:
+        f: 以文本模式打开的文件对象
+        chunk_size: int，每次读取的字符数
+
+    返回:
+        生成器，依次产出小写单词
+    """
+    carry = ''
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        complete, carry = _split_partial(carry + chunk)
+        yield from clean_text(complete)
+    if carry:
+        yield from clean_text(carry)
+
+
+def iter_bytes_words(f, chunk_size=CHUNK_SIZE):
+    """
+    按块读取二进制文件对象并逐个产出单词，结果与 clean_text 完全一致。
+
+    每块只做一次 bytes.translate 和一次 split，不经过正则和 str.lower。
+    """
+    carry = b''
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        with span('tokenize'):
+            data = (carry + chunk).translate(BYTE_TABLE)
+            if data[-1] != SPACE:
+                # 末尾的字母可能与下一块开头的字母属于同一个单词，留到下一块
+                cut = data.rfind(b' ') + 1
+                carry = data[cut:]
+                data = data[:cut]
+            else:
+                carry = b''
+            words = data.decode('ascii').split()
+        yield from words
+    if carry:
+        yield carry.decode('ascii')
+
+
+def iter_file_words(file_path, chunk_size=CHUNK_SIZE, progress=None):
+    """
+    流式读取文件中的单词。
+
+    progress: 可选，每读一块调用 progress(已读字节数, 文件总字节数)，
+        抛出异常即可中断读取
+    """
+    with open(file_path, 'rb') as f:
+        if progress is not None:
+            f = _ProgressReader(f, progress)
+        yield from iter_bytes_words(f, chunk_size)
+
+
+class _ProgressReader:
+    """包装二进制文件对象，每次 read 后汇报读取进度。"""
+
+    def __init__(self, f, progress):
+        self.f = f
+        self.total = os.fstat(f.fileno()).st_size
+        self.progress = progress
+
+    def read(self, size):
+        data = self.f.read(size)
+        self.progress(self.f.tell(), self.total)
+        return data
+
+
+def build_graph(words):
+    """
+    由单词序列构建有向图，words 可以是列表，也可以是流式生成器。
+
+    相邻单词对用 bigram_arrays 批量计数，再按第一次出现的顺序一次性加入图中，
+    节点、边以及后继、前驱的顺序都与逐词添加时相同。
+    耗时主要在 networkx 插入边上，与逐词添加相差无几；需要速度时用 CompactGraph.from_words。
+    """
+    import networkx as nx
+    vocab = Vocabulary()
+    src, dst, weight, _ = bigram_arrays(vocab, words)
+    Graph = nx.DiGraph()
+    names = vocab.words
+    Graph.add_weighted_edges_from(zip(map(names.__getitem__, src.tolist()),
+                                      map(names.__getitem__, dst.tolist()),
+                                      weight.tolist()))
+    return Graph
+
+
+def build_graph_from_file(file_path, chunk_size=CHUNK_SIZE):
+    return build_graph(iter_file_words(file_path, chunk_size))
+
+
+def load_graph(file_path, use_snapshot=True, progress=None):
+    """
+    读取文本文件得到 CompactGraph。
+
+    有对应快照且源文本未变化时直接映射加载，否则重新构建并保存快照。
+    progress 的含义见 iter_file_words。
+    """
+    if not use_snapshot:
+        return CompactGraph.from_words(iter_file_words(file_path, progress=progress))
+    digest = file_digest(file_path)
+    snap = snapshot_path(file_path)
+    graph = load_snapshot(snap, digest)
+    if graph is None:
+        # 分块流式读取，不把整个文件读入内存
+        graph = CompactGraph.from_words(iter_file_words(file_path, progress=progress))
+        try:
+            save_snapshot(graph, snap, digest)
+        except OSError:
+            pass  # 快照只是缓存，写不进去不影响使用
+    return graph
+
+
+def append_text(graph, text):
+    """把一段新文本追加到已有的图中，返回 GraphDelta。"""
+    return graph.append_words(clean_text(text))
+
+
+def append_file(graph, file_path, chunk_size=CHUNK_SIZE, progress=None):
+    """把一个文本文件流式追加到已有的图中，返回 GraphDelta。"""
+    return graph.append_words(iter_file_words(file_path, chunk_size, progress))
+
+
+def expand_paths(spec):
+    """
+    把目录、通配符或单个文件展开成按名称排序的 .txt 文件列表。
+
+    目录会递归查找其中所有 .txt 文件；通配符支持 **。
+    """
+    if os.path.isdir(spec):
+        spec = os.path.join(spec, '**', '*.txt')
+    elif os.path.isfile(spec):
+        return [spec]
+    return sorted(p for p in glob.glob(spec, recursive=True) if os.path.isfile(p))
+
+
+class PartialGraph:
+    """
+    单个文件的部分结果：局部词表和按第一次出现顺序排列的边计数表。
+
+    first/last 是文件的第一个和最后一个单词，合并时用来补上跨文件的边。
+    freq/offsets 是局部词表中每个单词的词频和第一次出现的偏移，tokens 是文件的单词数。
+    """
+
+    def __init__(self, words, src, dst, weight, first, last, freq=None, offsets=None, tokens=0):
+        self.words = words
+        self.src = src
+        self.dst = dst
+        self.weight = weight
+        self.first = first
+        self.last = last
+        self.freq = freq
+        self.offsets = offsets
+        self.tokens = tokens
+
+
+def count_file(file_path):
+    """统计一个文件的相邻单词对，返回 PartialGraph（在子进程中执行）。"""
+    vocab = Vocabulary()
+    it = iter_file_words(file_path)
+    first = next(it, None)
+    if first is None:
+        return PartialGraph([], None, None, None, None, None)
+    src, dst, weight, last = bigram_arrays(vocab, it, first)
+    # 只有一个单词的文件没有边，这个单词没有计入词表，但仍占一个偏移
+    return PartialGraph(vocab.words, src, dst, weight, first, last,
+                        vocab.freq, vocab.first, max(vocab.tokens, 1))
+
+
+def merge_partials(partials, boundary='join'):
+    """
+    按文件顺序合并各文件的部分结果。
+
+    参数:
+        partials: 按文件顺序排列的 PartialGraph
+        boundary: 'join' 时把前一个文件的最后一个单词与后一个文件的第一个单词相连，
+            结果与把所有文件拼接成一段文本后顺序构建完全相同；
+            'split' 时不产生跨文件的边，相当于逐个文件分别构建再合并
+
+    返回:
+        CompactGraph
+    """
+    if boundary not in ('join', 'split'):
+        raise ValueError(f"未知的 boundary 取值：{boundary}")
+    vocab = Vocabulary()
+    keys = []
+    weights = []
+    prev_last = None
+    lone = None  # 前一个文件只有一个单词时它的偏移：它连上跨文件的边才成为节点、计入词频
+    for part in partials:
+        if part.last is None:
+            continue
+        counted = False
+        if boundary == 'join' and prev_last is not None:
+            # 跨文件的边在文本中出现在本文件所有边之前
+            a, b = vocab.add(prev_last), vocab.add(part.first)
+            keys.append(np.array([(a << 32) | b], dtype=np.int64))
+            weights.append(np.ones(1, dtype=np.int64))
+            if lone is not None:
+                vocab.merge_counts([a], [1], [0], lone)
+            if not part.words:
+                vocab.merge_counts([b], [1], [0])
+                counted = True
+        lone = vocab.tokens if not part.words and not counted else None
+        mapping = np.array([vocab.add(word) for word in part.words], dtype=np.int64)
+        if len(mapping):
+            keys.append((mapping[part.src] << 32) | mapping[part.dst])
+            weights.append(part.weight)
+            vocab.merge_counts(mapping, part.freq, part.offsets)
+        vocab.tokens += part.tokens
+        prev_last = part.last
+    if not keys:
+        return CompactGraph.from_edges(vocab, [], [], [], prev_last)
+
+    keys = np.concatenate(keys)
+    weights = np.concatenate(weights)
+    uniq, first_pos, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    totals = np.bincount(inverse, weights=weights).astype(np.int64)
+    # 恢复每条边第一次出现的顺序
+    order = np.argsort(first_pos, kind='stable')
+    uniq = uniq[order]
+    return CompactGraph.from_edges(vocab, uniq >> 32, uniq & 0xFFFFFFFF, totals[order],
+                                   prev_last)
+
+
+def _report_each(items, total, progress):
+    for done, item in enumerate(items, 1):
+        progress(done, total)
+        yield item
+
+
+def build_from_paths(paths, processes=None, boundary='join', progress=None):
+    """
+    并行构建多个文件组成的语料：每个文件在进程池中分词计数，再按文件顺序归并。
+
+    参数:
+        paths: 文件路径列表，或交给 expand_paths 展开的目录/通配符字符串
+        processes: int，进程数，默认 CPU 核数；为 1 时在当前进程内计算
+        boundary: 跨文件边界的处理方式，见 merge_partials
+        progress: 可选，每处理完一个文件调用 progress(已完成文件数, 文件总数)
+
+    返回:
+        CompactGraph
+    """
+    if isinstance(paths, str):
+        paths = expand_paths(paths)
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if processes <= 1 or len(paths) <= 1:
+        partials = map(count_file, paths)
+        if progress is not None:
+            partials = _report_each(partials, len(paths), progress)
+        return merge_partials(partials, boundary)
+    with multiprocessing.Pool(min(processes, len(paths))) as pool:
+        # imap 按文件顺序返回结果，与顺序构建时的出现顺序一致
+        partials = pool.imap(count_file, paths)
+        if progress is not None:
+            partials = _report_each(partials, len(paths), progress)
+        return merge_partials(partials, boundary)